@@ -0,0 +1,89 @@
+"""
+batching.py — Micro-batching front end for the sentence-transformer
+
+Concurrent requests each need one goal embedding. Encoding them one at a time
+leaves most of the model's throughput unused, so ``BatchingEncoder`` queues
+texts, waits up to ``max_wait`` seconds (or until ``max_batch`` texts are
+queued) and encodes them in a single forward pass on a worker thread. Every
+caller gets a ``concurrent.futures.Future`` for its own row.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatchingEncoder:
+    """Collects texts from many threads and encodes them in batches."""
+
+    def __init__(self, encode, max_batch=32, max_wait=0.005):
+        self.encode_batch = encode  # list[str] -> array of shape (len, dim)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="batching-encoder", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """Queue ``text``; the returned Future resolves to its embedding."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text, timeout=None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(text).result(timeout)
+
+    def close(self, timeout=None):
+        """Stop the worker after the already-queued texts are encoded."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch": self.items / self.batches if self.batches else 0.0}
+
+    def _collect(self, first):
+        """``first`` plus whatever arrives before the deadline; returns (batch, stop)."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the deadline, still take texts that are already queued.
+                item = self._queue.get(block=remaining > 0, timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            vectors = self.encode_batch([text for text, _ in batch])
+        except BaseException as e:  # surface model errors to every waiting caller
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
@@ -0,0 +1,188 @@
+"""
+catalog.py — Compact columnar in-memory recipe catalog
+
+Replaces the merged pandas frame with list-valued ``tags``/``ingredients``
+columns. Tags and ingredients are interned to integer ids and attached to
+recipes through CSR-style offset arrays; numeric fields are NumPy arrays.
+Rows are only turned into dicts when a response is built. The catalog is all
+a snapshot keeps of the raw tables: incremental refreshes ``merge`` a catalog
+built from just the changed recipes into it.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def _csr(n_rows, row_pos, values):
+    """Group ``values`` by ``row_pos`` into (offsets, flat values), keeping input order per row."""
+    valid = (row_pos >= 0) & (values >= 0)
+    row_pos, values = row_pos[valid], values[valid]
+    order = np.argsort(row_pos, kind="stable")
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_pos, minlength=n_rows), out=offsets[1:])
+    return offsets, values[order].astype(np.int32)
+
+
+def _merge_vocab(keys, names, new_keys, new_names):
+    """Append the ``new_keys`` not already interned. Returns (keys, names, position of each new key)."""
+    pos = pd.Index(keys).get_indexer(new_keys)
+    added = pos < 0
+    pos[added] = len(keys) + np.arange(added.sum())
+    merged_names = list(names) + [name for name, new in zip(new_names, added) if new]
+    for i in np.flatnonzero(~added):  # names may have been edited since
+        merged_names[pos[i]] = new_names[i]
+    return np.concatenate([keys, np.asarray(new_keys, dtype=np.int64)[added]]), merged_names, pos
+
+
+def _merge_csr(offsets, values, keep, new_offsets, new_values, new_pos):
+    """Rows ``keep`` of (offsets, values) followed by every row of the new CSR, its values mapped by ``new_pos``."""
+    lengths = np.diff(offsets)
+    kept_values = values[np.repeat(keep, lengths)]
+    merged = np.zeros(int(keep.sum()) + len(new_offsets), dtype=np.int64)
+    np.cumsum(np.concatenate([lengths[keep], np.diff(new_offsets)]), out=merged[1:])
+    return merged, np.concatenate([kept_values, new_pos[new_values].astype(np.int32)])
+
+
+def _numeric(frame, column, dtype=np.float32):
+    if column not in frame.columns:
+        return np.full(len(frame), np.nan, dtype=dtype)
+    return pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def _strings(frame, column):
+    if column not in frame.columns:
+        return [""] * len(frame)
+    return [v if isinstance(v, str) else "" for v in frame[column].tolist()]
+
+
+class RecipeCatalog:
+    """Columnar recipe catalog; recipe ``i`` is row ``i`` of every array."""
+
+    def __init__(self, ids, names, descriptions, image_urls, min_prep_time, green_score,
+                 tag_keys, tag_names, tag_offsets, tag_ids,
+                 ingredient_keys, ingredient_names, ingredient_offsets, ingredient_ids):
+        self.ids = ids
+        self.names = names
+        self.descriptions = descriptions
+        self.image_urls = image_urls
+        self.min_prep_time = min_prep_time
+        self.green_score = green_score
+        self.tag_keys = tag_keys  # interned tag id -> Supabase RecipeTag.id
+        self.tag_names = tag_names  # interned tag id -> name
+        self.tag_offsets = tag_offsets  # recipe i's tags: tag_ids[tag_offsets[i]:tag_offsets[i + 1]]
+        self.tag_ids = tag_ids
+        self.ingredient_keys = ingredient_keys
+        self.ingredient_names = ingredient_names  # interned ingredient id -> name
+        self.ingredient_offsets = ingredient_offsets
+        self.ingredient_ids = ingredient_ids
+
+    @classmethod
+    def from_tables(cls, tables):
+        """Build from the raw Supabase tables (see supabase_loader.RECIPE_TABLES)."""
+        recipes = tables["recipes"]
+        ingredients = tables["ingredients"]
+        tags = tables["tags"]
+        recipe_ing_map = tables["recipe_ing_map"]
+        recipe_tag_map = tables["recipe_tag_map"]
+
+        ids = recipes["id"].to_numpy(dtype=np.int64)
+        recipe_index = pd.Index(ids)
+        tag_offsets, tag_ids = _csr(
+            len(ids),
+            recipe_index.get_indexer(recipe_tag_map["recipe_id"]),
+            pd.Index(tags["id"]).get_indexer(recipe_tag_map["tag_id"]),
+        )
+        ingredient_offsets, ingredient_ids = _csr(
+            len(ids),
+            recipe_index.get_indexer(recipe_ing_map["recipe_id"]),
+            pd.Index(ingredients["id"]).get_indexer(recipe_ing_map["ingredient_id"]),
+        )
+        return cls(
+            ids=ids,
+            names=_strings(recipes, "name"),
+            descriptions=_strings(recipes, "description"),
+            image_urls=_strings(recipes, "image_url"),
+            min_prep_time=_numeric(recipes, "min_prep_time"),
+            green_score=_numeric(recipes, "green_score"),
+            tag_keys=tags["id"].to_numpy(dtype=np.int64),
+            tag_names=_strings(tags, "name"),
+            tag_offsets=tag_offsets,
+            tag_ids=tag_ids,
+            ingredient_keys=ingredients["id"].to_numpy(dtype=np.int64),
+            ingredient_names=_strings(ingredients, "name"),
+            ingredient_offsets=ingredient_offsets,
+            ingredient_ids=ingredient_ids,
+        )
+
+    def merge(self, changed):
+        """
+        New catalog with the recipes of ``changed`` (a catalog of new/updated
+        recipes) replacing rows with the same id; the rest keep their order and
+        ``changed`` is appended. ``self`` is left untouched.
+        """
+        keep = ~np.isin(self.ids, changed.ids)
+        tag_keys, tag_names, tag_pos = _merge_vocab(self.tag_keys, self.tag_names, changed.tag_keys,
+                                                    changed.tag_names)
+        ingredient_keys, ingredient_names, ingredient_pos = _merge_vocab(
+            self.ingredient_keys, self.ingredient_names, changed.ingredient_keys, changed.ingredient_names
+        )
+        tag_offsets, tag_ids = _merge_csr(self.tag_offsets, self.tag_ids, keep, changed.tag_offsets,
+                                          changed.tag_ids, tag_pos)
+        ingredient_offsets, ingredient_ids = _merge_csr(
+            self.ingredient_offsets, self.ingredient_ids, keep, changed.ingredient_offsets,
+            changed.ingredient_ids, ingredient_pos,
+        )
+
+        def rows(column, new):
+            return [value for value, kept in zip(column, keep) if kept] + list(new)
+
+        return RecipeCatalog(
+            ids=np.concatenate([self.ids[keep], changed.ids]),
+            names=rows(self.names, changed.names),
+            descriptions=rows(self.descriptions, changed.descriptions),
+            image_urls=rows(self.image_urls, changed.image_urls),
+            min_prep_time=np.concatenate([self.min_prep_time[keep], changed.min_prep_time]),
+            green_score=np.concatenate([self.green_score[keep], changed.green_score]),
+            tag_keys=tag_keys,
+            tag_names=tag_names,
+            tag_offsets=tag_offsets,
+            tag_ids=tag_ids,
+            ingredient_keys=ingredient_keys,
+            ingredient_names=ingredient_names,
+            ingredient_offsets=ingredient_offsets,
+            ingredient_ids=ingredient_ids,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tags_of(self, i):
+        return [self.tag_names[t] for t in self.tag_ids[self.tag_offsets[i]:self.tag_offsets[i + 1]]]
+
+    def ingredients_of(self, i):
+        ingredient_ids = self.ingredient_ids[self.ingredient_offsets[i]:self.ingredient_offsets[i + 1]]
+        return [self.ingredient_names[t] for t in ingredient_ids]
+
+    def row(self, i):
+        """Recipe ``i`` as a plain dict (response time only)."""
+        prep, green = self.min_prep_time[i], self.green_score[i]
+        return {
+            "id": int(self.ids[i]),
+            "name": self.names[i],
+            "description": self.descriptions[i],
+            "image_url": self.image_urls[i] or None,
+            "min_prep_time": None if np.isnan(prep) else float(prep),
+            "green_score": None if np.isnan(green) else float(green),
+            "tags": self.tags_of(i),
+            "ingredients": self.ingredients_of(i),
+        }
+
+    def nbytes(self):
+        """Approximate resident size: NumPy buffers plus Python string objects."""
+        arrays = (self.ids, self.min_prep_time, self.green_score, self.tag_keys, self.tag_offsets, self.tag_ids,
+                  self.ingredient_keys, self.ingredient_offsets, self.ingredient_ids)
+        strings = (self.names, self.descriptions, self.image_urls, self.tag_names, self.ingredient_names)
+        pointers = 8 * sum(len(column) for column in strings)
+        return sum(a.nbytes for a in arrays) + pointers + sum(sys.getsizeof(s) for c in strings for s in c)
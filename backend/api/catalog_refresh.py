@@ -0,0 +1,129 @@
+"""
+catalog_refresh.py — Incremental catalog refresh without a process restart
+
+The recommender serves requests from an immutable ``CatalogSnapshot``. A
+background thread polls Supabase for recipes with a newer ``updated_at`` or a
+higher id than the current snapshot, fetches only those rows (plus their map,
+ingredient, tag and nutrition rows), builds a catalog of just those recipes
+and merges it into the snapshot's columnar catalog. Snapshots keep no raw
+tables. The snapshot reference is swapped in one assignment, so in-flight
+requests keep using the snapshot they started with.
+
+Deleted recipes are not detected by polling; they disappear on the next restart.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import pandas as pd
+
+from api.supabase_loader import RECIPE_TABLES, fetch_table
+
+ID_CHUNK = 200  # ids per `in.(...)` filter, keeps request URLs short
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Highest recipe id and updated_at seen in a snapshot."""
+
+    max_id: int = 0
+    updated_at: Optional[str] = None
+
+    @classmethod
+    def of(cls, recipes):
+        if recipes.empty:
+            return cls()
+        updated = recipes["updated_at"].dropna() if "updated_at" in recipes.columns else pd.Series(dtype=object)
+        return cls(int(recipes["id"].max()), str(updated.max()) if not updated.empty else None)
+
+    def merge(self, other):
+        updated = [u for u in (self.updated_at, other.updated_at) if u is not None]
+        return Watermark(max(self.max_id, other.max_id), max(updated) if updated else None)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Everything derived from one version of the recipe tables. Never mutated after build."""
+
+    recipes: Any  # RecipeCatalog
+    embeddings: Any
+    nutrient_matrix: Any
+    index: Any
+    filters: Any = None  # FilterIndex
+    watermark: Watermark = field(default_factory=Watermark)
+    built_at: float = field(default_factory=time.time)
+    timings: dict = field(default_factory=dict)  # seconds per build step
+
+
+def _fetch_in(client, key, column, values):
+    """Rows of RECIPE_TABLES[key] whose ``column`` is in ``values`` (chunked)."""
+    table, columns = RECIPE_TABLES[key]
+    values = sorted({int(v) for v in values})
+    frames = [
+        fetch_table(client, table, columns, where=lambda q, chunk=values[i:i + ID_CHUNK]: q.in_(column, chunk))[0]
+        for i in range(0, len(values), ID_CHUNK)
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def fetch_catalog_delta(client, watermark):
+    """
+    Fetch recipes changed or added since ``watermark`` and every row they depend on.
+
+    Returns a dict of frames keyed like RECIPE_TABLES that is complete for
+    those recipes (RecipeCatalog.from_tables and rollup_nutrient_matrix need
+    nothing else), or None if nothing changed.
+    """
+    table, columns = RECIPE_TABLES["recipes"]
+    changed = [fetch_table(client, table, columns, where=lambda q: q.gt("id", watermark.max_id))[0]]
+    if watermark.updated_at is not None:
+        changed.append(fetch_table(client, table, columns, where=lambda q: q.gt("updated_at", watermark.updated_at))[0])
+    recipes = pd.concat(changed, ignore_index=True).drop_duplicates("id", keep="last")
+    if recipes.empty:
+        return None
+
+    recipe_ids = recipes["id"].tolist()
+    recipe_ing_map = _fetch_in(client, "recipe_ing_map", "recipe_id", recipe_ids)
+    recipe_tag_map = _fetch_in(client, "recipe_tag_map", "recipe_id", recipe_ids)
+    delta = {
+        "recipes": recipes,
+        "recipe_ing_map": recipe_ing_map,
+        "recipe_tag_map": recipe_tag_map,
+        "ingredients": _fetch_in(client, "ingredients", "id", set(recipe_ing_map["ingredient_id"].dropna())),
+        "tags": _fetch_in(client, "tags", "id", set(recipe_tag_map["tag_id"].dropna())),
+    }
+    try:
+        delta["recipe_nutrition"] = _fetch_in(client, "recipe_nutrition", "recipe_id", recipe_ids)
+    except Exception:  # optional table (see OPTIONAL_TABLES): totals are derived from the map instead
+        delta["recipe_nutrition"] = None
+    return delta
+
+
+class CatalogRefresher:
+    """Daemon thread that calls ``refresh()`` every ``interval`` seconds."""
+
+    def __init__(self, refresh, interval):
+        self.refresh = refresh
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop polling; waits at most ``timeout`` seconds for a refresh in progress (e.g. a hung fetch)."""
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():  # a daemon thread, so it never blocks process exit
+            print(f"Catalog refresher still busy after {timeout}s; not waiting for it")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:  # keep serving the current snapshot
+                print(f"Catalog refresh failed: {e}")
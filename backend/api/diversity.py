@@ -0,0 +1,105 @@
+"""
+diversity.py — Pick a diverse subset of the top-ranked recipes
+
+Selectors take the ranked candidates' unit-normalized vectors (best first)
+and their relevance scores, and return exactly ``min(k, len(vectors))``
+candidate indices in rank order:
+
+* ``mmr`` — Maximal Marginal Relevance: greedily maximize
+  ``trade_off * relevance - (1 - trade_off) * max cosine to the picks so far``.
+* ``k-center`` — greedy farthest-point: start from the best recipe, then add
+  the candidate farthest (in cosine distance) from everything picked.
+* ``kmeans`` — the original sklearn KMeans clustering, best recipe per
+  cluster; empty clusters are back-filled so the count is still guaranteed.
+
+``mmr`` and ``k-center`` are a few vectorized NumPy passes over the
+candidates and fully deterministic.
+"""
+
+import numpy as np
+
+
+def _finish(selected):
+    """Candidates are ranked best first, so ascending indices are rank order."""
+    return np.sort(np.asarray(selected, dtype=np.int64))
+
+
+def _normalized_relevance(relevance):
+    """Scale relevance to [0, 1] so the trade-off means the same for any score range."""
+    relevance = np.asarray(relevance, dtype=np.float32)
+    spread = relevance.max() - relevance.min()
+    return (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+
+def mmr_select(vectors, relevance, k, trade_off=0.7):
+    """Maximal Marginal Relevance; ``trade_off=1`` is pure relevance, ``0`` pure diversity."""
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return _finish([])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    relevance = _normalized_relevance(relevance)
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    for _ in range(k):
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0)
+        score = trade_off * relevance - (1 - trade_off) * penalty
+        score[~available] = -np.inf
+        pick = int(np.argmax(score))  # ties go to the better-ranked recipe
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, vectors @ vectors[pick], out=max_similarity)
+    return _finish(selected)
+
+
+def k_center_select(vectors, relevance, k, trade_off=None):
+    """Greedy k-center (farthest-point) seeded with the most relevant recipe."""
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return _finish([])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    pick = int(np.argmax(np.asarray(relevance)))
+    selected = [pick]
+    distance = 1 - vectors @ vectors[pick]
+    distance[pick] = -np.inf
+    for _ in range(k - 1):
+        pick = int(np.argmax(distance))
+        selected.append(pick)
+        np.minimum(distance, 1 - vectors @ vectors[pick], out=distance)
+        distance[selected] = -np.inf
+    return _finish(selected)
+
+
+def kmeans_select(vectors, relevance, k, trade_off=None):
+    """Best recipe per KMeans cluster, back-filled by rank if clusters come out empty."""
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return _finish([])
+    from sklearn.cluster import KMeans
+
+    labels = KMeans(n_clusters=k, random_state=42, n_init="auto").fit_predict(np.asarray(vectors))
+    order = np.argsort(-np.asarray(relevance), kind="stable")
+    selected = []
+    for label in range(k):
+        members = order[labels[order] == label]
+        if len(members):
+            selected.append(int(members[0]))
+    for i in order:  # duplicates can leave clusters empty
+        if len(selected) == k:
+            break
+        if int(i) not in selected:
+            selected.append(int(i))
+    return _finish(selected)
+
+
+DIVERSITY_METHODS = {"mmr": mmr_select, "k-center": k_center_select, "kmeans": kmeans_select}
+
+
+def select_diverse(vectors, relevance, k, method="mmr", trade_off=0.7):
+    """Indices of ``min(k, len(vectors))`` diverse candidates, in rank order."""
+    if method not in DIVERSITY_METHODS:
+        raise ValueError(f"Unknown diversity method {method!r} (expected one of {sorted(DIVERSITY_METHODS)})")
+    return DIVERSITY_METHODS[method](vectors, relevance, k, trade_off=trade_off)
@@ -0,0 +1,190 @@
+"""
+embedding_store.py — Persistent, versioned recipe-embedding store
+
+Embeddings live on disk as a float32 ``.npy`` matrix next to a small JSON
+manifest. Each row is keyed by recipe id and a hash of (model name, recipe
+text), so a change to either invalidates only the affected rows. The matrix is
+memory-mapped on load, so serving requests never copies the catalog vectors.
+
+Several workers may sync the same store at once. Each save writes its matrix
+to a new uniquely named file and then atomically replaces the manifest, which
+names the matrix it belongs to; superseded matrices are deleted afterwards.
+A crash at any point therefore leaves the previous manifest + matrix pair
+intact. Saves are serialized with a lock file where ``fcntl`` is available.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are not serialized, but still never corrupt the store
+    fcntl = None
+
+MANIFEST_VERSION = 2  # v2: vectors are unit-normalized
+
+
+def _write_fsynced(path, write):
+    with open(path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def text_hash(model_name, text):
+    """Stable hash of the text a vector was computed from (and by which model)."""
+    return hashlib.sha1(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """On-disk embedding matrix keyed by recipe id + text hash."""
+
+    def __init__(self, root, model_name):
+        self.root = Path(root)
+        self.model_name = model_name
+        self.slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.vectors_path = self.root / f"{self.slug}.npy"  # matrix in use; this fixed name in older stores
+        self.manifest_path = self.root / f"{self.slug}.json"
+        self.lock_path = self.root / f"{self.slug}.lock"
+        self.ids = []
+        self.hashes = []
+        self.vectors = None
+        self._load()
+
+    @property
+    def fingerprint(self):
+        """Short hash identifying the current catalog contents (ids + text hashes)."""
+        digest = hashlib.sha1()
+        for i, h in zip(self.ids, self.hashes):
+            digest.update(f"{i}:{h};".encode("ascii"))
+        return digest.hexdigest()[:16]
+
+    def artifact_path(self, suffix):
+        """Path for a derived artifact (e.g. an ANN index) tied to the current contents."""
+        return self.root / f"{self.slug}-{self.fingerprint}{suffix}"
+
+    def prune_artifacts(self, suffix):
+        """Delete ``suffix`` artifacts of other contents, so one is kept per model rather than per catalog version."""
+        current = self.artifact_path(suffix)
+        pattern = re.compile(rf"{re.escape(self.slug)}-[0-9a-f]{{16}}{re.escape(suffix)}")
+        for path in self.root.glob(f"{self.slug}-*{suffix}"):
+            if path != current and pattern.fullmatch(path.name):
+                path.unlink(missing_ok=True)
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def _load(self, attempts=2):
+        for _ in range(attempts):  # a concurrent save may delete the matrix between the two reads
+            if not self.manifest_path.exists():
+                return
+            manifest = json.loads(self.manifest_path.read_text())
+            if manifest.get("version") != MANIFEST_VERSION or manifest.get("model") != self.model_name:
+                print(f"Ignoring stale embedding store at {self.manifest_path}")
+                return
+            vectors_path = self.root / manifest.get("vectors", self.vectors_path.name)
+            try:
+                vectors = np.load(vectors_path, mmap_mode="r")
+            except FileNotFoundError:
+                continue
+            if vectors.shape[0] != len(manifest["ids"]) or manifest.get("rows", vectors.shape[0]) != vectors.shape[0]:
+                print(f"Ignoring corrupt embedding store at {vectors_path}")
+                return
+            self.ids = manifest["ids"]
+            self.hashes = manifest["hashes"]
+            self.vectors = vectors
+            self.vectors_path = vectors_path
+            return
+        print(f"Ignoring embedding store at {self.manifest_path}: its matrix is missing")
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save(self, ids, hashes, vectors):
+        """Write a new matrix, then point the manifest at it (atomic replace) and re-open it memory-mapped."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock():
+            fd, vectors_path = tempfile.mkstemp(dir=self.root, prefix=f"{self.slug}.vectors-", suffix=".npy")
+            os.close(fd)
+            _write_fsynced(vectors_path, lambda f: np.save(f, vectors))
+            manifest = {"version": MANIFEST_VERSION, "model": self.model_name, "vectors": Path(vectors_path).name,
+                        "rows": len(ids), "ids": ids, "hashes": hashes}
+            fd, tmp_manifest = tempfile.mkstemp(dir=self.root, prefix=f"{self.slug}.", suffix=".json.tmp")
+            os.close(fd)
+            _write_fsynced(tmp_manifest, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+            os.replace(tmp_manifest, self.manifest_path)
+            self._prune(keep=Path(vectors_path))
+            self.vectors = np.load(vectors_path, mmap_mode="r")  # before the next save can prune it
+        self.ids = ids
+        self.hashes = hashes
+        self.vectors_path = Path(vectors_path)
+
+    def _prune(self, keep):
+        """Delete matrices the manifest no longer names, and temp files of crashed saves (held under the lock)."""
+        stale = [self.root / f"{self.slug}.npy", *self.root.glob(f"{self.slug}.vectors-*.npy"),
+                 *self.root.glob(f"{self.slug}.*.json.tmp")]
+        for path in stale:  # open memory maps of deleted matrices stay valid on POSIX
+            if path != keep and path.exists():
+                try:
+                    path.unlink()
+                except OSError:  # e.g. still mapped on Windows; the next save retries
+                    pass
+
+    # --------------------------------------------------
+    # Sync
+    # --------------------------------------------------
+    def sync(self, ids, texts, encode):
+        """
+        Return a matrix whose rows align with ``ids``, encoding only new or changed texts.
+
+        ``encode`` takes a list of strings and returns a 2-D array. When nothing
+        changed the memory-mapped matrix is returned as-is (zero-copy).
+        """
+        ids = [int(i) for i in ids]
+        hashes = [text_hash(self.model_name, t) for t in texts]
+        if self.vectors is not None and ids == self.ids and hashes == self.hashes:
+            return self.vectors
+
+        known = {(i, h): row for row, (i, h) in enumerate(zip(self.ids, self.hashes))}
+        stale = [pos for pos, key in enumerate(zip(ids, hashes)) if key not in known]
+        print(f"Embedding store: {len(ids) - len(stale)} reused, {len(stale)} to encode ...")
+
+        fresh = np.asarray(encode([texts[pos] for pos in stale]), dtype=np.float32) if stale else None
+        if fresh is not None:
+            dim = fresh.shape[1]
+        else:  # every row reused, or an empty catalog
+            dim = self.vectors.shape[1] if self.vectors is not None else 0
+        vectors = np.empty((len(ids), dim), dtype=np.float32)
+        if fresh is not None:
+            vectors[stale] = fresh
+        stale_set = set(stale)
+        reused = [pos for pos in range(len(ids)) if pos not in stale_set]
+        if reused:
+            vectors[reused] = self.vectors[[known[(ids[pos], hashes[pos])] for pos in reused]]
+
+        self._save(ids, hashes, vectors)
+        return self.vectors
+
+
+if __name__ == "__main__":
+    # Offline build: python -m api.embedding_store
+    from api.recommender import load_recipe_embeddings
+
+    print(f"Embedding store ready: {load_recipe_embeddings().shape}")
@@ -0,0 +1,105 @@
+"""
+filters.py — Hard recipe filters backed by precomputed bitsets
+
+Every tag and ingredient gets a packed bitset over the catalog rows (bit ``i``
+set = recipe ``i`` has it), built once per catalog snapshot from the CSR
+arrays of RecipeCatalog. A request's filter is then a handful of bitwise
+AND/OR operations over ``len(catalog) / 8`` bytes, done before any
+similarity scoring.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+TERM_CACHE_SIZE = 1024  # excluded-ingredient terms remembered per snapshot
+
+
+@dataclass(frozen=True)
+class RecipeFilter:
+    """
+    Tags match whole tag names; excluded ingredients match any ingredient name
+    containing them. Both ignore case and surrounding whitespace.
+    """
+
+    required_tags: Tuple[str, ...] = ()
+    forbidden_tags: Tuple[str, ...] = ()
+    excluded_ingredients: Tuple[str, ...] = ()
+    max_prep_time: Optional[float] = None  # recipes with unknown prep time are excluded
+
+    @property
+    def is_empty(self):
+        return not (self.required_tags or self.forbidden_tags or self.excluded_ingredients
+                    or self.max_prep_time is not None)
+
+
+def _bitsets(n_rows, n_values, offsets, values):
+    """Packed (n_values, ceil(n_rows / 8)) bitsets from CSR (offsets, values), in np.packbits bit order."""
+    packed = np.zeros((n_values, (n_rows + 7) // 8), dtype=np.uint8)
+    rows = np.repeat(np.arange(n_rows), np.diff(offsets))
+    np.bitwise_or.at(packed, (values, rows >> 3), (0x80 >> (rows & 7)).astype(np.uint8))
+    return packed
+
+
+def _lookup(names):
+    index = {}
+    for i, name in enumerate(names):
+        index.setdefault(name.strip().lower(), []).append(i)
+    return index
+
+
+class FilterIndex:
+    """Per-tag and per-ingredient bitsets for one RecipeCatalog."""
+
+    def __init__(self, catalog):
+        self.n = len(catalog)
+        self.tag_bits = _bitsets(self.n, len(catalog.tag_names), catalog.tag_offsets, catalog.tag_ids)
+        self.ingredient_bits = _bitsets(
+            self.n, len(catalog.ingredient_names), catalog.ingredient_offsets, catalog.ingredient_ids
+        )
+        self.tag_index = _lookup(catalog.tag_names)
+        self.ingredient_names = [name.lower() for name in catalog.ingredient_names]
+        self.min_prep_time = catalog.min_prep_time
+        self._all = np.packbits(np.ones(self.n, dtype=bool))
+        # excluded-ingredient term -> matching ingredient rows; bounded, since terms are raw user input
+        self._term_rows = lru_cache(maxsize=TERM_CACHE_SIZE)(self._match_term)
+
+    def _tag_rows(self, names):
+        return [row for name in names for row in self.tag_index.get(name.strip().lower(), [])]
+
+    def _match_term(self, term):
+        return tuple(i for i, name in enumerate(self.ingredient_names) if term in name)
+
+    def _ingredient_rows(self, terms):
+        rows = []
+        for term in terms:
+            term = term.strip().lower()
+            if term:
+                rows.extend(self._term_rows(term))
+        return rows
+
+    def mask(self, recipe_filter):
+        """Boolean array over catalog rows, or None when the filter is empty."""
+        if recipe_filter is None or recipe_filter.is_empty:
+            return None
+        bits = self._all.copy()
+        for name in recipe_filter.required_tags:
+            rows = self._tag_rows([name])
+            if not rows:  # unknown required tag: nothing can match
+                return np.zeros(self.n, dtype=bool)
+            bits &= np.bitwise_or.reduce(self.tag_bits[rows], axis=0)
+        forbidden = self._tag_rows(recipe_filter.forbidden_tags)
+        if forbidden:
+            bits &= ~np.bitwise_or.reduce(self.tag_bits[forbidden], axis=0)
+        excluded = self._ingredient_rows(recipe_filter.excluded_ingredients)
+        if excluded:
+            bits &= ~np.bitwise_or.reduce(self.ingredient_bits[excluded], axis=0)
+        mask = np.unpackbits(bits, count=self.n).astype(bool)
+        if recipe_filter.max_prep_time is not None:
+            mask &= self.min_prep_time <= recipe_filter.max_prep_time  # NaN compares False
+        return mask
+
+    def nbytes(self):
+        return self.tag_bits.nbytes + self.ingredient_bits.nbytes
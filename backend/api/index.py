@@ -1,19 +1,45 @@
-import os
+import json
+import math
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from epicourier_retry import CircuitOpenError
 from pydantic import BaseModel, Field
-from api.recommender import create_meal_plan
-from supabase import Client, create_client
+from api.recommender import (
+    MAX_BATCH_GOALS,
+    WARMUP_ON_STARTUP,
+    create_meal_plan_async,
+    create_multi_day_plan_async,
+    iter_meal_plans,
+    load_supabase,
+    start_catalog_refresher,
+    start_warmup,
+    stop_catalog_refresher,
+    warmup_status,
+)
+from api.filters import RecipeFilter
+from api.planner import InfeasiblePlanError
+from api.stages import StageTimeout
 from dotenv import load_dotenv
 
 load_dotenv()
 
-url: str = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-key: str = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 
-supabase: Client = create_client(url, key)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load model, catalog and index in the background; /readyz reports progress
+    if WARMUP_ON_STARTUP:
+        start_warmup()
+    # Poll Supabase for new/changed recipes (CATALOG_REFRESH_INTERVAL, 0 = off)
+    start_catalog_refresher()
+    yield
+    stop_catalog_refresher()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Allow frontend (Next.js) to call API
 app.add_middleware(
@@ -25,21 +51,52 @@ app.add_middleware(
 )
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once warmup finished, 503 (with per-stage timings) before that."""
+    status = warmup_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.get("/test")
 def test_endpoint():
-    data = supabase.table("Recipe").select("*").limit(5).execute()
+    # The Supabase client is created on first use (shared with the recommender).
+    data = load_supabase().table("Recipe").select("*").limit(5).execute()
     return {"message": data.data}
 
 
-class RecommendRequest(BaseModel):
-    goal: str
-    num_meals: int = Field(..., alias="numMeals")
+class FilterFields(BaseModel):
+    """Hard filters shared by the recommender and planner requests."""
+
+    required_tags: List[str] = Field(default_factory=list, alias="requiredTags")
+    forbidden_tags: List[str] = Field(default_factory=list, alias="forbiddenTags")
+    excluded_ingredients: List[str] = Field(default_factory=list, alias="excludedIngredients")
+    max_prep_time: Optional[float] = Field(None, alias="maxPrepTime")
 
     model_config = {"populate_by_name": True}
 
+    def recipe_filter(self):
+        return RecipeFilter(
+            required_tags=tuple(self.required_tags),
+            forbidden_tags=tuple(self.forbidden_tags),
+            excluded_ingredients=tuple(self.excluded_ingredients),
+            max_prep_time=self.max_prep_time,
+        )
+
+
+class RecommendRequest(FilterFields):
+    goal: str
+    num_meals: int = Field(..., alias="numMeals")
+
 
 @app.post("/recommender")
-def recommend_meals(req: RecommendRequest):
+async def recommend_meals(req: RecommendRequest):
     """Main recommender endpoint with input validation."""
     # Validate goal
     if not req.goal or not req.goal.strip():
@@ -49,5 +106,64 @@ def recommend_meals(req: RecommendRequest):
     if req.num_meals not in [3, 5, 7]:
         raise HTTPException(status_code=400, detail="numMeals must be one of 3, 5, or 7")
 
-    plan, expanded_goal = create_meal_plan(req.goal, n_meals=req.num_meals)
-    return {"recipes": plan, "goal_expanded": expanded_goal}
\ No newline at end of file
+    try:
+        plan, expanded_goal = await create_meal_plan_async(
+            req.goal, n_meals=req.num_meals, filters=req.recipe_filter()
+        )
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:  # Gemini is down; don't queue more calls behind it
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_in))})
+    return {"recipes": plan, "goal_expanded": expanded_goal}
+
+
+class PlannerRequest(FilterFields):
+    goal: str
+    num_days: int = Field(7, alias="numDays")
+    meals_per_day: int = Field(3, alias="mealsPerDay")
+
+
+@app.post("/planner")
+async def plan_days_endpoint(req: PlannerRequest):
+    """Multi-day plan whose daily totals meet the goal's nutrient targets, without repeats."""
+    if not req.goal or not req.goal.strip():
+        raise HTTPException(status_code=400, detail="Goal cannot be empty")
+    if not 1 <= req.num_days <= 14:
+        raise HTTPException(status_code=400, detail="numDays must be between 1 and 14")
+    if not 1 <= req.meals_per_day <= 6:
+        raise HTTPException(status_code=400, detail="mealsPerDay must be between 1 and 6")
+
+    try:
+        return await create_multi_day_plan_async(
+            req.goal, n_days=req.num_days, meals_per_day=req.meals_per_day, filters=req.recipe_filter()
+        )
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:  # Gemini is down; don't queue more calls behind it
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_in))})
+    except InfeasiblePlanError as e:  # catalog too small for a plan without repeats
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class BatchRecommendRequest(BaseModel):
+    goals: List[str]
+    num_meals: int = Field(3, alias="numMeals")
+
+    model_config = {"populate_by_name": True}
+
+
+@app.post("/recommender/batch")
+def recommend_meals_batch(req: BatchRecommendRequest):
+    """
+    Meal plans for many goals, streamed as NDJSON (one line per goal, in order).
+
+    Each line is {"index", "goal", "recipes", "goal_expanded"} or, for a goal
+    that failed, {"index", "goal", "error"}.
+    """
+    if req.num_meals not in [3, 5, 7]:
+        raise HTTPException(status_code=400, detail="numMeals must be one of 3, 5, or 7")
+    if len(req.goals) > MAX_BATCH_GOALS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_GOALS} goals per batch")
+
+    lines = (json.dumps(result) + "\n" for result in iter_meal_plans(req.goals, n_meals=req.num_meals))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
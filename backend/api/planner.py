@@ -0,0 +1,211 @@
+"""
+planner.py — Multi-day meal plans that meet daily nutrient targets
+
+Given a pool of candidate recipes (their per-recipe nutrient vectors and
+relevance scores), pick ``meals_per_day`` recipes for each of ``n_days`` so
+that every day's totals land within ``tolerance`` of the daily targets and no
+recipe is used twice.
+
+The solver is a greedy construction followed by local search, both
+vectorized over the candidate pool:
+
+1. Greedy: fill each meal slot with the unused candidate closest to
+   "what is still missing today / slots left".
+2. Local search until no move helps or the time budget runs out: replace
+   one meal with an unused candidate, replace two meals of a day that is
+   still out of tolerance, or swap two meals between days.
+
+Day cost = tolerance violations (dominant) + mean relative error + a small
+relevance reward, so among feasible plans the more relevant one wins.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+VIOLATION_WEIGHT = 10.0  # tolerance violations dominate closeness and relevance
+PAIR_SHORTLIST = 60  # unused candidates considered for two-meal replacements
+
+
+class InfeasiblePlanError(ValueError):
+    """The candidate pool is too small for a plan without repeated recipes."""
+
+
+@dataclass
+class MultiDayPlan:
+    days: list  # per day, candidate indices of its meals
+    totals: np.ndarray  # (n_days, n_nutrients) summed nutrients
+    within_tolerance: list  # per day, every targeted nutrient within tolerance
+    cost: float
+    iterations: int = 0
+    seconds: float = 0.0
+    stats: dict = field(default_factory=dict)
+
+
+class DayCost:
+    """Vectorized day cost for many candidate day totals at once."""
+
+    def __init__(self, targets, tolerance, relevance, relevance_weight, meals_per_day):
+        targets = np.asarray(targets, dtype=np.float64)
+        self.mask = ~np.isnan(targets) & (targets > 0)
+        self.targets = targets[self.mask]
+        self.tolerance = tolerance
+        self.relevance = np.asarray(relevance, dtype=np.float64)
+        self.relevance_weight = relevance_weight / meals_per_day
+
+    def relative_error(self, totals):
+        return totals[..., self.mask] / self.targets - 1
+
+    def __call__(self, totals, relevance_sum):
+        """``totals`` (..., n_nutrients) and the summed relevance of the same days."""
+        cost = -self.relevance_weight * relevance_sum
+        if self.mask.any():
+            error = np.abs(self.relative_error(totals))
+            cost = cost + VIOLATION_WEIGHT * np.maximum(error - self.tolerance, 0).sum(axis=-1) + error.mean(axis=-1)
+        return cost
+
+    def within(self, totals):
+        if not self.mask.any():
+            return np.ones(len(totals), dtype=bool)
+        return (np.abs(self.relative_error(totals)) <= self.tolerance + 1e-9).all(axis=-1)
+
+
+def _greedy(nutrients, targets, cost, n_days, meals_per_day):
+    """Fill slots day by day with the candidate closest to the remaining per-slot need."""
+    n = len(nutrients)
+    used = np.zeros(n, dtype=bool)
+    scale = np.where(cost.mask, np.nan_to_num(targets, nan=1.0), 1.0)
+    days = []
+    for _ in range(n_days):
+        day, totals = [], np.zeros(nutrients.shape[1])
+        for slot in range(meals_per_day):
+            need = (np.nan_to_num(targets) - totals) / (meals_per_day - slot)
+            gap = np.abs((nutrients - need) / scale)[:, cost.mask].mean(axis=1) if cost.mask.any() else np.zeros(n)
+            score = gap - cost.relevance_weight * cost.relevance
+            score[used] = np.inf
+            pick = int(np.argmin(score))
+            used[pick] = True
+            day.append(pick)
+            totals = totals + nutrients[pick]
+        days.append(day)
+    return days, used
+
+
+def _best_pair_replacement(nutrients, cost, day, day_total, day_rel, pool):
+    """Best (cost, (slot_i, slot_j), (new_i, new_j)) replacing two slots with two of ``pool``."""
+    best = None
+    pair_totals = nutrients[pool][:, None, :] + nutrients[pool][None, :, :]  # (P, P, F)
+    pair_rel = cost.relevance[pool][:, None] + cost.relevance[pool][None, :]
+    upper = np.triu(np.ones((len(pool), len(pool)), dtype=bool), 1)  # distinct, unordered pairs
+    for i in range(len(day)):
+        for j in range(i + 1, len(day)):
+            base = day_total - nutrients[day[i]] - nutrients[day[j]]
+            base_rel = day_rel - cost.relevance[day[i]] - cost.relevance[day[j]]
+            costs = np.where(upper, cost(base + pair_totals, base_rel + pair_rel), np.inf)
+            a, b = np.unravel_index(np.argmin(costs), costs.shape)
+            if best is None or costs[a, b] < best[0]:
+                best = (costs[a, b], (i, j), (int(pool[a]), int(pool[b])))
+    return best
+
+
+def plan_days(nutrients, relevance, targets, n_days, meals_per_day=3, tolerance=0.1,
+              time_budget=0.5, relevance_weight=0.2):
+    """
+    Choose ``meals_per_day`` distinct candidates for each of ``n_days``.
+
+    ``nutrients`` is (candidates, n_nutrients), ``targets`` the daily targets
+    (NaN = no target). Raises InfeasiblePlanError if the pool is too small to avoid repeats.
+    """
+    started = time.perf_counter()
+    nutrients = np.asarray(nutrients, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    n = len(nutrients)
+    if n < n_days * meals_per_day:
+        raise InfeasiblePlanError(f"Need at least {n_days * meals_per_day} candidate recipes, got {n}")
+
+    cost = DayCost(targets, tolerance, relevance, relevance_weight, meals_per_day)
+    days, used = _greedy(nutrients, targets, cost, n_days, meals_per_day)
+    days = np.array(days, dtype=np.int64)  # (n_days, meals_per_day)
+    totals = nutrients[days].sum(axis=1)
+    rel_sums = cost.relevance[days].sum(axis=1)
+    day_costs = cost(totals, rel_sums)
+    greedy_cost = float(day_costs.sum())
+
+    deadline = started + time_budget
+    iterations = replaced = swapped = 0
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        iterations += 1
+        # Worst days first: that is where moves pay off most.
+        for d in np.argsort(-day_costs):
+            if time.perf_counter() >= deadline:
+                break
+            # (a) Replace one meal of day d with an unused candidate: all (slot, candidate) pairs at once.
+            unused = np.flatnonzero(~used)
+            if len(unused):
+                base = totals[d] - nutrients[days[d]]  # (slots, nutrients): day without that slot
+                new_totals = base[:, None, :] + nutrients[unused][None, :, :]
+                new_rel = (rel_sums[d] - cost.relevance[days[d]])[:, None] + cost.relevance[unused][None, :]
+                delta = cost(new_totals, new_rel) - day_costs[d]
+                slot, pos = np.unravel_index(np.argmin(delta), delta.shape)
+                if delta[slot, pos] < -1e-9:
+                    used[days[d, slot]] = False
+                    days[d, slot] = unused[pos]
+                    used[unused[pos]] = True
+                    totals[d], rel_sums[d] = new_totals[slot, pos], new_rel[slot, pos]
+                    day_costs[d] = cost(totals[d], rel_sums[d])
+                    replaced += 1
+                    improved = True
+                    continue
+
+                # (b) Still infeasible: replace two meals at once, from the shortlist of
+                # unused candidates that came closest in (a).
+                if not cost.within(totals[d][None])[0] and meals_per_day >= 2:
+                    short = np.argsort(delta.min(axis=0))[:PAIR_SHORTLIST]
+                    move = _best_pair_replacement(nutrients, cost, days[d], totals[d], rel_sums[d], unused[short])
+                    if move is not None and move[0] < day_costs[d] - 1e-9:
+                        _, (i, j), (a, b) = move
+                        used[[days[d, i], days[d, j]]] = False
+                        days[d, i], days[d, j] = a, b
+                        used[[a, b]] = True
+                        totals[d] = nutrients[days[d]].sum(axis=0)
+                        rel_sums[d] = cost.relevance[days[d]].sum()
+                        day_costs[d] = cost(totals[d], rel_sums[d])
+                        replaced += 2
+                        improved = True
+                        continue
+
+            # (c) Swap a meal of day d with a meal of any other day.
+            others = np.array([e for e in range(n_days) if e != d], dtype=np.int64)
+            if not len(others):
+                continue
+            mine = nutrients[days[d]]  # (slots, F)
+            theirs = nutrients[days[others]]  # (others, slots, F)
+            diff = theirs[None, :, :, :] - mine[:, None, None, :]  # (my slot, other day, their slot, F)
+            rel_diff = cost.relevance[days[others]][None] - cost.relevance[days[d]][:, None, None]
+            d_cost = cost(totals[d] + diff, rel_sums[d] + rel_diff)
+            o_cost = cost(totals[others][None, :, None, :] - diff, rel_sums[others][None, :, None] - rel_diff)
+            delta = d_cost + o_cost - day_costs[d] - day_costs[others][None, :, None]
+            i, o, j = np.unravel_index(np.argmin(delta), delta.shape)
+            if delta[i, o, j] < -1e-9:
+                e = others[o]
+                days[d, i], days[e, j] = days[e, j], days[d, i]
+                for day in (d, e):
+                    totals[day] = nutrients[days[day]].sum(axis=0)
+                    rel_sums[day] = cost.relevance[days[day]].sum()
+                    day_costs[day] = cost(totals[day], rel_sums[day])
+                swapped += 1
+                improved = True
+
+    return MultiDayPlan(
+        days=days.tolist(),
+        totals=totals,
+        within_tolerance=cost.within(totals).tolist(),
+        cost=float(day_costs.sum()),
+        iterations=iterations,
+        seconds=time.perf_counter() - started,
+        stats={"greedy_cost": greedy_cost, "replaced_meals": replaced, "swaps": swapped,
+               "timed_out": time.perf_counter() >= deadline},
+    )
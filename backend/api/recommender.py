@@ -2,76 +2,370 @@
 recommender.py — Lazy-load + Render-safe version
 """
 
+import asyncio
 import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
 
-
-import pandas as pd
-import torch
+import numpy as np
 from dotenv import load_dotenv
-from google import genai
-from sentence_transformers import SentenceTransformer, util
-from sklearn.cluster import KMeans
-from supabase import create_client
+from epicourier_retry import CircuitBreaker, RetryPolicy, default_classify
+from pydantic import BaseModel, Field
+
+from api.batching import BatchingEncoder
+from api.catalog import RecipeCatalog
+from api.catalog_refresh import CatalogRefresher, CatalogSnapshot, Watermark, fetch_catalog_delta
+from api.diversity import select_diverse
+from api.embedding_store import EmbeddingStore
+from api.filters import FilterIndex
+from api.planner import plan_days
+from api.retrieval import build_index, top_k_indices
+from api.scoring import NUTRIENT_COLUMNS, blend_scores, rollup_nutrient_matrix
+from api.stages import StageConfig, Stages
+from api.supabase_loader import load_tables
+from api.warmup import Warmup
 
 # --------------------------------------------------
 # 1. Global setup
 # --------------------------------------------------
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print(f"Using device: {DEVICE}")
-
+# Heavy dependencies (torch, sentence_transformers, sklearn, google.genai,
+# supabase) are imported inside the loaders that need them, so importing this
+# module (and api.index) stays cheap for every worker and test run.
 load_dotenv()
 SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 GEMINI_KEY = os.getenv("GEMINI_KEY")
 
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# Inference backend: "torch", "onnx" (ONNX Runtime) or "onnx-int8" (quantized ONNX,
+# CPU only). The ONNX backends need `pip install "sentence-transformers[onnx]"`.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+ONNX_INT8_FILE = os.getenv("ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDING_STORE_DIR = os.getenv(
+    "EMBEDDING_STORE_DIR", str(Path(__file__).resolve().parent.parent / ".cache" / "embeddings")
+)
+# Goal embeddings of concurrent requests are encoded together: a batch is sent
+# after ENCODE_MAX_WAIT_MS or once ENCODE_MAX_BATCH goals are queued.
+ENCODE_MAX_BATCH = int(os.getenv("ENCODE_MAX_BATCH", "32"))
+ENCODE_MAX_WAIT_MS = float(os.getenv("ENCODE_MAX_WAIT_MS", "5"))
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GOAL_PROMPT_VERSION = "v1"  # bump whenever the goal_expansion prompt/schema changes
+# Gemini calls: per-request timeout (seconds), then retries on connection / 5xx / timeout
+# errors (see epicourier_retry). After GEMINI_BREAKER_THRESHOLD consecutive connection or 5xx
+# failures, requests fail fast with HTTP 503 for GEMINI_BREAKER_RESET seconds.
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "10"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+
+GOAL_CACHE_SIZE = int(os.getenv("GOAL_CACHE_SIZE", "1024"))
+GOAL_CACHE_TTL = float(os.getenv("GOAL_CACHE_TTL", str(24 * 60 * 60)))
+GOAL_CACHE_PATH = os.getenv("GOAL_CACHE_PATH")  # SQLite file shared by workers; unset = in-memory only
+
+# Ranking: share of the score that comes from nutrient distance (rest is semantic similarity).
+NUTRIENT_WEIGHT = float(os.getenv("NUTRIENT_WEIGHT", "0.3"))
+MEALS_PER_DAY = 3  # daily targets are split evenly across this many meals
+
+# Diversity among the top-ranked recipes: "mmr", "k-center" or "kmeans". For MMR,
+# DIVERSITY_TRADE_OFF weighs relevance (1.0) against novelty (0.0).
+DIVERSITY_METHOD = os.getenv("DIVERSITY_METHOD", "mmr")
+DIVERSITY_TRADE_OFF = float(os.getenv("DIVERSITY_TRADE_OFF", "0.7"))
+
+# Retrieval: "exact" (NumPy) or "hnsw" (approximate, needs hnswlib). ANN backends
+# return this many semantic candidates, which are then re-scored with nutrients.
+RETRIEVAL_INDEX = os.getenv("RETRIEVAL_INDEX", "exact")
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "200"))
+
+# Batch plans (/recommender/batch): unique goals encoded + ranked per chunk, and
+# how many Gemini expansions run at once.
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+MAX_BATCH_GOALS = int(os.getenv("MAX_BATCH_GOALS", "10000"))
+
+# Multi-day planner (/planner): candidate pool size, allowed relative deviation
+# from each daily nutrient target, and local-search time budget per plan (seconds).
+PLANNER_CANDIDATES = int(os.getenv("PLANNER_CANDIDATES", "200"))
+PLANNER_TOLERANCE = float(os.getenv("PLANNER_TOLERANCE", "0.1"))
+PLANNER_TIME_BUDGET = float(os.getenv("PLANNER_TIME_BUDGET", "0.5"))
+
+# Preload model, catalog and index in the background on startup (0 = load on first request).
+WARMUP_ON_STARTUP = os.getenv("RECOMMENDER_WARMUP", "1") != "0"
+
+# Seconds between polls for new/changed recipes (0 disables the background refresher).
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "300"))
+
+# Async endpoint: per-stage concurrency and timeout (seconds), overridable with
+# RECOMMENDER_<STAGE>_CONCURRENCY / RECOMMENDER_<STAGE>_TIMEOUT. CPU stages share
+# a dedicated pool of CPU_WORKERS threads.
+CPU_WORKERS = int(os.getenv("RECOMMENDER_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+STAGE_CONFIGS = {
+    "llm": StageConfig.from_env("llm", concurrency=32, timeout=30),
+    "catalog": StageConfig.from_env("catalog", concurrency=CPU_WORKERS, timeout=300),  # cold start loads everything
+    "encode": StageConfig.from_env("encode", concurrency=256, timeout=10),
+    "rank": StageConfig.from_env("rank", concurrency=CPU_WORKERS, timeout=10),
+    "diversity": StageConfig.from_env("diversity", concurrency=CPU_WORKERS, timeout=10),
+    "plan": StageConfig.from_env("plan", concurrency=CPU_WORKERS, timeout=30),
+}
+
 
 # --------------------------------------------------
 # 2. Lazy loaders
 # --------------------------------------------------
 @lru_cache()
 def load_supabase():
+    from supabase import create_client
+
     print("Connecting to Supabase ...")
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-@lru_cache()
-def load_recipe_data():
-    """Load and merge recipe data only once."""
-    print("Loading recipe data from Supabase ...")
-    supabase = load_supabase()
+def load_recipe_catalog():
+    """Columnar recipe catalog of the current snapshot."""
+    return current_catalog().recipes
+
+
+def load_nutrient_matrix():
+    """Per-recipe nutrient totals aligned with load_recipe_catalog() rows."""
+    return current_catalog().nutrient_matrix
+
+
+def load_recipe_embeddings():
+    """Catalog embeddings aligned with load_recipe_catalog() rows."""
+    return current_catalog().embeddings
 
-    ingredients = pd.DataFrame(supabase.table("Ingredient").select("*").execute().data)
-    recipes = pd.DataFrame(supabase.table("Recipe").select("*").execute().data)
-    recipe_ing_map = pd.DataFrame(supabase.table("Recipe-Ingredient_Map").select("*").execute().data)
-    tags = pd.DataFrame(supabase.table("RecipeTag").select("*").execute().data)
-    recipe_tag_map = pd.DataFrame(supabase.table("Recipe-Tag_Map").select("*").execute().data)
 
-    # Merge metadata
-    recipe_tags = recipe_tag_map.merge(tags, left_on="tag_id", right_on="id", suffixes=("", "_tag"))
-    recipe_tags = recipe_tags.groupby("recipe_id")["name"].apply(list).reset_index(name="tags")
+def load_retrieval_index():
+    """Retrieval index over the current catalog embeddings."""
+    return current_catalog().index
 
-    recipe_ing = recipe_ing_map.merge(ingredients, left_on="ingredient_id", right_on="id", suffixes=("", "_ing"))
-    recipe_ing = recipe_ing.groupby("recipe_id")["name"].apply(list).reset_index(name="ingredients")
 
-    recipe_data = recipes.merge(recipe_tags, left_on="id", right_on="recipe_id", how="left")
-    recipe_data = recipe_data.merge(recipe_ing, left_on="id", right_on="recipe_id", how="left")
+def embedder_options(backend):
+    """SentenceTransformer keyword arguments for an EMBED_BACKEND value."""
+    if backend == "torch":
+        return {}
+    if backend == "onnx":
+        return {"backend": "onnx"}
+    if backend == "onnx-int8":
+        return {"backend": "onnx", "model_kwargs": {"file_name": ONNX_INT8_FILE}}
+    raise ValueError(f"Unknown EMBED_BACKEND {backend!r} (expected torch, onnx or onnx-int8)")
+
+
+def embedding_model_id(backend=None):
+    """
+    Name the embedding store is keyed by.
+
+    Backends agree only within a tolerance, so each keeps its own vectors;
+    goals and recipes are always encoded by the same backend.
+    """
+    backend = backend or EMBED_BACKEND
+    return EMBED_MODEL_NAME if backend == "torch" else f"{EMBED_MODEL_NAME}@{backend}"
+
+
+@lru_cache()
+def load_device():
+    import torch
 
-    recipe_data["tags"] = recipe_data["tags"].apply(lambda x: x if isinstance(x, list) else [])
-    recipe_data["ingredients"] = recipe_data["ingredients"].apply(lambda x: x if isinstance(x, list) else [])
-    return recipe_data
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using device: {device}")
+    return device
 
 
 @lru_cache()
 def load_embedder():
-    print("Loading sentence-transformer model ...")
-    return SentenceTransformer("all-MiniLM-L6-v2", device=DEVICE)
+    print(f"Loading sentence-transformer model ({EMBED_BACKEND}) ...")
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBED_MODEL_NAME, device=load_device(), **embedder_options(EMBED_BACKEND))
+
+
+@lru_cache()
+def load_goal_encoder():
+    """Micro-batching queue in front of load_embedder() for per-request goal texts."""
+    return BatchingEncoder(
+        lambda texts: load_embedder().encode(texts, normalize_embeddings=True),
+        max_batch=ENCODE_MAX_BATCH,
+        max_wait=ENCODE_MAX_WAIT_MS / 1000,
+    )
+
+
+@lru_cache()
+def load_embedding_store():
+    return EmbeddingStore(EMBEDDING_STORE_DIR, embedding_model_id())
+
+
+@lru_cache()
+def load_goal_cache():
+    return GoalCache(GOAL_CACHE_SIZE, GOAL_CACHE_TTL, path=GOAL_CACHE_PATH)
 
 
 @lru_cache()
 def load_gemini_client():
+    from google import genai
+    from google.genai import types
+
     print("Initializing Gemini client ...")
-    return genai.Client(api_key=GEMINI_KEY)
+    return genai.Client(api_key=GEMINI_KEY, http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000)))
+
+
+# --------------------------------------------------
+# 2b. Catalog snapshots (built once, refreshed incrementally)
+# --------------------------------------------------
+_catalog = None
+_catalog_lock = threading.Lock()
+_refresher = None
+
+
+def _step_timer(timings):
+    """``step(name)`` records the seconds since the previous step under ``timings[name]``."""
+    start = time.perf_counter()
+
+    def step(name):
+        nonlocal start
+        now = time.perf_counter()
+        timings[name] = round(now - start, 3)
+        start = now
+
+    return step
+
+
+def _rollup(recipes, tables):
+    return rollup_nutrient_matrix(
+        recipes.ids, tables.get("recipe_nutrition"), tables["recipe_ing_map"], tables["ingredients"]
+    )
+
+
+def _snapshot(recipes, nutrient_matrix, watermark, timings, step):
+    """Embeddings, index and filters for ``recipes``; only texts missing from the store get encoded."""
+    embeddings = get_recipe_embeddings(recipes)
+    step("embeddings")
+    store = load_embedding_store()
+    index = build_index(embeddings, RETRIEVAL_INDEX, path=store.artifact_path(f".{RETRIEVAL_INDEX}"))
+    store.prune_artifacts(f".{RETRIEVAL_INDEX}")
+    step("index")
+    filters = FilterIndex(recipes)
+    step("filters")
+    return CatalogSnapshot(
+        recipes=recipes,
+        embeddings=embeddings,
+        nutrient_matrix=nutrient_matrix,
+        index=index,
+        filters=filters,
+        watermark=watermark,
+        timings=timings,
+    )
+
+
+def build_catalog(tables, timings=None):
+    """Build a complete snapshot from the raw tables, which are not kept."""
+    timings = dict(timings or {})
+    step = _step_timer(timings)
+    recipes = RecipeCatalog.from_tables(tables)
+    step("recipes")
+    nutrient_matrix = _rollup(recipes, tables)
+    step("nutrients")
+    return _snapshot(recipes, nutrient_matrix, Watermark.of(tables["recipes"]), timings, step)
+
+
+def merge_catalog(old, delta):
+    """New snapshot with the recipes of ``delta`` (see fetch_catalog_delta) merged into ``old``."""
+    timings = {}
+    step = _step_timer(timings)
+    changed = RecipeCatalog.from_tables(delta)
+    recipes = old.recipes.merge(changed)
+    step("recipes")
+    keep = ~np.isin(old.recipes.ids, changed.ids)
+    nutrient_matrix = np.concatenate([old.nutrient_matrix[keep], _rollup(changed, delta)])
+    step("nutrients")
+    return _snapshot(recipes, nutrient_matrix, old.watermark.merge(Watermark.of(delta["recipes"])), timings, step)
+
+
+def current_catalog():
+    """The live catalog snapshot, loaded from Supabase on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                print("Loading recipe data from Supabase ...")
+                start = time.perf_counter()
+                tables, _ = load_tables(load_supabase())
+                _catalog = build_catalog(tables, {"tables": round(time.perf_counter() - start, 3)})
+    return _catalog
+
+
+def refresh_catalog():
+    """Merge recipes changed since the current snapshot and atomically swap in a new one."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            return None
+        old = _catalog
+        delta = fetch_catalog_delta(load_supabase(), old.watermark)
+        if delta is None:
+            return old
+        print(f"Refreshing catalog: {len(delta['recipes'])} new/changed recipes ...")
+        _catalog = merge_catalog(old, delta)
+        return _catalog
+
+
+def start_catalog_refresher(interval=None):
+    """Start polling for catalog changes every ``interval`` seconds (0 disables)."""
+    global _refresher
+    interval = CATALOG_REFRESH_INTERVAL if interval is None else interval
+    if interval > 0 and _refresher is None:
+        _refresher = CatalogRefresher(refresh_catalog, interval).start()
+    return _refresher
+
+
+def stop_catalog_refresher():
+    global _refresher
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+
+
+def reset_catalog():
+    """Drop the current snapshot (next access reloads from Supabase)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+# --------------------------------------------------
+# 2c. Startup warmup
+# --------------------------------------------------
+_warmup = None
+
+
+def warmup_steps():
+    """Everything the first request would otherwise load, in dependency order."""
+    return [
+        ("gemini_client", load_gemini_client),
+        ("embedder", load_embedder),
+        ("goal_encoder", lambda: load_goal_encoder().encode("warmup")),  # first forward pass
+        ("embedding_store", load_embedding_store),
+        ("catalog", lambda: current_catalog().timings),  # tables, embeddings, nutrients, index
+    ]
+
+
+def start_warmup():
+    """Run warmup_steps() once in the background; see warmup_status()."""
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup(warmup_steps()).start()
+    return _warmup
+
+
+def warmup_status():
+    if _warmup is None:
+        return {"state": "disabled", "ready": True, "timings": {}, "error": None, "retries": 0}
+    return _warmup.status()
 
 
 # --------------------------------------------------
@@ -85,105 +379,522 @@ def make_recipe_text(row):
     )
 
 
-def get_recipe_embeddings(recipe_data):
-    """Compute embeddings for all recipes (cached)."""
-    embedder = load_embedder()
-    if "recipe_text" not in recipe_data.columns:
-        recipe_data["recipe_text"] = recipe_data.apply(make_recipe_text, axis=1)
-    print("Computing recipe embeddings ...")
-    embeddings = embedder.encode(recipe_data["recipe_text"].tolist(), convert_to_tensor=True)
-    return embeddings
+def get_recipe_embeddings(recipes):
+    """Return embeddings for all recipes, encoding only rows missing from the on-disk store."""
+    store = load_embedding_store()
+    texts = [make_recipe_text(recipes.row(i)) for i in range(len(recipes))]
+    return store.sync(
+        recipes.ids.tolist(), texts, lambda batch: load_embedder().encode(batch, normalize_embeddings=True)
+    )
+
+# Overlaps the Gemini round-trip with catalog/model loading in create_meal_plan.
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="recommender-io")
+# Limits/timeouts for the async pipeline (create_meal_plan_async).
+stages = Stages(STAGE_CONFIGS, cpu_workers=CPU_WORKERS)
+
 
-client = load_gemini_client()
 # --------------------------------------------------
 # 4. Gemini-based goal expansion
 # --------------------------------------------------
-def nutrition_goal(goal_text):
-    """Translate a user's goal into target nutritional values using Gemini."""
-    prompt = f"""
+class NutrientTargets(BaseModel):
+    """Daily nutrient targets, named after the Ingredient table columns."""
+
+    calories_kcal: Optional[float] = None
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    sugars_g: Optional[float] = None
+    agg_fats_g: Optional[float] = Field(None, description="total fats in grams")
+    cholesterol_mg: Optional[float] = None
+    agg_minerals_mg: Optional[float] = Field(None, description="total minerals in milligrams")
+    vit_a_microg: Optional[float] = None
+    agg_vit_b_mg: Optional[float] = Field(None, description="total B vitamins in milligrams")
+    vit_c_mg: Optional[float] = None
+    vit_d_microg: Optional[float] = None
+    vit_e_mg: Optional[float] = None
+    vit_k_microg: Optional[float] = None
+
+    def to_vector(self):
+        """Targets as a float vector aligned with NUTRIENT_COLUMNS (NaN = no target)."""
+        values = self.model_dump()
+        return np.array([np.nan if values[c] is None else values[c] for c in NUTRIENT_COLUMNS], dtype=np.float64)
+
+
+class GoalExpansion(BaseModel):
+    """Structured Gemini output shared by the ranking query and the API response."""
+
+    targets: NutrientTargets
+    summary: str = Field(description="short explanation of the daily nutrient targets for this goal")
+
+
+def format_targets(targets):
+    """Render targets as the terse 'name: value' text that is embedded for ranking."""
+    return ", ".join(f"{name}: {value:g}" for name, value in targets.model_dump().items() if value is not None)
+
+
+def goal_prompt(goal_text):
+    return f"""
     Your task is to translate a user's specific diet goal into precise, target nutritional values for a daily meal plan.
-    Just provide the nutritional values without any additional explanation or context.
+    Fill `targets` with numeric daily values (leave a nutrient empty if the goal says nothing about it),
+    and `summary` with a short explanation of those targets that names each nutrient.
 
     **GOAL:** {goal_text}
 
-    You may include: calories_kcal, protein_g, carbs_g, sugars_g, total_fats_g,
-    cholesterol_mg, total_minerals_mg, vit_a_microg, total_vit_b_mg,
+    You may include: calories_kcal, protein_g, carbs_g, sugars_g, agg_fats_g (total fats),
+    cholesterol_mg, agg_minerals_mg (total minerals), vit_a_microg, agg_vit_b_mg (total B vitamins),
     vit_c_mg, vit_d_microg, vit_e_mg, vit_k_microg
     """
-    response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-    return response.text.strip()
 
-def expand_goal(goal_text):
-    """Translate a user's goal into nutrition information using Gemini."""
 
-    prompt = f"""
-    Your task is to translate a user's specific diet goal into precise, target nutritional values for a daily meal plan.
+GOAL_EXPANSION_CONFIG = {"response_mime_type": "application/json", "response_schema": GoalExpansion}
 
-    **GOAL:** {goal_text}
 
-    You may include: calories_kcal, protein_g, carbs_g, sugars_g, total_fats_g, cholesterol_mg, total_minerals_mg, vit_a_microg, total_vit_b_mg, vit_c_mg, vit_d_microg, vit_e_mg, vit_k_microg
-    """
+def parse_goal_expansion(response):
+    if isinstance(response.parsed, GoalExpansion):
+        return response.parsed
+    return GoalExpansion.model_validate_json(response.text)
+
+
+def classify_gemini_error(exc):
+    """Retry kind (see epicourier_retry) of an error raised by the google-genai client."""
+    import httpx
+    from google.genai import errors
+
+    if isinstance(exc, errors.APIError):
+        return "server" if (exc.code or 0) >= 500 or exc.code == 429 else None
+    if isinstance(exc, httpx.ConnectTimeout):
+        return "connect"
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "connect"
+    return default_classify(exc)
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
+
+# A few quick retries only: the whole llm stage is bounded by its stage timeout.
+GEMINI_RETRY = RetryPolicy(
+    name="gemini", attempts={"connect": 3, "server": 3, "timeout": 2}, base_delay=0.25, max_delay=2.0,
+    classify=classify_gemini_error,
+)
+GEMINI_BREAKER = CircuitBreaker("gemini", GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_RESET)
+
+
+def goal_expansion(goal_text):
+    """Translate a user's goal into nutrient targets + explanation with a single Gemini call."""
+    response = GEMINI_RETRY.call(
+        load_gemini_client().models.generate_content,
+        model=GEMINI_MODEL, contents=goal_prompt(goal_text), config=GOAL_EXPANSION_CONFIG, breaker=GEMINI_BREAKER,
+    )
+    return parse_goal_expansion(response)
+
+
+async def goal_expansion_async(goal_text):
+    """goal_expansion() on the async Gemini client; never blocks the event loop."""
+    response = await GEMINI_RETRY.call_async(
+        load_gemini_client().aio.models.generate_content,
+        model=GEMINI_MODEL, contents=goal_prompt(goal_text), config=GOAL_EXPANSION_CONFIG, breaker=GEMINI_BREAKER,
     )
-    return response.text.strip()
+    return parse_goal_expansion(response)
+
+
+# --------------------------------------------------
+# 4b. Goal-expansion cache
+# --------------------------------------------------
+def normalize_goal(goal_text):
+    """Case-, whitespace- and punctuation-insensitive form of a goal used as cache key."""
+    text = goal_text.lower()
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", text).split())
+    return normalized or " ".join(text.split())
+
+
+class GoalCache:
+    """
+    Bounded LRU cache with TTL for goal expansions (JSON strings).
+
+    Entries live in memory; with ``path`` set they are also written to SQLite so
+    they survive restarts and are shared between uvicorn workers.
+    """
+
+    def __init__(self, max_entries=1024, ttl=24 * 60 * 60, path=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS goal_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(goal_text, model=GEMINI_MODEL, prompt_version=GOAL_PROMPT_VERSION):
+        return f"{model}|{prompt_version}|{normalize_goal(goal_text)}"
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT stored_at, value FROM goal_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+            if entry is not None and now - entry[0] > self.ttl:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._db.execute("UPDATE goal_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        now = self.clock()
+        with self._lock:
+            self._remember(key, (now, value))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO goal_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+                self._db.execute(
+                    "DELETE FROM goal_cache WHERE stored_at < ? OR key NOT IN "
+                    "(SELECT key FROM goal_cache ORDER BY accessed_at DESC LIMIT ?)",
+                    (now - self.ttl, self.max_entries),
+                )
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM goal_cache WHERE key = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def cached_goal_expansion(goal_text):
+    """goal_expansion() behind the goal cache."""
+    cache = load_goal_cache()
+    key = GoalCache.make_key(goal_text)
+    cached = cache.get(key)
+    if cached is not None:
+        return GoalExpansion.model_validate_json(cached)
+    expansion = goal_expansion(goal_text)
+    cache.set(key, expansion.model_dump_json())
+    return expansion
+
+
+async def cached_goal_expansion_async(goal_text):
+    """goal_expansion_async() behind the goal cache; SQLite access runs off the event loop."""
+    cache = await asyncio.to_thread(load_goal_cache)
+    key = GoalCache.make_key(goal_text)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return GoalExpansion.model_validate_json(cached)
+    expansion = await goal_expansion_async(goal_text)
+    await asyncio.to_thread(cache.set, key, expansion.model_dump_json())
+    return expansion
+
+
+def nutrition_goal(goal_text, expansion=None):
+    """Daily nutrient targets for a goal as a vector aligned with NUTRIENT_COLUMNS."""
+    expansion = expansion or cached_goal_expansion(goal_text)
+    return expansion.targets.to_vector()
+
+
+def goal_query_text(goal_text, expansion=None):
+    """Text embedded for semantic ranking: the formatted targets, or the goal itself."""
+    expansion = expansion or cached_goal_expansion(goal_text)
+    return format_targets(expansion.targets) or goal_text
+
+
+def expand_goal(goal_text, expansion=None):
+    """Human-readable nutrition information for a goal."""
+    expansion = expansion or cached_goal_expansion(goal_text)
+    return expansion.summary.strip()
+
 
 # --------------------------------------------------
 # 5. Recommendation pipeline
 # --------------------------------------------------
-def rank_recipes_by_goal(goal_text, top_k=20):
-    recipe_data = load_recipe_data()
-    recipe_embeddings = get_recipe_embeddings(recipe_data)
-    embedder = load_embedder()
+class RankedRecipes(NamedTuple):
+    """Catalog positions and their scores, best first."""
+
+    positions: np.ndarray
+    scores: np.ndarray
 
-    nutri_goal = nutrition_goal(goal_text)
-    goal_embedding = embedder.encode(nutri_goal, convert_to_tensor=True)
-    scores = util.cos_sim(goal_embedding, recipe_embeddings)[0].cpu().numpy()
+    def __len__(self):
+        return len(self.positions)
 
-    recipe_data = recipe_data.copy()
-    recipe_data["similarity"] = scores
-    ranked = recipe_data.sort_values(by="similarity", ascending=False).head(top_k)
-    return ranked, nutri_goal
 
+def rank_recipes_by_goal(goal_text, top_k=20, expansion=None, catalog=None, goal_embedding=None, filters=None,
+                         meals_per_day=MEALS_PER_DAY):
+    """
+    Score the catalog against the goal (semantic + nutrient distance).
 
-def select_diverse_recipes(ranked_df, n_meals=3):
-    """Cluster embeddings to ensure diversity among top recipes."""
-    embedder = load_embedder()
-    n_clusters = min(n_meals, len(ranked_df))
-    if len(ranked_df) <= n_meals:
-        return ranked_df
+    Each recipe's nutrients are compared with the daily targets split over
+    ``meals_per_day`` meals.
 
-    sub_embeds = embedder.encode(ranked_df["recipe_text"].tolist())
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init="auto")
-    cluster_labels = kmeans.fit_predict(sub_embeds)
+    ``filters`` (a RecipeFilter) masks the catalog through its precomputed
+    bitsets first; only the remaining recipes are scored, exactly, whatever
+    the retrieval index.
+    """
+    catalog = catalog or current_catalog()
+    index = catalog.index
+
+    nutri_goal = nutrition_goal(goal_text, expansion)
+    if goal_embedding is None:
+        goal_embedding = load_goal_encoder().encode(goal_query_text(goal_text, expansion))
+
+    mask = catalog.filters.mask(filters) if filters is not None else None
+    if mask is not None:
+        positions = np.flatnonzero(mask)
+        semantic = np.asarray(catalog.embeddings[positions]) @ np.asarray(goal_embedding, dtype=np.float32)
+        nutrients = catalog.nutrient_matrix[positions]
+    elif index.exhaustive:
+        positions = None
+        semantic = index.similarities(goal_embedding)
+        nutrients = catalog.nutrient_matrix
+    else:
+        positions, semantic = index.search(goal_embedding, max(top_k, ANN_CANDIDATES))
+        nutrients = catalog.nutrient_matrix[positions]
+    scores = blend_scores(semantic, nutri_goal / meals_per_day, nutrients, NUTRIENT_WEIGHT)
+
+    # Partial selection on the score array; only the k winners are kept.
+    top = top_k_indices(scores, top_k)
+    winners = top if positions is None else positions[top]
+    return RankedRecipes(winners, scores[top]), nutri_goal
+
+
+def rank_goal_matrix(goal_embeddings, targets, catalog, top_k=20):
+    """
+    Rank the catalog for many goals at once: one (goals x recipes) matrix multiply.
 
-    selected_indices = []
-    for c in range(n_clusters):
-        cluster_recipes = ranked_df[cluster_labels == c]
-        top_one = cluster_recipes.sort_values("similarity", ascending=False).head(1)
-        selected_indices.append(top_one.index[0])
-    return ranked_df.loc[selected_indices].sort_values("similarity", ascending=False)
+    Always exhaustive over ``catalog.embeddings``, whatever RETRIEVAL_INDEX is;
+    for large batches the matmul is cheaper than one index query per goal.
+    """
+    semantic = np.asarray(goal_embeddings, dtype=np.float32) @ np.asarray(catalog.embeddings).T
+    ranked = []
+    for row, nutri_goal in zip(semantic, targets):
+        scores = blend_scores(row, nutri_goal / MEALS_PER_DAY, catalog.nutrient_matrix, NUTRIENT_WEIGHT)
+        top = top_k_indices(scores, top_k)
+        ranked.append(RankedRecipes(top, scores[top]))
+    return ranked
 
 
-# CREATE MEAL PLAN
-def create_meal_plan(goal_text, n_meals=3):
-    ranked, nutri_goal = rank_recipes_by_goal(goal_text)
-    diverse = select_diverse_recipes(ranked, n_meals)
-    exp_goal = expand_goal(goal_text)
+def select_diverse_recipes(ranked, n_meals=3, embeddings=None, method=None, trade_off=None):
+    """
+    Pick ``min(n_meals, len(ranked))`` mutually different recipes from the ranking.
 
+    ``embeddings`` is the catalog matrix of the snapshot ``ranked`` came from;
+    rows are looked up by ``ranked.positions``, so the ranked recipes are
+    never re-encoded. ``method`` is one of api.diversity.DIVERSITY_METHODS.
+    """
+    if len(ranked) <= n_meals:
+        return ranked
+
+    if embeddings is None:
+        embeddings = load_recipe_embeddings()
+    selected = select_diverse(
+        np.asarray(embeddings[ranked.positions]),
+        ranked.scores,
+        n_meals,
+        method=method or DIVERSITY_METHOD,
+        trade_off=DIVERSITY_TRADE_OFF if trade_off is None else trade_off,
+    )
+    return RankedRecipes(ranked.positions[selected], ranked.scores[selected])
+
+
+def build_meal_plan(goal_text, catalog, diverse):
     meal_plan = []
-    for i, row in enumerate(diverse.itertuples(), 1):
+    for i, (position, score) in enumerate(zip(diverse.positions, diverse.scores), 1):
+        row = catalog.recipes.row(position)  # rows become dicts only here
         meal_plan.append({
             "meal_number": i,
-            "name": row.name,
-            "tags": row.tags,
-            "key_ingredients": row.ingredients[:10],  # limit to first few
+            "name": row["name"],
+            "tags": row["tags"],
+            "key_ingredients": row["ingredients"][:10],  # limit to first few
             "reason": f"Selected because it aligns with goal '{goal_text}' and differs from other meals.",
-            "similarity_score": round(float(row.similarity), 3),
-            "recipe": row.recipe_text
+            "similarity_score": round(float(score), 3),
+            "recipe": make_recipe_text(row)
         })
+    return meal_plan
+
+
+# CREATE MEAL PLAN
+def create_meal_plan(goal_text, n_meals=3, filters=None):
+    # One Gemini call serves both the ranking query and goal_expanded; it runs
+    # while the catalog, embedding store and model load (a no-op once warm).
+    # The whole request uses one catalog snapshot, even if a refresh swaps it meanwhile.
+    expansion_future = _io_pool.submit(cached_goal_expansion, goal_text)
+    catalog = current_catalog()
+    load_embedder()
+    expansion = expansion_future.result()
+
+    ranked, nutri_goal = rank_recipes_by_goal(goal_text, expansion=expansion, catalog=catalog, filters=filters)
+    diverse = select_diverse_recipes(ranked, n_meals, embeddings=catalog.embeddings)
+    exp_goal = expand_goal(goal_text, expansion)
 
     # print(f"Expanded goal: {exp_goal}\n")
-    return meal_plan, exp_goal
\ No newline at end of file
+    return build_meal_plan(goal_text, catalog, diverse), exp_goal
+
+
+def _warm_catalog():
+    catalog = current_catalog()
+    load_embedder()
+    return catalog
+
+
+async def create_meal_plan_async(goal_text, n_meals=3, filters=None):
+    """
+    create_meal_plan() for the async endpoint.
+
+    The Gemini call is awaited on the async client while blocking work
+    (catalog/model loading, encoding + ranking, clustering) runs on the
+    dedicated CPU executor, each stage under its own concurrency limit and
+    timeout. Raises StageTimeout when a stage overruns.
+    """
+    expansion_task = asyncio.create_task(stages.run("llm", cached_goal_expansion_async(goal_text)))
+    try:
+        catalog = await stages.run_cpu("catalog", _warm_catalog)
+        expansion = await expansion_task
+    finally:
+        expansion_task.cancel()  # no-op once done; stops the LLM call if loading failed
+
+    # Waiting on the batching queue holds no CPU worker.
+    goal_embedding = await stages.run(
+        "encode", asyncio.wrap_future(load_goal_encoder().submit(goal_query_text(goal_text, expansion)))
+    )
+    ranked, _ = await stages.run_cpu(
+        "rank", rank_recipes_by_goal, goal_text,
+        expansion=expansion, catalog=catalog, goal_embedding=goal_embedding, filters=filters,
+    )
+    diverse = await stages.run_cpu("diversity", select_diverse_recipes, ranked, n_meals, embeddings=catalog.embeddings)
+    return build_meal_plan(goal_text, catalog, diverse), expand_goal(goal_text, expansion)
+
+
+# MULTI-DAY PLAN
+def create_multi_day_plan(goal_text, n_days=7, meals_per_day=MEALS_PER_DAY, expansion=None, catalog=None,
+                          filters=None):
+    """
+    ``meals_per_day`` distinct recipes for each of ``n_days`` whose daily totals
+    meet the goal's nutrient targets within PLANNER_TOLERANCE (see api.planner).
+    """
+    expansion = expansion or cached_goal_expansion(goal_text)
+    catalog = catalog or current_catalog()
+    top_k = max(PLANNER_CANDIDATES, 2 * n_days * meals_per_day)
+    ranked, nutri_goal = rank_recipes_by_goal(
+        goal_text, top_k=top_k, expansion=expansion, catalog=catalog, filters=filters, meals_per_day=meals_per_day
+    )
+    plan = plan_days(
+        catalog.nutrient_matrix[ranked.positions], ranked.scores, nutri_goal, n_days, meals_per_day,
+        tolerance=PLANNER_TOLERANCE, time_budget=PLANNER_TIME_BUDGET,
+    )
+
+    days = []
+    for day, (meals, totals, ok) in enumerate(zip(plan.days, plan.totals, plan.within_tolerance), 1):
+        chosen = RankedRecipes(ranked.positions[meals], ranked.scores[meals])
+        days.append({
+            "day": day,
+            "meals": build_meal_plan(goal_text, catalog, chosen),
+            "totals": {name: round(float(value), 1) for name, value in zip(NUTRIENT_COLUMNS, totals)},
+            "within_tolerance": ok,
+        })
+    return {
+        "days": days,
+        "targets": expansion.targets.model_dump(exclude_none=True),
+        "tolerance": PLANNER_TOLERANCE,
+        "goal_expanded": expand_goal(goal_text, expansion),
+        "solver": {"seconds": round(plan.seconds, 4), "iterations": plan.iterations, **plan.stats},
+    }
+
+
+async def create_multi_day_plan_async(goal_text, n_days=7, meals_per_day=MEALS_PER_DAY, filters=None):
+    """create_multi_day_plan() with the same stage limits as create_meal_plan_async()."""
+    expansion_task = asyncio.create_task(stages.run("llm", cached_goal_expansion_async(goal_text)))
+    try:
+        catalog = await stages.run_cpu("catalog", _warm_catalog)
+        expansion = await expansion_task
+    finally:
+        expansion_task.cancel()
+    return await stages.run_cpu(
+        "plan", create_multi_day_plan, goal_text, n_days, meals_per_day,
+        expansion=expansion, catalog=catalog, filters=filters,
+    )
+
+
+# CREATE MEAL PLANS (batch)
+def _batch_result(index, goal_text, outcome, catalog):
+    if isinstance(outcome, Exception):
+        return {"index": index, "goal": goal_text, "error": str(outcome)}
+    diverse, exp_goal = outcome
+    return {"index": index, "goal": goal_text, "recipes": build_meal_plan(goal_text, catalog, diverse),
+            "goal_expanded": exp_goal}
+
+
+def iter_meal_plans(goals, n_meals=3, chunk_size=None):
+    """
+    Yield one result dict per goal, in input order, as soon as it is ready.
+
+    Goals are deduplicated (after normalize_goal), their Gemini expansions run
+    concurrently, and each chunk of unique goals is encoded in one batch and
+    ranked with rank_goal_matrix(). A goal that fails yields ``{"error": ...}``
+    instead of aborting the batch.
+    """
+    goals = list(goals)
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    keys = [normalize_goal(g) for g in goals]
+    first_text = {}
+    for goal_text, key in zip(goals, keys):
+        first_text.setdefault(key, goal_text)
+    unique = [key for key in first_text if key]
+    outcomes = {"": ValueError("Goal cannot be empty")}
+
+    catalog = current_catalog()
+    pool = ThreadPoolExecutor(max_workers=BATCH_LLM_CONCURRENCY, thread_name_prefix="recommender-batch")
+    try:
+        # Queue every expansion up front so later chunks' LLM calls overlap earlier ranking.
+        pending = {key: pool.submit(cached_goal_expansion, first_text[key]) for key in unique}
+        emitted = 0
+        for start in range(0, len(unique), chunk_size):
+            expansions = {}
+            for key in unique[start:start + chunk_size]:
+                try:
+                    expansions[key] = pending.pop(key).result()
+                except Exception as e:
+                    outcomes[key] = e
+
+            ok = list(expansions)
+            if ok:
+                texts = [goal_query_text(first_text[k], expansions[k]) for k in ok]
+                embeddings = np.atleast_2d(load_embedder().encode(texts, normalize_embeddings=True))
+                targets = [nutrition_goal(first_text[k], expansions[k]) for k in ok]
+                for key, ranked in zip(ok, rank_goal_matrix(embeddings, targets, catalog)):
+                    diverse = select_diverse_recipes(ranked, n_meals, embeddings=catalog.embeddings)
+                    outcomes[key] = (diverse, expand_goal(first_text[key], expansions[key]))
+
+            while emitted < len(goals) and keys[emitted] in outcomes:
+                yield _batch_result(emitted, goals[emitted], outcomes[keys[emitted]], catalog)
+                emitted += 1
+        for i in range(emitted, len(goals)):  # only empty goals can be left
+            yield _batch_result(i, goals[i], outcomes[keys[i]], catalog)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_meal_plans(goals, n_meals=3):
+    """Meal plans for many goals (see iter_meal_plans); returns a list in input order."""
+    return list(iter_meal_plans(goals, n_meals))
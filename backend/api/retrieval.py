@@ -0,0 +1,132 @@
+"""
+retrieval.py — Pluggable goal-to-recipe retrieval indexes
+
+Both backends work on unit-normalized vectors (inner product == cosine):
+
+* ``exact`` — brute-force NumPy scores with argpartition top-k. Backed by the
+  embedding store's memory-mapped matrix, so there is nothing extra to persist.
+* ``hnsw`` — approximate nearest neighbours via the optional ``hnswlib``
+  package, persisted next to the embedding store.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+def top_k_indices(scores, k):
+    """Indices of the ``k`` largest scores, best first (argpartition + small sort)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class ExactIndex:
+    """Brute-force inner-product search over the full matrix."""
+
+    name = "exact"
+    exhaustive = True
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def similarities(self, query):
+        return np.asarray(self.vectors @ np.asarray(query, dtype=np.float32), dtype=np.float32)
+
+    def search(self, query, k):
+        sims = self.similarities(query)
+        top = top_k_indices(sims, k)
+        return top, sims[top]
+
+
+class HNSWIndex:
+    """Approximate inner-product search backed by hnswlib."""
+
+    name = "hnsw"
+    exhaustive = False
+
+    def __init__(self, index, size, ef_search=128):
+        self.index = index
+        self.size = size
+        self.index.set_ef(ef_search)
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def build(cls, vectors, m=16, ef_construction=200, ef_search=128):
+        hnswlib = _import_hnswlib()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=max(len(vectors), 1), M=m, ef_construction=ef_construction)
+        if len(vectors):
+            index.add_items(vectors, np.arange(len(vectors)))
+        return cls(index, len(vectors), ef_search=ef_search)
+
+    @classmethod
+    def load(cls, path, dim, size, ef_search=128):
+        hnswlib = _import_hnswlib()
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.load_index(str(path), max_elements=max(size, 1))
+        return cls(index, size, ef_search=ef_search)
+
+    def save(self, path):
+        """Write to a unique temp file, then atomically rename (workers may save the same path at once)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            self.index.save_index(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def search(self, query, k):
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        self.index.set_ef(max(self.index.ef, k))
+        labels, distances = self.index.knn_query(np.asarray(query, dtype=np.float32), k=k)
+        # hnswlib "ip" distance is 1 - inner product.
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise RuntimeError("RETRIEVAL_INDEX=hnsw requires the optional 'hnswlib' package") from e
+    return hnswlib
+
+
+def build_index(vectors, backend="exact", path=None):
+    """
+    Build (or load from ``path``) a retrieval index over ``vectors``.
+
+    ``path`` should encode the catalog version (see EmbeddingStore.fingerprint)
+    so a persisted ANN index is never reused for a different catalog.
+    """
+    if backend == "exact":
+        return ExactIndex(vectors)
+    if backend == "hnsw":
+        if path is not None and Path(path).exists():
+            print(f"Loading HNSW index from {path} ...")
+            return HNSWIndex.load(path, dim=vectors.shape[1], size=len(vectors))
+        print("Building HNSW index ...")
+        index = HNSWIndex.build(vectors)
+        if path is not None:
+            index.save(path)
+        return index
+    raise ValueError(f"Unknown retrieval index backend: {backend!r}")
@@ -0,0 +1,103 @@
+"""
+scoring.py — Vectorized recipe scoring (semantic similarity + nutrient distance)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Nutrient columns shared by the Ingredient table and NutrientTargets.
+NUTRIENT_COLUMNS = [
+    "calories_kcal",
+    "protein_g",
+    "carbs_g",
+    "sugars_g",
+    "agg_fats_g",
+    "cholesterol_mg",
+    "agg_minerals_mg",
+    "vit_a_microg",
+    "agg_vit_b_mg",
+    "vit_c_mg",
+    "vit_d_microg",
+    "vit_e_mg",
+    "vit_k_microg",
+]
+
+
+def build_nutrient_matrix(recipe_ids, recipe_ing_map, ingredients):
+    """
+    Per-recipe nutrient totals, shape (len(recipe_ids), len(NUTRIENT_COLUMNS)).
+
+    Each Ingredient row holds nutrients for one base unit and
+    ``relative_unit_100`` is the amount used in hundredths of that unit, so a
+    recipe's total is sum(ingredient_nutrients * relative_unit_100 / 100).
+    """
+    matrix = np.zeros((len(recipe_ids), len(NUTRIENT_COLUMNS)), dtype=np.float32)
+    if recipe_ing_map.empty or ingredients.empty:
+        return matrix
+
+    per_unit = ingredients.reindex(columns=NUTRIENT_COLUMNS).apply(pd.to_numeric, errors="coerce")
+    per_unit = per_unit.fillna(0).to_numpy(dtype=np.float32)
+    ing_pos = pd.Index(ingredients["id"]).get_indexer(recipe_ing_map["ingredient_id"])
+    rec_pos = pd.Index(recipe_ids).get_indexer(recipe_ing_map["recipe_id"])
+    amounts = pd.to_numeric(recipe_ing_map["relative_unit_100"], errors="coerce").fillna(0).to_numpy(np.float32) / 100
+    valid = (ing_pos >= 0) & (rec_pos >= 0)
+
+    np.add.at(matrix, rec_pos[valid], per_unit[ing_pos[valid]] * amounts[valid, None])
+    return matrix
+
+
+def rollup_nutrient_matrix(recipe_ids, recipe_nutrition, recipe_ing_map, ingredients):
+    """
+    Per-recipe nutrient totals, preferring the precomputed ``recipe_nutrition`` table.
+
+    Recipes missing from the rollup (table absent, or rows not yet written)
+    fall back to build_nutrient_matrix() for just those recipes.
+    """
+    recipe_ids = np.asarray(recipe_ids)
+    matrix = np.zeros((len(recipe_ids), len(NUTRIENT_COLUMNS)), dtype=np.float32)
+    covered = np.zeros(len(recipe_ids), dtype=bool)
+    if recipe_nutrition is not None and not recipe_nutrition.empty:
+        rollup = recipe_nutrition.drop_duplicates("recipe_id", keep="last")
+        pos = pd.Index(rollup["recipe_id"]).get_indexer(recipe_ids)
+        covered = pos >= 0
+        values = rollup.reindex(columns=NUTRIENT_COLUMNS).apply(pd.to_numeric, errors="coerce").fillna(0)
+        matrix[covered] = values.to_numpy(dtype=np.float32)[pos[covered]]
+    if not covered.all():
+        missing = ~covered
+        ids = recipe_ids[missing]
+        subset = recipe_ing_map[recipe_ing_map["recipe_id"].isin(ids)]
+        matrix[missing] = build_nutrient_matrix(ids, subset, ingredients)
+    return matrix
+
+
+def nutrient_similarity(nutrient_matrix, targets):
+    """
+    Score in (0, 1] of how close each recipe is to ``targets`` (NaN = no target).
+
+    Distance is the mean absolute log-ratio over the targeted nutrients, so a
+    recipe at half or double a target is penalized equally regardless of unit.
+    """
+    mask = ~np.isnan(targets)
+    if not mask.any():
+        return np.ones(len(nutrient_matrix), dtype=np.float32)
+    log_ratio = np.log1p(nutrient_matrix[:, mask]) - np.log1p(targets[mask].astype(np.float32))
+    return np.exp(-np.abs(log_ratio).mean(axis=1))
+
+
+def blend_scores(semantic, targets=None, nutrient_matrix=None, nutrient_weight=0.0):
+    """Mix semantic similarity with nutrient similarity; rows of both inputs must align."""
+    semantic = np.asarray(semantic, dtype=np.float32)
+    if targets is None or nutrient_matrix is None or nutrient_weight <= 0 or np.isnan(targets).all():
+        return semantic
+    return (1 - nutrient_weight) * semantic + nutrient_weight * nutrient_similarity(nutrient_matrix, targets)
+
+
+def score_recipes(goal_embedding, recipe_embeddings, targets=None, nutrient_matrix=None, nutrient_weight=0.0):
+    """
+    Blend cosine similarity with nutrient similarity over the whole catalog.
+
+    Embeddings are expected to be unit-normalized, so cosine similarity is one
+    matrix-vector product.
+    """
+    semantic = recipe_embeddings @ np.asarray(goal_embedding, dtype=np.float32)
+    return blend_scores(semantic, targets, nutrient_matrix, nutrient_weight)
@@ -0,0 +1,96 @@
+"""
+stages.py — Concurrency limits and timeouts for async pipeline stages
+
+Each stage (LLM call, ranking, diversity, ...) gets its own semaphore and
+timeout, configurable through ``RECOMMENDER_<STAGE>_CONCURRENCY`` and
+``RECOMMENDER_<STAGE>_TIMEOUT``. CPU-bound stages run on a bounded, dedicated
+thread pool so they never occupy Starlette's request threadpool.
+"""
+
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+
+class StageTimeout(Exception):
+    """A pipeline stage did not finish within its configured timeout."""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"Stage '{stage}' timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+@dataclass(frozen=True)
+class StageConfig:
+    concurrency: int
+    timeout: float
+
+    @classmethod
+    def from_env(cls, stage, concurrency, timeout):
+        prefix = f"RECOMMENDER_{stage.upper()}"
+        return cls(
+            concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+            timeout=float(os.getenv(f"{prefix}_TIMEOUT", timeout)),
+        )
+
+
+class Stages:
+    """Runs coroutines and blocking callables under per-stage limits."""
+
+    def __init__(self, configs, cpu_workers):
+        self.configs = dict(configs)
+        self.executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="recommender-cpu")
+        # asyncio primitives are bound to one event loop; keep a set per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, stage):
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.setdefault(loop, {})
+        if stage not in per_loop:
+            per_loop[stage] = asyncio.Semaphore(self.configs[stage].concurrency)
+        return per_loop[stage]
+
+    async def _limited(self, stage, start):
+        config = self.configs[stage]
+        async with self._semaphore(stage):
+            try:
+                return await asyncio.wait_for(start(), config.timeout)
+            except asyncio.TimeoutError:
+                raise StageTimeout(stage, config.timeout) from None
+
+    async def run(self, stage, coro):
+        """Await ``coro`` with the stage's concurrency limit and timeout."""
+        return await self._limited(stage, lambda: coro)
+
+    async def run_cpu(self, stage, fn, *args, **kwargs):
+        """
+        Run blocking ``fn`` on the dedicated executor under the stage's limits.
+
+        Work is only submitted once a slot is free, and the slot is held until
+        the call actually returns. On timeout the request fails fast, but the
+        still-running call keeps its slot, so timed-out work cannot pile up in
+        the executor beyond the stage's concurrency.
+        """
+        config = self.configs[stage]
+        semaphore = self._semaphore(stage)
+        await semaphore.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def finished(done):
+            semaphore.release()
+            if not done.cancelled():
+                done.exception()  # retrieved, so an abandoned failure is not logged as unhandled
+
+        future.add_done_callback(finished)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), config.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(stage, config.timeout) from None
@@ -0,0 +1,89 @@
+"""
+supabase_loader.py — Paginated, parallel bulk loader for the recipe tables
+
+PostgREST silently truncates responses at its ``max-rows`` setting, so every
+table is read with ``range`` requests until the exact row count is reached.
+The tables are fetched concurrently and only the columns the recommender uses
+are selected.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from api.scoring import NUTRIENT_COLUMNS
+
+PAGE_SIZE = 1000
+
+# key -> (Supabase table, columns the recommender reads)
+RECIPE_TABLES = {
+    "ingredients": ("Ingredient", ["id", "name", *NUTRIENT_COLUMNS]),
+    "recipes": ("Recipe", ["id", "name", "description", "min_prep_time", "green_score", "image_url", "updated_at"]),
+    "recipe_ing_map": ("Recipe-Ingredient_Map", ["recipe_id", "ingredient_id", "relative_unit_100"]),
+    "tags": ("RecipeTag", ["id", "name"]),
+    "recipe_tag_map": ("Recipe-Tag_Map", ["recipe_id", "tag_id"]),
+    # Per-recipe nutrient totals written by data/cache_to_csv.py (see scoring.rollup_nutrient_matrix).
+    "recipe_nutrition": ("recipe_nutrition", ["recipe_id", *NUTRIENT_COLUMNS]),
+}
+# Tables the recommender can do without (missing table -> empty frame, derived instead).
+# recipe_nutrition is created by dataset/recipe_nutrition.sql.
+OPTIONAL_TABLES = {"recipe_nutrition"}
+_reported_missing = set()  # optional tables already reported as unavailable (once per process)
+
+
+def fetch_table(client, table, columns, page_size=PAGE_SIZE, where=None):
+    """
+    Read every row of ``table`` page by page. Returns (DataFrame, stats).
+
+    ``where`` optionally adds PostgREST filters, e.g. ``lambda q: q.in_("id", ids)``.
+
+    Pages advance by the number of rows actually returned, so a server-side
+    max-rows cap smaller than ``page_size`` cannot truncate the result.
+    """
+    start_time = time.perf_counter()
+    rows, n_bytes, pages, total = [], 0, 0, None
+    while total is None or len(rows) < total:
+        start = len(rows)
+        query = client.table(table).select(",".join(columns), count="exact" if total is None else None)
+        if where is not None:
+            query = where(query)
+        response = query.order("id").range(start, start + page_size - 1).execute()
+        pages += 1
+        if total is None:
+            total = response.count if response.count is not None else float("inf")
+        if not response.data:
+            break
+        rows.extend(response.data)
+        n_bytes += len(json.dumps(response.data))
+
+    stats = {"rows": len(rows), "bytes": n_bytes, "pages": pages, "seconds": time.perf_counter() - start_time}
+    return pd.DataFrame(rows, columns=columns), stats
+
+
+def load_tables(client, tables=RECIPE_TABLES, page_size=PAGE_SIZE):
+    """Fetch all ``tables`` concurrently. Returns ({key: DataFrame}, {key: stats})."""
+    with ThreadPoolExecutor(max_workers=len(tables), thread_name_prefix="supabase-load") as pool:
+        futures = {
+            key: pool.submit(fetch_table, client, table, columns, page_size)
+            for key, (table, columns) in tables.items()
+        }
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                if key not in OPTIONAL_TABLES:
+                    raise
+                if key not in _reported_missing:
+                    _reported_missing.add(key)
+                    print(f"  {tables[key][0]:<24} unavailable ({e}); derived on load instead")
+                results[key] = (pd.DataFrame(columns=tables[key][1]), {"rows": 0, "bytes": 0, "pages": 0, "seconds": 0.0})
+
+    frames = {key: frame for key, (frame, _) in results.items()}
+    stats = {key: table_stats for key, (_, table_stats) in results.items()}
+    for key, s in stats.items():
+        print(f"  {tables[key][0]:<24} {s['rows']:>7} rows {s['bytes'] / 1024:>9.1f} KiB "
+              f"{s['pages']:>3} pages {s['seconds']:.2f}s")
+    return frames, stats
@@ -0,0 +1,92 @@
+"""
+warmup.py — Background warmup with per-step timings
+
+Runs a list of named loader steps once on a daemon thread so the first request
+after a deploy does not pay for model loading, the Supabase fetch and catalog
+encoding. ``status()`` backs the /readyz endpoint.
+
+A failing step (Supabase or Gemini briefly unreachable at boot) is retried
+with capped exponential backoff, so one hiccup does not keep /readyz at 503
+until the worker restarts. Steps that already finished are not re-run.
+"""
+
+import threading
+import time
+
+
+class Warmup:
+    """
+    Runs ``steps`` ([(name, fn), ...]) in order. A failing step is retried
+    after ``base_delay * 2**n`` seconds (at most ``max_delay``); after
+    ``attempts`` tries (None = keep trying) warmup stops as failed.
+    """
+
+    def __init__(self, steps, attempts=None, base_delay=1.0, max_delay=30.0, sleep=time.sleep):
+        self.steps = list(steps)
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.state = "pending"  # pending -> running (<-> retrying) -> ready | failed
+        self.timings = {}
+        self.error = None
+        self.retries = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="recommender-warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until warmup finished (either way); returns True if ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {"state": self.state, "ready": self.ready, "timings": dict(self.timings), "error": self.error,
+                "retries": self.retries}
+
+    def _run_step(self, name, fn):
+        """Run one step until it succeeds; False once its attempts are used up."""
+        tries = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                detail = fn()
+            except Exception as e:
+                tries += 1
+                self.error = f"{name}: {e}"
+                if self.attempts is not None and tries >= self.attempts:
+                    print(f"Warmup failed at {self.error}")
+                    return False
+                delay = min(self.max_delay, self.base_delay * 2 ** (tries - 1))
+                print(f"Warmup: {self.error}; retrying in {delay:.1f}s")
+                self.state = "retrying"
+                self.retries += 1
+                self.sleep(delay)
+                self.state = "running"
+                continue
+            self.timings[name] = round(time.perf_counter() - start, 3)
+            if isinstance(detail, dict):  # a step may report its own sub-steps
+                self.timings.update({f"{name}.{key}": value for key, value in detail.items()})
+            print(f"Warmup: {name} done in {self.timings[name]:.2f}s")
+            return True
+
+    def _run(self):
+        self.state = "running"
+        started = time.perf_counter()
+        try:
+            for name, fn in self.steps:
+                if not self._run_step(name, fn):
+                    self.state = "failed"
+                    return
+            self.timings["total"] = round(time.perf_counter() - started, 3)
+            self.error = None
+            self.state = "ready"
+        finally:
+            self._done.set()
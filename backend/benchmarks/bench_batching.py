@@ -0,0 +1,91 @@
+"""
+bench_batching.py — Goal-encoding throughput, direct vs. micro-batched
+
+Usage (from backend/):
+    python -m benchmarks.bench_batching --clients 1 8 64 --requests 512
+    python -m benchmarks.bench_batching --simulated   # no model download
+
+Each client thread encodes goal strings back to back, either calling the
+model directly (batch size 1, as before) or through BatchingEncoder.
+``--simulated`` replaces the model with a serialized sleep of fixed +
+per-item cost.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api.batching import BatchingEncoder
+
+GOALS = [
+    "high protein breakfast", "low carb dinner", "vegetarian lunch under 600 calories",
+    "lose 5 kg in two months", "gain muscle", "heart healthy meals", "more fiber", "quick keto",
+]
+
+
+def load_encode(args):
+    if args.simulated:
+        device = threading.Lock()  # one forward pass at a time, like a saturated CPU/GPU
+
+        def encode(texts):
+            with device:
+                time.sleep(args.fixed_ms / 1000 + args.per_item_ms / 1000 * len(texts))
+            return np.zeros((len(texts), 384), dtype=np.float32)
+        return encode
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(args.model)
+    return lambda texts: model.encode(texts, normalize_embeddings=True)
+
+
+def run(encode_one, clients, requests):
+    """Throughput (req/s) and latency percentiles (ms) for ``clients`` threads."""
+    latencies = []
+
+    def client(i):
+        for j in range(i, requests, clients):
+            start = time.perf_counter()
+            encode_one(f"{GOALS[j % len(GOALS)]} #{j}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    return requests / elapsed, np.percentile(ms, 50), np.percentile(ms, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--simulated", action="store_true")
+    parser.add_argument("--fixed-ms", type=float, default=8, help="simulated per-call overhead")
+    parser.add_argument("--per-item-ms", type=float, default=0.3, help="simulated per-text cost")
+    args = parser.parse_args()
+
+    encode = load_encode(args)
+    encode(GOALS)  # warm up
+
+    print(f"{'clients':>7} {'mode':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for clients in args.clients:
+        rps, p50, p95 = run(lambda t: encode([t])[0], clients, args.requests)
+        print(f"{clients:>7} {'direct':>8} {rps:>9.1f} {p50:>8.2f} {p95:>8.2f} {1:>6.1f}")
+
+        batcher = BatchingEncoder(encode, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+        rps, p50, p95 = run(batcher.encode, clients, args.requests)
+        batcher.close()
+        print(f"{clients:>7} {'batched':>8} {rps:>9.1f} {p50:>8.2f} {p95:>8.2f} "
+              f"{batcher.stats()['mean_batch']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+bench_catalog_memory.py — Memory of the columnar RecipeCatalog vs. the old merged frame
+
+Also compares whole catalog snapshots: one that keeps the raw tables next to the
+catalog (as snapshots did before incremental refreshes merged into the catalog)
+against the current one (catalog + nutrient matrix + embeddings).
+
+Usage (from backend/):
+    python -m benchmarks.bench_catalog_memory --recipes 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from api.catalog import RecipeCatalog
+from api.scoring import NUTRIENT_COLUMNS, rollup_nutrient_matrix
+
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_tables(n_recipes, n_ingredients, n_tags, per_recipe_ing, per_recipe_tags, seed=0):
+    rng = np.random.default_rng(seed)
+    recipe_ids = np.arange(1, n_recipes + 1)
+    words = [f"word{i}" for i in range(500)]
+    return {
+        "recipes": pd.DataFrame({
+            "id": recipe_ids,
+            "name": [f"Recipe {i}" for i in recipe_ids],
+            "description": [" ".join(rng.choice(words, 120)) for _ in recipe_ids],
+            "min_prep_time": rng.integers(5, 120, n_recipes),
+            "green_score": rng.integers(0, 100, n_recipes),
+            "image_url": [f"https://example.com/{i}.jpg" for i in recipe_ids],
+        }),
+        "ingredients": pd.DataFrame({"id": np.arange(1, n_ingredients + 1),
+                                     "name": [f"Ingredient {i}" for i in range(n_ingredients)],
+                                     **{c: rng.random(n_ingredients) * 100 for c in NUTRIENT_COLUMNS}}),
+        "tags": pd.DataFrame({"id": np.arange(1, n_tags + 1), "name": [f"Tag {i}" for i in range(n_tags)]}),
+        "recipe_ing_map": pd.DataFrame({
+            "recipe_id": np.repeat(recipe_ids, per_recipe_ing),
+            "ingredient_id": rng.integers(1, n_ingredients + 1, n_recipes * per_recipe_ing),
+            "relative_unit_100": rng.integers(10, 500, n_recipes * per_recipe_ing),
+        }),
+        "recipe_tag_map": pd.DataFrame({
+            "recipe_id": np.repeat(recipe_ids, per_recipe_tags),
+            "tag_id": rng.integers(1, n_tags + 1, n_recipes * per_recipe_tags),
+        }),
+    }
+
+
+def legacy_recipe_frame(tables):
+    """The pre-RecipeCatalog load_recipe_data() merge, kept here as the baseline."""
+    recipe_tags = tables["recipe_tag_map"].merge(tables["tags"], left_on="tag_id", right_on="id", suffixes=("", "_tag"))
+    recipe_tags = recipe_tags.groupby("recipe_id")["name"].apply(list).reset_index(name="tags")
+    recipe_ing = tables["recipe_ing_map"].merge(
+        tables["ingredients"], left_on="ingredient_id", right_on="id", suffixes=("", "_ing")
+    )
+    recipe_ing = recipe_ing.groupby("recipe_id")["name"].apply(list).reset_index(name="ingredients")
+    frame = tables["recipes"].merge(recipe_tags, left_on="id", right_on="recipe_id", how="left")
+    frame = frame.merge(recipe_ing, left_on="id", right_on="recipe_id", how="left")
+    frame["recipe_text"] = [
+        f"{d}. Ingredients: {', '.join(i)}. Tags: {', '.join(t)}."
+        for d, i, t in zip(frame["description"], frame["ingredients"], frame["tags"])
+    ]
+    return frame
+
+
+def frame_nbytes(frame):
+    return int(frame.memory_usage(deep=True, index=True).sum())
+
+
+def snapshot_sizes(tables, catalog):
+    """Bytes held per snapshot part; the raw tables only by snapshots that keep them."""
+    nutrient_matrix = rollup_nutrient_matrix(catalog.ids, None, tables["recipe_ing_map"], tables["ingredients"])
+    embeddings = np.zeros((len(catalog), EMBEDDING_DIM), dtype=np.float32)
+    return {
+        "raw tables": sum(frame_nbytes(frame) for frame in tables.values()),
+        "RecipeCatalog": catalog.nbytes(),
+        "nutrient matrix": nutrient_matrix.nbytes,
+        "embeddings": embeddings.nbytes,
+    }
+
+
+def measure(build, tables):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(tables)
+    seconds = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20_000)
+    parser.add_argument("--ingredients", type=int, default=2_000)
+    parser.add_argument("--tags", type=int, default=100)
+    args = parser.parse_args()
+
+    tables = synthetic_tables(args.recipes, args.ingredients, args.tags, per_recipe_ing=10, per_recipe_tags=3)
+    mib = 1024 * 1024
+
+    frame, frame_retained, frame_peak, frame_s = measure(legacy_recipe_frame, tables)
+    catalog, cat_retained, cat_peak, cat_s = measure(RecipeCatalog.from_tables, tables)
+
+    print(f"{args.recipes} recipes, 10 ingredients + 3 tags each")
+    print(f"{'structure':<16} {'size MiB':>9} {'alloc MiB':>10} {'peak MiB':>9} {'build s':>8}")
+    print(f"{'merged frame':<16} {frame.memory_usage(deep=True).sum() / mib:9.1f} "
+          f"{frame_retained / mib:10.1f} {frame_peak / mib:9.1f} {frame_s:8.2f}")
+    print(f"{'RecipeCatalog':<16} {catalog.nbytes() / mib:9.1f} "
+          f"{cat_retained / mib:10.1f} {cat_peak / mib:9.1f} {cat_s:8.2f}")
+
+    sizes = snapshot_sizes(tables, catalog)
+    kept = sum(sizes.values())
+    current = kept - sizes["raw tables"]
+    print("\nWhole snapshot (per worker):")
+    for part, n_bytes in sizes.items():
+        print(f"  {part:<16} {n_bytes / mib:9.1f} MiB")
+    print(f"  {'with raw tables':<16} {kept / mib:9.1f} MiB")
+    print(f"  {'current':<16} {current / mib:9.1f} MiB ({1 - current / kept:.0%} less)")
+
+    start = time.perf_counter()
+    for i in range(0, len(catalog), max(1, len(catalog) // 1000)):
+        catalog.row(i)
+    print(f"RecipeCatalog.row(): {(time.perf_counter() - start) * 1e6 / 1000:.1f} us/row")
+
+
+if __name__ == "__main__":
+    main()
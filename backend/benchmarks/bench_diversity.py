@@ -0,0 +1,66 @@
+"""
+bench_diversity.py — Latency and diversity of the diversity selectors
+
+Usage (from backend/):
+    python -m benchmarks.bench_diversity --candidates 20 --meals 3 5 7
+
+Candidates are drawn around a few cluster centres (recipes of the same kind
+embed close together) and ranked by a noisy relevance score. For each
+selector we report the median latency, the mean pairwise cosine of the picks
+(lower = more diverse), the smallest pairwise distance and the share of the
+top-k relevance that is kept.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from api.diversity import DIVERSITY_METHODS, select_diverse
+
+
+def make_candidates(n, dim, clusters, rng):
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    relevance = np.sort(rng.uniform(0.3, 0.9, n))[::-1].astype(np.float32)  # ranked best first
+    return vectors, relevance
+
+
+def metrics(vectors, relevance, selected, k):
+    picked = vectors[selected]
+    sims = picked @ picked.T
+    pairs = sims[np.triu_indices(len(selected), 1)]
+    return pairs.mean(), 1 - pairs.max(), relevance[selected].sum() / relevance[:k].sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--meals", type=int, nargs="+", default=[3, 5, 7])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=4)
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--trade-off", type=float, default=0.7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    trials = [make_candidates(args.candidates, args.dim, args.clusters, rng) for _ in range(args.trials)]
+
+    print(f"{'meals':>5} {'method':>9} {'p50 ms':>8} {'mean cos':>9} {'min dist':>9} {'relevance':>10}")
+    for k in args.meals:
+        for method in DIVERSITY_METHODS:
+            latencies, results = [], []
+            for vectors, relevance in trials:
+                start = time.perf_counter()
+                selected = select_diverse(vectors, relevance, k, method=method, trade_off=args.trade_off)
+                latencies.append(time.perf_counter() - start)
+                assert len(selected) == k
+                results.append(metrics(vectors, relevance, selected, k))
+            mean_cos, min_dist, kept = np.mean(results, axis=0)
+            print(f"{k:>5} {method:>9} {np.median(latencies) * 1000:>8.3f} {mean_cos:>9.3f} "
+                  f"{min_dist:>9.3f} {kept:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
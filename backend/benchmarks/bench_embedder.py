@@ -0,0 +1,159 @@
+"""
+bench_embedder.py — PyTorch vs. ONNX Runtime vs. int8 ONNX embedding backends
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedder
+    python -m benchmarks.bench_embedder --backends torch onnx-int8 --goals 200
+
+Each backend runs in its own interpreter (so RSS is not shared) and encodes
+the recipe texts of backend/dataset in batches, then single goal strings.
+The parent compares every backend with the first one (the baseline): cosine
+similarity of the vectors and overlap of the top-k recipes for each goal.
+"ok" means every catalog vector is within BACKEND_MIN_COSINE of the baseline.
+Needs `pip install "sentence-transformers[onnx]"` for the ONNX backends.
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from api.catalog import RecipeCatalog
+from api.recommender import EMBED_MODEL_NAME, embedder_options, make_recipe_text
+from api.retrieval import top_k_indices
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BACKEND_MIN_COSINE = 0.99  # every vector of another backend must be this close to the baseline's
+DATASET = {
+    "ingredients": "ingredients-supabase.csv",
+    "recipes": "recipes-supabase.csv",
+    "recipe_ing_map": "recipe_ingredient_map-supabase.csv",
+    "tags": "tags-supabase.csv",
+    "recipe_tag_map": "recipe_tag_map-supabase.csv",
+}
+GOAL_TEMPLATES = [
+    "high protein {}", "low carb {}", "vegetarian {} under 600 calories", "quick {} for weight loss",
+    "heart healthy {}", "{} with lots of fiber", "keto {}", "{} for muscle gain",
+]
+MEALS = ["breakfast", "lunch", "dinner", "snack", "meal prep", "salad", "soup", "pasta"]
+
+
+def recipe_texts(repeat):
+    tables = {key: pd.read_csv(BACKEND_DIR / "dataset" / name) for key, name in DATASET.items()}
+    recipes = RecipeCatalog.from_tables(tables)
+    return [make_recipe_text(recipes.row(i)) for i in range(len(recipes))] * repeat
+
+
+def goal_texts(n):
+    return [GOAL_TEMPLATES[i % len(GOAL_TEMPLATES)].format(MEALS[i // len(GOAL_TEMPLATES) % len(MEALS)])
+            for i in range(n)]
+
+
+def worker(backend, args, out):
+    """Runs in a child process; writes vectors to ``out`` and prints a JSON result."""
+    from sentence_transformers import SentenceTransformer
+
+    start = time.perf_counter()
+    model = SentenceTransformer(EMBED_MODEL_NAME, device="cpu", **embedder_options(backend))
+    load_s = time.perf_counter() - start
+
+    texts, goals = recipe_texts(args.repeat), goal_texts(args.goals)
+    model.encode(texts[:args.batch_size], normalize_embeddings=True)  # warm up
+
+    start = time.perf_counter()
+    catalog = model.encode(texts, batch_size=args.batch_size, normalize_embeddings=True)
+    catalog_s = time.perf_counter() - start
+
+    latencies, goal_vectors = [], []
+    for goal in goals:
+        start = time.perf_counter()
+        goal_vectors.append(model.encode(goal, normalize_embeddings=True))
+        latencies.append(time.perf_counter() - start)
+
+    np.savez(out, catalog=catalog, goals=np.stack(goal_vectors))
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        "backend": backend,
+        "load_s": load_s,
+        "texts_per_s": len(texts) / catalog_s,
+        "goal_p50_ms": float(np.percentile(ms, 50)),
+        "goal_p95_ms": float(np.percentile(ms, 95)),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def backends_agree(base, other, min_cosine=BACKEND_MIN_COSINE):
+    """True if every row of ``other`` has cosine >= ``min_cosine`` with the matching row of ``base``."""
+    base = np.asarray(base, dtype=np.float32)
+    other = np.asarray(other, dtype=np.float32)
+    if base.shape != other.shape:
+        return False
+    norms = np.linalg.norm(base, axis=1) * np.linalg.norm(other, axis=1)
+    cosine = np.sum(base * other, axis=1) / np.maximum(norms, 1e-12)
+    return bool(np.all(cosine >= min_cosine))
+
+
+def agreement(base, other, k):
+    """Min/mean cosine between matching vectors and mean top-k overlap per goal."""
+    cosine = np.sum(base["catalog"] * other["catalog"], axis=1)
+    overlaps = []
+    for goal_base, goal_other in zip(base["goals"], other["goals"]):
+        top_base = set(top_k_indices(base["catalog"] @ goal_base, k).tolist())
+        top_other = set(top_k_indices(other["catalog"] @ goal_other, k).tolist())
+        overlaps.append(len(top_base & top_other) / k)
+    return float(cosine.min()), float(cosine.mean()), float(np.mean(overlaps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--repeat", type=int, default=20, help="copies of the bundled recipes to encode")
+    parser.add_argument("--goals", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args, args.out)
+        return
+
+    results, vectors = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            out = str(Path(tmp) / f"{backend}.npz")
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedder", "--worker", backend, "--out", out,
+                 "--repeat", str(args.repeat), "--goals", str(args.goals), "--batch-size", str(args.batch_size)],
+                cwd=BACKEND_DIR, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            with np.load(out) as data:
+                vectors[backend] = {key: data[key] for key in data.files}
+
+    if not results:
+        return
+    baseline = results[0]["backend"]
+    print(f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'goal p50':>9} {'goal p95':>9} {'RSS MB':>7} "
+          f"{'cos min':>8} {'cos mean':>9} {f'top{args.k}':>6} {'ok':>3}")
+    for r in results:
+        cos_min, cos_mean, overlap = agreement(vectors[baseline], vectors[r["backend"]], args.k)
+        print(f"{r['backend']:<10} {r['load_s']:>7.2f} {r['texts_per_s']:>9.1f} {r['goal_p50_ms']:>8.2f}ms "
+              f"{r['goal_p95_ms']:>7.2f}ms {r['max_rss_mb']:>7.0f} {cos_min:>8.4f} {cos_mean:>9.4f} {overlap:>6.2f} "
+              f"{'yes' if backends_agree(vectors[baseline]['catalog'], vectors[r['backend']]['catalog']) else 'NO':>3}")
+    print(f"(agreement is measured against {baseline}; ok = cos min >= {BACKEND_MIN_COSINE})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+bench_import.py — Import (cold start) cost of the API modules
+
+Usage (from backend/):
+    python -m benchmarks.bench_import                      # api.index, 5 runs
+    python -m benchmarks.bench_import --module api.recommender --top 15
+    python -m benchmarks.bench_import --history benchmarks/results/import_time.jsonl
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+reports the median total and the top-level packages with the most self time.
+With ``--history FILE`` it compares against the last run recorded there and
+appends one JSON line, so import cost can be tracked across commits on one
+machine (benchmarks/results/ is git-ignored: the numbers are machine-specific).
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# "import time:       self [us] |  cumulative | imported package"
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def parse_importtime(stderr):
+    """(total_us, {top-level package: self us summed over its modules}) from -X importtime output."""
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            packages[match.group(2).split(".")[0]] += int(match.group(1))
+    return sum(packages.values()), dict(packages)
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr.splitlines()[-1] if result.stderr else f"import {module} failed")
+    return parse_importtime(result.stderr)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api.index")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--history", help="JSONL file to compare against and append this run to")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    total_ms = statistics.median(total for total, _ in runs) / 1000
+    packages = {
+        name: statistics.median(pkgs.get(name, 0) for _, pkgs in runs) / 1000
+        for name in set().union(*(pkgs for _, pkgs in runs))
+    }
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import {args.module}: {total_ms:.0f} ms (median of {args.runs})")
+    for name, ms in slowest:
+        print(f"  {name:<28} {ms:>8.1f} ms")
+
+    if args.history is None:
+        return
+    history = Path(args.history)
+    if history.exists():
+        previous = [json.loads(line) for line in history.read_text().splitlines() if line.strip()]
+        previous = [r for r in previous if r["module"] == args.module]
+        if previous:
+            last = previous[-1]
+            print(f"previous ({last.get('commit')}): {last['total_ms']:.0f} ms, "
+                  f"change {total_ms - last['total_ms']:+.0f} ms")
+    history.parent.mkdir(parents=True, exist_ok=True)
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "module": args.module,
+              "python": sys.version.split()[0], "runs": args.runs, "total_ms": round(total_ms, 1),
+              "top": {name: round(ms, 1) for name, ms in slowest}}
+    with history.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
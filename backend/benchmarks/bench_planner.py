@@ -0,0 +1,58 @@
+"""
+bench_planner.py — Speed and feasibility of the multi-day planner
+
+Usage (from backend/):
+    python -m benchmarks.bench_planner --days 1 7 14 --candidates 200 --trials 50
+
+Candidate pools have gamma-distributed nutrients (a few rich recipes, many
+light ones); daily targets are ``meals_per_day`` average meals with calories
+and macros targeted. Reports per-plan latency and the share of days within
+tolerance, for the greedy construction alone (time budget 0) and with local
+search.
+"""
+
+import argparse
+
+import numpy as np
+
+from api.planner import plan_days
+
+SCALE = np.array([300, 20, 30, 8, 10, 50, 200, 100, 1, 10, 1, 2, 20], dtype=np.float64)
+
+
+def make_pool(n, meals_per_day, rng):
+    nutrients = rng.gamma(2.0, 1.0, size=(n, len(SCALE))) * SCALE / 2
+    targets = nutrients.mean(axis=0) * meals_per_day * rng.uniform(0.8, 1.2, len(SCALE))
+    targets[5:] = np.nan
+    return nutrients, np.sort(rng.uniform(0.3, 0.9, n))[::-1], targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 14])
+    parser.add_argument("--meals-per-day", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--time-budget", type=float, default=0.5)
+    parser.add_argument("--trials", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'days':>4} {'mode':>7} {'p50 ms':>8} {'p95 ms':>8} {'days ok':>8} {'plans ok':>9}")
+    for n_days in args.days:
+        pools = [make_pool(args.candidates, args.meals_per_day, rng) for _ in range(args.trials)]
+        for mode, budget in (("greedy", 0.0), ("search", args.time_budget)):
+            seconds, days_ok, plans_ok = [], 0, 0
+            for nutrients, relevance, targets in pools:
+                plan = plan_days(nutrients, relevance, targets, n_days, args.meals_per_day,
+                                 tolerance=args.tolerance, time_budget=budget)
+                seconds.append(plan.seconds)
+                days_ok += sum(plan.within_tolerance)
+                plans_ok += all(plan.within_tolerance)
+            ms = np.array(seconds) * 1000
+            print(f"{n_days:>4} {mode:>7} {np.percentile(ms, 50):>8.2f} {np.percentile(ms, 95):>8.2f} "
+                  f"{days_ok / (n_days * args.trials):>8.1%} {plans_ok / args.trials:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench_retrieval.py — Recall/latency of the ANN index against exact NumPy search
+
+Usage (from backend/):
+    python -m benchmarks.bench_retrieval --recipes 50000 --queries 200
+
+Random unit vectors are a worst case for graph indexes (no cluster structure),
+so recall here is a lower bound for real recipe embeddings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from api.retrieval import ExactIndex, build_index
+
+
+def random_unit_vectors(n, dim, seed):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(index, queries, k):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        positions, _ = index.search(q, k)
+        latencies.append(time.perf_counter() - start)
+        results.append(positions)
+    return np.array(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--backend", default="hnsw")
+    parser.add_argument("--ef-search", type=int, default=None, help="HNSW query breadth (default: index default)")
+    args = parser.parse_args()
+
+    vectors = random_unit_vectors(args.recipes, args.dim, seed=0)
+    queries = random_unit_vectors(args.queries, args.dim, seed=1)
+
+    exact = ExactIndex(vectors)
+    start = time.perf_counter()
+    ann = build_index(vectors, args.backend)
+    build_s = time.perf_counter() - start
+    if args.ef_search and hasattr(ann, "index"):
+        ann.index.set_ef(args.ef_search)
+
+    exact_ms, exact_results = time_queries(exact, queries, args.k)
+    ann_ms, ann_results = time_queries(ann, queries, args.k)
+    recall = np.mean([len(set(a) & set(e)) / args.k for a, e in zip(ann_results, exact_results)])
+
+    print(f"{args.recipes} recipes x {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"{'index':<8} {'p50 ms':>8} {'p99 ms':>8} {'recall':>8}")
+    print(f"{'exact':<8} {np.percentile(exact_ms, 50):8.3f} {np.percentile(exact_ms, 99):8.3f} {1.0:8.3f}")
+    print(f"{ann.name:<8} {np.percentile(ann_ms, 50):8.3f} {np.percentile(ann_ms, 99):8.3f} {recall:8.3f}")
+    print(f"{ann.name} build time: {build_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
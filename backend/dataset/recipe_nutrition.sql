@@ -0,0 +1,32 @@
+-- recipe_nutrition: per-recipe nutrient totals read by the recommender
+-- (see api/scoring.py rollup_nutrient_matrix). Optional: without it the
+-- backend sums each recipe's ingredients on load.
+--
+-- Run once in the Supabase SQL editor, then import
+-- dataset/recipe_nutrition-supabase.csv (written by data/cache_to_csv.py).
+
+create table if not exists public.recipe_nutrition (
+  id              bigint generated by default as identity primary key,
+  recipe_id       bigint not null unique references public."Recipe" (id) on delete cascade,
+  calories_kcal   double precision,
+  protein_g       double precision,
+  carbs_g         double precision,
+  sugars_g        double precision,
+  agg_fats_g      double precision,
+  cholesterol_mg  double precision,
+  agg_minerals_mg double precision,
+  vit_a_microg    double precision,
+  agg_vit_b_mg    double precision,
+  vit_c_mg        double precision,
+  vit_d_microg    double precision,
+  vit_e_mg        double precision,
+  vit_k_microg    double precision,
+  created_at      timestamp with time zone not null default now()
+);
+
+alter table public.recipe_nutrition enable row level security;
+
+-- The backend reads it with the anon key, like the other recipe tables.
+create policy "recipe_nutrition is readable by everyone"
+  on public.recipe_nutrition for select
+  using (true);
@@ -0,0 +1,206 @@
+"""
+epicourier_retry — Per-error retry policy with jittered backoff, plus a circuit breaker
+
+Used for the Gemini calls in backend/api/recommender.py and for the Ollama
+calls in data/llama_recipe_pipeline.py. It is its own installable package
+(``pip install backend/packages/retry``) so both can import it, and it only
+depends on the standard library.
+
+A ``classify`` callable sorts each exception into a kind:
+
+* ``connect`` — the server could not be reached (down or restarting)
+* ``server``  — it answered 5xx / 429 (reachable, but failing or overloaded)
+* ``timeout`` — connected, but no answer within the read timeout
+* ``None``    — anything else (bad request, bad output): raised immediately
+
+Every kind has its own attempt limit. The waits use "full jitter"
+exponential backoff, ``uniform(0, min(max_delay, base_delay * 2**retry))``,
+so workers that fail together do not retry in lockstep. ``connect`` and
+``server`` failures also count toward an optional CircuitBreaker, and only an
+answer from the server (success, or an error of kind ``None``) resets it; a
+timeout says nothing either way and leaves its counters alone. So does a
+cancelled call, which only hands the half-open probe to the next caller. Once
+it is open, callers either wait for it (the batch pipeline pauses) or get
+CircuitOpenError straight away (the API fails fast).
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+BREAKER_KINDS = ("connect", "server")  # failures that say "the server is down"
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} is unavailable (circuit open); retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def default_classify(exc):
+    """Builtin socket/timeout errors only; clients pass their own classifier."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(exc, ConnectionError):
+        return "connect"
+    return None
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and stays open for
+    ``reset_timeout`` seconds. Then one caller probes (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened = 0  # times the circuit has opened
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        return "open" if self.clock() - self._opened_at < self.reset_timeout else "half-open"
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def acquire(self):
+        """0 if the caller may go ahead, else the seconds to wait before asking again."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return 0.0
+            if state == "half-open":
+                if not self._probing:
+                    self._probing = True
+                    return 0.0
+                return min(1.0, self.reset_timeout)  # someone else is probing
+            return self._opened_at + self.reset_timeout - self.clock()
+
+    def check(self):
+        """Fail fast: raise CircuitOpenError instead of waiting."""
+        retry_in = self.acquire()
+        if retry_in > 0:
+            raise CircuitOpenError(self.name, retry_in)
+
+    def wait(self):
+        """Block until the caller may go ahead."""
+        announced = False
+        while (retry_in := self.acquire()) > 0:
+            if not announced:
+                print(f"⏸️ {self.name} circuit open, pausing for {retry_in:.0f}s")
+                announced = True
+            time.sleep(retry_in)
+
+    async def wait_async(self):
+        while (retry_in := self.acquire()) > 0:
+            await asyncio.sleep(retry_in)
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"▶️ {self.name} circuit closed")
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """No verdict (e.g. the probe timed out): let another caller probe, keep the counters."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            was_open = self._opened_at is not None
+            if was_open or self.failures >= self.failure_threshold:
+                if self._probing or not was_open:
+                    self.opened += 1
+                    print(f"🔌 {self.name} circuit open after {self.failures} consecutive failures")
+                self._opened_at = self.clock()
+            self._probing = False
+
+
+@dataclass
+class RetryPolicy:
+    """Retry ``fn`` on classified errors; ``attempts`` caps the tries per error kind."""
+
+    name: str = "request"
+    attempts: dict = field(default_factory=lambda: {"connect": 4, "server": 3, "timeout": 2})
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    classify: Callable = default_classify
+    sleep: Callable = time.sleep
+
+    def backoff(self, retry):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def _next_delay(self, exc, tries, breaker):
+        """Seconds to wait before the next try; re-raises ``exc`` when it should not be retried."""
+        kind = self.classify(exc)
+        if breaker is not None:
+            if kind in BREAKER_KINDS:
+                breaker.record_failure()
+            elif kind is None:
+                breaker.record_success()  # the server answered; the request itself failed
+            else:
+                breaker.release_probe()
+        if kind is None:
+            raise exc
+        tries[kind] = tries.get(kind, 0) + 1
+        if tries[kind] >= self.attempts.get(kind, 1):
+            raise exc
+        delay = self.backoff(sum(tries.values()) - 1)
+        print(f"[retry] {self.name}: {kind} error ({exc}); try {tries[kind] + 1}/{self.attempts[kind]} "
+              f"in {delay:.1f}s")
+        return delay
+
+    def call(self, fn, *args, breaker: Optional[CircuitBreaker] = None, wait_for_breaker=False, **kwargs):
+        tries = {}
+        while True:
+            if breaker is not None:
+                breaker.wait() if wait_for_breaker else breaker.check()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                self.sleep(self._next_delay(exc, tries, breaker))
+                continue
+            except BaseException:
+                if breaker is not None:
+                    breaker.release_probe()  # interrupted: no verdict, but do not hold the probe forever
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    async def call_async(self, fn, *args, breaker: Optional[CircuitBreaker] = None, wait_for_breaker=False,
+                         **kwargs):
+        tries = {}
+        while True:
+            if breaker is not None:
+                await breaker.wait_async() if wait_for_breaker else breaker.check()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as exc:
+                await asyncio.sleep(self._next_delay(exc, tries, breaker))
+                continue
+            except BaseException:  # cancelled, e.g. by a stage timeout or a client disconnect
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
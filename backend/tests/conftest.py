@@ -4,14 +4,178 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from hypothesis import given, strategies as st, settings, example
 
+import hashlib
+
+import numpy as np
+import pandas as pd
+
 # ensure backend is on the import path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+# Tests load what they need themselves; no background warmup against real services.
+os.environ.setdefault("RECOMMENDER_WARMUP", "0")
+
 from api.index import app
 from api.recommender import create_meal_plan
-import api.recommender 
+import api.recommender
+
+DATASET_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "dataset"))
+DATASET_FILES = {
+    "Ingredient": "ingredients-supabase.csv",
+    "Recipe": "recipes-supabase.csv",
+    "Recipe-Ingredient_Map": "recipe_ingredient_map-supabase.csv",
+    "RecipeTag": "tags-supabase.csv",
+    "Recipe-Tag_Map": "recipe_tag_map-supabase.csv",
+    "recipe_nutrition": "recipe_nutrition-supabase.csv",
+}
+
+
 @pytest.fixture
 def client():
     """Provides a FastAPI test client for all tests."""
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+# --------------------------------------------------
+# Offline fakes (no Supabase / Gemini / model download)
+# --------------------------------------------------
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Minimal PostgREST query builder: select / gt / in_ / order / range / execute."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.columns = None
+        self.count = None
+        self.bounds = None
+        self.filters = []
+
+    def select(self, *columns, count=None):
+        joined = ",".join(columns)
+        self.columns = None if joined == "*" else joined.split(",")
+        self.count = count
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r[column] > value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def order(self, column):
+        self.order_by = column
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        rows = sorted(self.client.tables[self.name], key=lambda r: r["id"])
+        rows = [r for r in rows if all(f(r) for f in self.filters)]
+        total = len(rows)
+        if self.bounds is not None:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        rows = rows[: self.client.max_rows]  # PostgREST max-rows cap
+        if self.columns is not None:
+            rows = [{c: r.get(c) for c in self.columns} for r in rows]
+        self.client.requests.append((self.name, self.bounds))
+        return FakeResponse([dict(r) for r in rows], total if self.count == "exact" else None)
+
+
+class FakeSupabase:
+    """Serves the CSV exports in backend/dataset as if they were Supabase tables."""
+
+    def __init__(self, max_rows=1000):
+        self.max_rows = max_rows
+        self.requests = []
+        self.tables = {}
+        for name, fname in DATASET_FILES.items():
+            df = pd.read_csv(os.path.join(DATASET_DIR, fname))
+            self.tables[name] = df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakeEmbedder:
+    """Deterministic bag-of-words embedder that counts encode() calls."""
+
+    dim = 32
+
+    def __init__(self):
+        self.calls = []
+
+    def _vector(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in str(text).lower().split():
+            vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+
+CACHED_LOADERS = [
+    api.recommender.load_supabase,
+    api.recommender.load_embedder,
+    api.recommender.load_goal_encoder,
+    api.recommender.load_embedding_store,
+    api.recommender.load_goal_cache,
+]
+
+
+def _clear_recommender_caches():
+    for loader in CACHED_LOADERS:
+        loader.cache_clear()
+    api.recommender.reset_catalog()
+
+
+def fake_goal_expansion(goal_text):
+    from api.recommender import GoalExpansion, NutrientTargets
+
+    return GoalExpansion(
+        targets=NutrientTargets(calories_kcal=2000, protein_g=120, carbs_g=200),
+        summary=f"About 2000 calories_kcal with 120 protein_g for '{goal_text}'.",
+    )
+
+
+async def fake_goal_expansion_async(goal_text):
+    return fake_goal_expansion(goal_text)
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase()
+
+
+@pytest.fixture
+def fake_embedder():
+    return FakeEmbedder()
+
+
+@pytest.fixture
+def offline_recommender(monkeypatch, tmp_path, fake_supabase, fake_embedder):
+    """Runs the recommender against the bundled dataset with fake model + LLM."""
+    _clear_recommender_caches()
+    monkeypatch.setattr(api.recommender, "load_supabase", lambda: fake_supabase)
+    monkeypatch.setattr(api.recommender, "load_embedder", lambda: fake_embedder)
+    monkeypatch.setattr(api.recommender, "load_gemini_client", lambda: None)  # goal expansion is faked below
+    monkeypatch.setattr(api.recommender, "EMBEDDING_STORE_DIR", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(api.recommender, "goal_expansion", fake_goal_expansion)
+    monkeypatch.setattr(api.recommender, "goal_expansion_async", fake_goal_expansion_async)
+    yield api.recommender
+    _clear_recommender_caches()
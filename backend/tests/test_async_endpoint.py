@@ -0,0 +1,116 @@
+# backend/tests/test_async_endpoint.py
+import sys, os
+import asyncio
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from api.stages import StageConfig, Stages, StageTimeout
+
+
+def test_recommender_endpoint_runs_async_pipeline(client, offline_recommender):
+    response = client.post("/recommender", json={"goal": "high protein", "numMeals": 3})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["recipes"]) == 3
+    assert "protein_g" in data["goal_expanded"]
+
+
+def test_llm_timeout_maps_to_504(client, offline_recommender, monkeypatch):
+    async def slow_expansion(goal_text):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion_async", slow_expansion)
+    monkeypatch.setattr(offline_recommender.stages, "configs",
+                        {**offline_recommender.stages.configs, "llm": StageConfig(concurrency=1, timeout=0.05)})
+
+    response = client.post("/recommender", json={"goal": "slow goal", "numMeals": 3})
+
+    assert response.status_code == 504
+    assert "llm" in response.json()["detail"]
+
+
+def test_async_and_sync_plans_match(offline_recommender):
+    sync_plan, sync_goal = offline_recommender.create_meal_plan("low carb", n_meals=5)
+    async_plan, async_goal = asyncio.run(offline_recommender.create_meal_plan_async("low carb", n_meals=5))
+
+    assert async_plan == sync_plan
+    assert async_goal == sync_goal
+
+
+def test_stage_limits_concurrency():
+    stages = Stages({"cpu": StageConfig(concurrency=2, timeout=5)}, cpu_workers=4)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        threading.Event().wait(0.05)
+        with lock:
+            active[0] -= 1
+
+    async def main():
+        await asyncio.gather(*(stages.run_cpu("cpu", work) for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak[0] == 2
+
+
+def test_stage_timeout_raises():
+    stages = Stages({"llm": StageConfig(concurrency=1, timeout=0.01)}, cpu_workers=1)
+
+    with pytest.raises(StageTimeout) as info:
+        asyncio.run(stages.run("llm", asyncio.sleep(1)))
+    assert info.value.stage == "llm"
+
+
+def test_timed_out_cpu_work_keeps_its_slot():
+    stages = Stages({"cpu": StageConfig(concurrency=1, timeout=0.05)}, cpu_workers=4)
+    release = threading.Event()
+    started = []
+
+    def work(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    async def main():
+        with pytest.raises(StageTimeout):
+            await stages.run_cpu("cpu", work, "slow")
+        queued = asyncio.ensure_future(stages.run_cpu("cpu", work, "next"))
+        await asyncio.sleep(0.1)
+        assert started == ["slow"]  # not submitted while the timed-out call still runs
+        release.set()
+        return await queued
+
+    assert asyncio.run(main()) == "next"
+
+
+def test_goal_cache_is_not_touched_on_the_event_loop(offline_recommender, monkeypatch):
+    loop_thread = threading.get_ident()
+    calls = []
+
+    class RecordingCache:
+        def get(self, key):
+            calls.append(("get", threading.get_ident() != loop_thread))
+
+        def set(self, key, value):
+            calls.append(("set", threading.get_ident() != loop_thread))
+
+    monkeypatch.setattr(offline_recommender, "load_goal_cache", lambda: RecordingCache())
+
+    asyncio.run(offline_recommender.cached_goal_expansion_async("high protein"))
+
+    assert calls == [("get", True), ("set", True)]
+
+
+def test_stage_config_from_env(monkeypatch):
+    monkeypatch.setenv("RECOMMENDER_RANK_CONCURRENCY", "3")
+    monkeypatch.setenv("RECOMMENDER_RANK_TIMEOUT", "2.5")
+
+    assert StageConfig.from_env("rank", concurrency=8, timeout=10) == StageConfig(3, 2.5)
@@ -0,0 +1,86 @@
+# backend/tests/test_batch.py
+import sys, os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+
+def test_batch_dedupes_goals_and_encodes_once(offline_recommender, fake_embedder, monkeypatch):
+    from tests.conftest import fake_goal_expansion
+
+    llm_calls = []
+
+    def counting_expansion(goal_text):
+        llm_calls.append(goal_text)
+        return fake_goal_expansion(goal_text)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion", counting_expansion)
+    offline_recommender.load_recipe_embeddings()  # warm the store
+    fake_embedder.calls.clear()
+
+    goals = ["High protein", "low carb", "high protein!", "Low  carb", "vegetarian"]
+    results = offline_recommender.create_meal_plans(goals, n_meals=3)
+
+    assert [r["index"] for r in results] == list(range(5))
+    assert [r["goal"] for r in results] == goals
+    assert all(len(r["recipes"]) == 3 for r in results)
+    assert len(llm_calls) == 3
+    assert len(fake_embedder.calls) == 1 and len(fake_embedder.calls[0]) == 3
+    # Duplicates share the ranking but keep their own wording.
+    assert [m["name"] for m in results[0]["recipes"]] == [m["name"] for m in results[2]["recipes"]]
+    assert "high protein!" in results[2]["recipes"][0]["reason"]
+
+
+def test_batch_matches_single_goal_plans(offline_recommender):
+    goals = ["high protein", "low carb dinner"]
+    batch = offline_recommender.create_meal_plans(goals, n_meals=5)
+
+    for goal, result in zip(goals, batch):
+        single, expanded = offline_recommender.create_meal_plan(goal, n_meals=5)
+        assert [m["name"] for m in result["recipes"]] == [m["name"] for m in single]
+        assert result["goal_expanded"] == expanded
+
+
+def test_rank_goal_matrix_matches_per_goal_ranking(offline_recommender):
+    catalog = offline_recommender.current_catalog()
+    goals = ["high protein", "low carb", "vegan"]
+    embeddings = np.stack([offline_recommender.load_embedder().encode(g) for g in goals])
+    targets = [offline_recommender.nutrition_goal(g) for g in goals]
+
+    batch = offline_recommender.rank_goal_matrix(embeddings, targets, catalog, top_k=10)
+
+    for goal, emb, ranked in zip(goals, embeddings, batch):
+        single, _ = offline_recommender.rank_recipes_by_goal(goal, top_k=10, catalog=catalog, goal_embedding=emb)
+        np.testing.assert_array_equal(ranked.positions, single.positions)
+
+
+def test_batch_endpoint_streams_ndjson(client, offline_recommender):
+    response = client.post("/recommender/batch", json={"goals": ["high protein", "  ", "low carb"], "numMeals": 3})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert len(lines[0]["recipes"]) == 3
+    assert lines[1]["error"] == "Goal cannot be empty"
+
+
+def test_failed_expansion_only_fails_its_goal(offline_recommender, monkeypatch):
+    from tests.conftest import fake_goal_expansion
+
+    def flaky(goal_text):
+        if "bad" in goal_text:
+            raise RuntimeError("LLM unavailable")
+        return fake_goal_expansion(goal_text)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion", flaky)
+    results = offline_recommender.create_meal_plans(["good", "bad", "good"], n_meals=3)
+
+    assert results[1] == {"index": 1, "goal": "bad", "error": "LLM unavailable"}
+    assert len(results[0]["recipes"]) == 3 and len(results[2]["recipes"]) == 3
+
+
+def test_batch_endpoint_validates_num_meals(client):
+    assert client.post("/recommender/batch", json={"goals": ["x"], "numMeals": 4}).status_code == 400
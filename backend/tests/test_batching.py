@@ -0,0 +1,89 @@
+# backend/tests/test_batching.py
+import sys, os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from api.batching import BatchingEncoder
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_texts_share_one_batch():
+    model = RecordingEncoder()
+    encoder = BatchingEncoder(model, max_batch=64, max_wait=0.2)
+    texts = [f"goal {'x' * i}" for i in range(16)]
+
+    futures = [encoder.submit(t) for t in texts]
+    results = [f.result(timeout=5) for f in futures]
+    encoder.close()
+
+    assert len(model.batches) == 1
+    assert [r[0] for r in results] == [len(t) for t in texts]  # each caller gets its own row
+
+
+def test_batches_are_capped_at_max_batch():
+    model = RecordingEncoder()
+    encoder = BatchingEncoder(model, max_batch=4, max_wait=0.2)
+
+    futures = [encoder.submit(str(i)) for i in range(10)]
+    for f in futures:
+        f.result(timeout=5)
+    encoder.close()
+
+    assert all(len(b) <= 4 for b in model.batches)
+    assert sum(len(b) for b in model.batches) == 10
+    assert encoder.stats()["items"] == 10
+
+
+def test_threads_get_their_own_embedding():
+    model = RecordingEncoder()
+    encoder = BatchingEncoder(model, max_batch=32, max_wait=0.01)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: encoder.encode("y" * i, timeout=5), range(1, 41)))
+    encoder.close()
+
+    assert [int(r[0]) for r in results] == list(range(1, 41))
+    assert len(model.batches) < 40
+
+
+def test_encode_errors_reach_every_caller():
+    def failing(texts):
+        raise ValueError("model exploded")
+
+    encoder = BatchingEncoder(failing, max_wait=0.05)
+    futures = [encoder.submit("a"), encoder.submit("b")]
+
+    for f in futures:
+        with pytest.raises(ValueError):
+            f.result(timeout=5)
+    encoder.close()
+
+
+def test_close_encodes_queued_texts_first():
+    release = threading.Event()
+    model = RecordingEncoder()
+
+    def slow(texts):
+        release.wait(5)
+        return model(texts)
+
+    encoder = BatchingEncoder(slow, max_batch=1, max_wait=0)
+    futures = [encoder.submit("a"), encoder.submit("b")]
+    release.set()
+    encoder.close(timeout=5)
+
+    assert all(f.done() for f in futures)
+    assert model.batches == [["a"], ["b"]]
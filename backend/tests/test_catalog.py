@@ -0,0 +1,78 @@
+# backend/tests/test_catalog.py
+import sys, os
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.catalog import RecipeCatalog
+from api.supabase_loader import load_tables
+from tests.conftest import FakeSupabase
+
+
+def small_tables():
+    return {
+        "recipes": pd.DataFrame({
+            "id": [10, 20, 30], "name": ["Soup", "Salad", "Stew"], "description": ["Hot", None, "Slow"],
+            "min_prep_time": [15, None, 90], "green_score": [80, 95, 40], "image_url": [None, "x.jpg", None],
+        }),
+        "ingredients": pd.DataFrame({"id": [1, 2, 3], "name": ["Leek", "Kale", "Beef"]}),
+        "tags": pd.DataFrame({"id": [5, 6], "name": ["Vegan", "Winter"]}),
+        "recipe_ing_map": pd.DataFrame({"recipe_id": [10, 20, 10, 30, 99], "ingredient_id": [1, 2, 2, 3, 1]}),
+        "recipe_tag_map": pd.DataFrame({"recipe_id": [20, 10, 30], "tag_id": [5, 6, 6]}),
+    }
+
+
+def test_csr_lookups_preserve_map_order():
+    catalog = RecipeCatalog.from_tables(small_tables())
+
+    assert len(catalog) == 3
+    assert catalog.ingredients_of(0) == ["Leek", "Kale"]
+    assert catalog.ingredients_of(1) == ["Kale"]
+    assert catalog.tags_of(1) == ["Vegan"]
+    assert catalog.tags_of(2) == ["Winter"]
+    assert list(catalog.ingredient_offsets) == [0, 2, 3, 4]  # recipe 99 is not in the catalog
+
+
+def test_row_materializes_plain_values():
+    row = RecipeCatalog.from_tables(small_tables()).row(1)
+
+    assert row == {
+        "id": 20, "name": "Salad", "description": "", "image_url": "x.jpg", "min_prep_time": None,
+        "green_score": 95.0, "tags": ["Vegan"], "ingredients": ["Kale"],
+    }
+    assert isinstance(RecipeCatalog.from_tables(small_tables()).min_prep_time, np.ndarray)
+
+
+def test_merge_replaces_changed_rows_and_appends_new_ones():
+    catalog = RecipeCatalog.from_tables(small_tables())
+    changed = RecipeCatalog.from_tables({
+        "recipes": pd.DataFrame({"id": [20, 40], "name": ["Salad v2", "Curry"], "description": ["Crisp", "Hot"],
+                                 "min_prep_time": [5, 30], "green_score": [90, 60], "image_url": [None, None]}),
+        "ingredients": pd.DataFrame({"id": [2, 4], "name": ["Curly kale", "Rice"]}),
+        "tags": pd.DataFrame({"id": [6, 7], "name": ["Winter", "Spicy"]}),
+        "recipe_ing_map": pd.DataFrame({"recipe_id": [40, 20, 40], "ingredient_id": [4, 2, 2]}),
+        "recipe_tag_map": pd.DataFrame({"recipe_id": [40, 40], "tag_id": [7, 6]}),
+    })
+
+    merged = catalog.merge(changed)
+
+    assert list(merged.ids) == [10, 30, 20, 40]
+    assert [merged.row(i)["name"] for i in range(4)] == ["Soup", "Stew", "Salad v2", "Curry"]
+    assert merged.ingredients_of(0) == ["Leek", "Curly kale"]  # renamed ingredient
+    assert merged.ingredients_of(3) == ["Rice", "Curly kale"]
+    assert merged.tags_of(2) == [] and merged.tags_of(3) == ["Spicy", "Winter"]
+    assert merged.tags_of(1) == ["Winter"]
+    assert list(merged.tag_keys) == [5, 6, 7]
+    assert list(catalog.ids) == [10, 20, 30]  # original untouched
+
+
+def test_dataset_catalog_matches_map_tables():
+    tables, _ = load_tables(FakeSupabase())
+    catalog = RecipeCatalog.from_tables(tables)
+
+    assert len(catalog) == len(tables["recipes"])
+    assert catalog.ingredient_offsets[-1] == len(tables["recipe_ing_map"])
+    assert catalog.tag_offsets[-1] == len(tables["recipe_tag_map"])
+    assert catalog.nbytes() > 0
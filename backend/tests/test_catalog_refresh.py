@@ -0,0 +1,117 @@
+# backend/tests/test_catalog_refresh.py
+import sys, os
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.catalog_refresh import CatalogRefresher, Watermark
+
+
+def add_recipe(fake_supabase, recipe_id, name, ingredient_ids, updated_at=None):
+    fake_supabase.tables["Recipe"].append({
+        "id": recipe_id, "name": name, "description": f"{name} description", "min_prep_time": 10,
+        "green_score": 50, "image_url": None, "updated_at": updated_at,
+    })
+    for ingredient_id in ingredient_ids:
+        fake_supabase.tables["Recipe-Ingredient_Map"].append({
+            "id": 10_000_000 + recipe_id * 100 + ingredient_id, "recipe_id": recipe_id,
+            "ingredient_id": ingredient_id, "relative_unit_100": 100,
+        })
+
+
+def test_refresh_merges_only_new_recipes(offline_recommender, fake_supabase, fake_embedder):
+    before = offline_recommender.current_catalog()
+    fake_embedder.calls.clear()
+    add_recipe(fake_supabase, 99999, "Protein Pancakes", [1, 2])
+
+    after = offline_recommender.refresh_catalog()
+
+    assert after is offline_recommender.current_catalog()
+    assert after is not before
+    assert len(after.recipes) == len(before.recipes) + 1
+    assert 99999 not in set(before.recipes.ids)  # old snapshot untouched
+    new_row = after.recipes.row(list(after.recipes.ids).index(99999))
+    assert len(new_row["ingredients"]) == 2
+    assert after.nutrient_matrix.shape[0] == len(after.recipes) == len(after.embeddings)
+    # Only the new recipe text was embedded.
+    assert fake_embedder.calls == [[offline_recommender.make_recipe_text(new_row)]]
+    assert after.watermark.max_id == 99999
+
+
+def test_merged_snapshot_matches_full_rebuild(offline_recommender, fake_supabase):
+    from api.supabase_loader import load_tables
+
+    fake_supabase.tables["Recipe"][0]["updated_at"] = "2025-01-01T00:00:00+00:00"
+    before = offline_recommender.current_catalog()
+    add_recipe(fake_supabase, 99999, "Protein Pancakes", [1, 2])
+    changed = fake_supabase.tables["Recipe"][1]
+    changed["updated_at"] = "2025-06-01T00:00:00+00:00"
+    fake_supabase.tables["Recipe-Ingredient_Map"] = [
+        m for m in fake_supabase.tables["Recipe-Ingredient_Map"] if m["recipe_id"] != changed["id"]
+    ] + [{"id": 20_000_000, "recipe_id": changed["id"], "ingredient_id": 3, "relative_unit_100": 200}]
+
+    after = offline_recommender.refresh_catalog()
+    rebuilt = offline_recommender.build_catalog(load_tables(fake_supabase)[0])
+
+    assert not hasattr(after, "tables") and not hasattr(before, "tables")
+    order = {recipe_id: i for i, recipe_id in enumerate(rebuilt.recipes.ids)}
+    rows = [order[recipe_id] for recipe_id in after.recipes.ids]
+    assert sorted(rows) == list(range(len(rebuilt.recipes)))
+    assert [after.recipes.row(i) for i in range(len(rows))] == [rebuilt.recipes.row(i) for i in rows]
+    np.testing.assert_allclose(after.nutrient_matrix, rebuilt.nutrient_matrix[rows], rtol=1e-5)
+
+
+def test_refresh_picks_up_updated_recipes(offline_recommender, fake_supabase, fake_embedder):
+    fake_supabase.tables["Recipe"][0]["updated_at"] = "2025-01-01T00:00:00+00:00"
+    offline_recommender.current_catalog()
+    fake_embedder.calls.clear()
+
+    changed = fake_supabase.tables["Recipe"][1]
+    changed["description"] = "Now with extra beans"
+    changed["updated_at"] = "2025-06-01T00:00:00+00:00"
+    after = offline_recommender.refresh_catalog()
+
+    row = after.recipes.row(list(after.recipes.ids).index(changed["id"]))
+    assert row["description"] == "Now with extra beans"
+    assert len(after.recipes) == len(fake_supabase.tables["Recipe"])
+    assert len(fake_embedder.calls) == 1 and len(fake_embedder.calls[0]) == 1
+
+
+def test_refresh_without_changes_keeps_snapshot(offline_recommender):
+    before = offline_recommender.current_catalog()
+    assert offline_recommender.refresh_catalog() is before
+
+
+def test_watermark_of_recipes(fake_supabase):
+    import pandas as pd
+
+    recipes = pd.DataFrame({"id": [3, 9], "updated_at": [None, "2025-02-02"]})
+    assert Watermark.of(recipes) == Watermark(9, "2025-02-02")
+    assert Watermark.of(recipes.iloc[:0]) == Watermark()
+
+
+def test_refresher_thread_survives_errors():
+    calls = []
+
+    def flaky_refresh():
+        calls.append(1)
+        raise RuntimeError("supabase down")
+
+    refresher = CatalogRefresher(flaky_refresh, interval=0.01).start()
+    time.sleep(0.1)
+    refresher.stop(timeout=1)
+    assert len(calls) >= 2
+
+
+def test_refresher_stop_does_not_hang_on_a_stuck_refresh():
+    release = threading.Event()
+    refresher = CatalogRefresher(release.wait, interval=0.01).start()
+    time.sleep(0.05)  # now blocked inside refresh()
+
+    started = time.perf_counter()
+    refresher.stop(timeout=0.1)
+    assert time.perf_counter() - started < 1
+    release.set()
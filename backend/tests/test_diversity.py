@@ -0,0 +1,58 @@
+# backend/tests/test_diversity.py
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from api.diversity import DIVERSITY_METHODS, k_center_select, mmr_select, select_diverse
+
+
+def unit(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+# Three near-duplicates of the best recipe, then two different directions.
+VECTORS = unit([[1, 0, 0], [0.99, 0.01, 0], [0.98, 0.02, 0], [0, 1, 0], [0, 0, 1]])
+RELEVANCE = np.array([0.9, 0.89, 0.88, 0.5, 0.4], dtype=np.float32)
+
+
+@pytest.mark.parametrize("method", sorted(DIVERSITY_METHODS))
+def test_always_returns_k_in_rank_order(method):
+    selected = select_diverse(VECTORS, RELEVANCE, 3, method=method)
+
+    assert len(selected) == 3
+    assert list(selected) == sorted(selected)
+    assert 0 in selected  # the best recipe is always kept
+
+
+@pytest.mark.parametrize("method", sorted(DIVERSITY_METHODS))
+def test_identical_vectors_still_fill_every_slot(method):
+    """KMeans leaves clusters empty on duplicates; every selector must still return k."""
+    vectors = unit(np.ones((20, 4)))
+    relevance = np.linspace(1, 0, 20)
+
+    assert len(select_diverse(vectors, relevance, 7, method=method)) == 7
+
+
+def test_mmr_skips_near_duplicates():
+    assert list(mmr_select(VECTORS, RELEVANCE, 3, trade_off=0.5)) == [0, 3, 4]
+
+
+def test_mmr_trade_off_one_is_pure_relevance():
+    assert list(mmr_select(VECTORS, RELEVANCE, 3, trade_off=1.0)) == [0, 1, 2]
+
+
+def test_k_center_spreads_out():
+    assert list(k_center_select(VECTORS, RELEVANCE, 3)) == [0, 3, 4]
+
+
+def test_fewer_candidates_than_k():
+    assert list(select_diverse(VECTORS[:2], RELEVANCE[:2], 5)) == [0, 1]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        select_diverse(VECTORS, RELEVANCE, 3, method="dpp")
@@ -0,0 +1,161 @@
+# backend/tests/test_embedding_store.py
+import sys, os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.embedding_store import EmbeddingStore
+
+
+class CountingEncoder:
+    """Deterministic fake encoder that records every text it embeds."""
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.seen = []
+
+    def __call__(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(t) + i for i in range(self.dim)] for t in texts], dtype=np.float32)
+
+
+def test_sync_builds_and_persists(tmp_path):
+    encoder = CountingEncoder()
+    store = EmbeddingStore(tmp_path, "test-model")
+    vectors = store.sync([1, 2], ["a", "bb"], encoder)
+
+    assert vectors.shape == (2, 4)
+    assert encoder.seen == ["a", "bb"]
+
+    # A fresh process loads the matrix memory-mapped and encodes nothing.
+    reopened = EmbeddingStore(tmp_path, "test-model")
+    again = reopened.sync([1, 2], ["a", "bb"], encoder)
+    assert isinstance(again, np.memmap)
+    assert encoder.seen == ["a", "bb"]
+    np.testing.assert_array_equal(again, vectors)
+
+
+def test_sync_only_encodes_changed_rows(tmp_path):
+    encoder = CountingEncoder()
+    store = EmbeddingStore(tmp_path, "test-model")
+    store.sync([1, 2, 3], ["a", "bb", "ccc"], encoder)
+    encoder.seen.clear()
+
+    vectors = store.sync([1, 3, 4], ["a", "cccc", "dd"], encoder)
+
+    assert encoder.seen == ["cccc", "dd"]
+    assert store.ids == [1, 3, 4]
+    np.testing.assert_array_equal(vectors[0], encoder(["a"])[0])
+
+
+def test_model_change_invalidates_store(tmp_path):
+    encoder = CountingEncoder()
+    EmbeddingStore(tmp_path / "store", "model-a").sync([1], ["a"], encoder)
+    encoder.seen.clear()
+
+    # Same directory, different model: nothing can be reused.
+    store = EmbeddingStore(tmp_path / "store", "model-b")
+    store.sync([1], ["a"], encoder)
+    assert encoder.seen == ["a"]
+
+
+def test_embedder_backends_get_separate_stores(tmp_path):
+    from api.recommender import embedder_options, embedding_model_id
+
+    assert embedder_options("torch") == {}
+    assert embedder_options("onnx") == {"backend": "onnx"}
+    assert embedder_options("onnx-int8")["model_kwargs"]["file_name"].endswith(".onnx")
+    with pytest.raises(ValueError):
+        embedder_options("tensorrt")
+
+    # The torch store keeps its old name; ONNX vectors never mix with it.
+    assert embedding_model_id("torch") == "all-MiniLM-L6-v2"
+    torch_store = EmbeddingStore(tmp_path, embedding_model_id("torch"))
+    int8_store = EmbeddingStore(tmp_path, embedding_model_id("onnx-int8"))
+    assert torch_store.vectors_path != int8_store.vectors_path
+
+
+def test_empty_catalog_syncs(tmp_path):
+    store = EmbeddingStore(tmp_path, "test-model")
+
+    assert store.sync([], [], CountingEncoder()).shape[0] == 0
+    assert store.sync([], [], CountingEncoder()).shape[0] == 0  # nothing stale, nothing loaded before
+
+
+def test_concurrent_saves_leave_a_consistent_store(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def sync(n):
+        EmbeddingStore(tmp_path, "test-model").sync(list(range(n)), ["x" * (i + 1) for i in range(n)],
+                                                     CountingEncoder())
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(sync, [3, 5, 7, 9] * 4))
+
+    store = EmbeddingStore(tmp_path, "test-model")
+    assert store.vectors.shape[0] == len(store.ids) > 0
+    assert [p.name for p in tmp_path.glob("*.npy")] == [store.vectors_path.name]  # old matrices pruned
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_crash_before_manifest_keeps_previous_store(tmp_path, monkeypatch):
+    import api.embedding_store as embedding_store
+
+    encoder = CountingEncoder()
+    EmbeddingStore(tmp_path, "test-model").sync([1, 2], ["a", "bb"], encoder)
+
+    def crash(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(embedding_store.os, "replace", crash)
+    with pytest.raises(OSError):
+        EmbeddingStore(tmp_path, "test-model").sync([1, 2, 3], ["a", "bb", "ccc"], encoder)
+    monkeypatch.undo()
+
+    store = EmbeddingStore(tmp_path, "test-model")
+    assert store.ids == [1, 2]
+    np.testing.assert_array_equal(store.vectors, encoder(["a", "bb"]))
+
+
+def test_prune_artifacts_keeps_only_the_current_index(tmp_path):
+    encoder = CountingEncoder()
+    store = EmbeddingStore(tmp_path, "test-model")
+    store.sync([1], ["a"], encoder)
+    old = store.artifact_path(".hnsw")
+    old.write_bytes(b"old")
+    other_backend = store.artifact_path(".exact")
+    other_backend.write_bytes(b"exact")
+    other_model = EmbeddingStore(tmp_path, "test-model_onnx").artifact_path(".hnsw")
+    other_model.write_bytes(b"onnx")
+
+    store.sync([1, 2], ["a", "bb"], encoder)
+    current = store.artifact_path(".hnsw")
+    assert current != old
+    current.write_bytes(b"new")
+    store.prune_artifacts(".hnsw")
+
+    assert current.exists() and not old.exists()
+    assert other_backend.exists() and other_model.exists()
+
+
+def test_backend_tolerance_boundary():
+    from benchmarks.bench_embedder import BACKEND_MIN_COSINE, backends_agree
+
+    def rotated(cosine):
+        # Unit vectors at an exact cosine from e0, as another backend's output for the same texts.
+        sine = np.sqrt(1 - cosine**2)
+        return np.array([[cosine, sine, 0, 0], [cosine, 0, sine, 0]], dtype=np.float32)
+
+    base = np.eye(4, dtype=np.float32)[[0, 0]]
+    assert backends_agree(base, base)
+    assert backends_agree(base, rotated(BACKEND_MIN_COSINE + 1e-4))
+    assert not backends_agree(base, rotated(BACKEND_MIN_COSINE - 1e-4))
+
+    # One row outside the tolerance is enough to reject the backend; scale does not matter.
+    mixed = rotated(BACKEND_MIN_COSINE + 1e-4)
+    mixed[1] = rotated(BACKEND_MIN_COSINE - 1e-4)[1]
+    assert not backends_agree(base, mixed)
+    assert backends_agree(3 * base, 0.5 * rotated(BACKEND_MIN_COSINE + 1e-4))
+    assert not backends_agree(base, base[:1])
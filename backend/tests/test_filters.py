@@ -0,0 +1,100 @@
+# backend/tests/test_filters.py
+import sys, os
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.catalog import RecipeCatalog
+from api.filters import FilterIndex, RecipeFilter
+from tests.test_catalog import small_tables
+
+# small_tables(): Soup (Leek, Kale; Winter; 15 min), Salad (Kale; Vegan; no prep time),
+# Stew (Beef; Winter; 90 min)
+
+
+def mask(**kwargs):
+    return FilterIndex(RecipeCatalog.from_tables(small_tables())).mask(RecipeFilter(**kwargs)).tolist()
+
+
+def test_empty_filter_is_no_mask():
+    index = FilterIndex(RecipeCatalog.from_tables(small_tables()))
+    assert index.mask(RecipeFilter()) is None
+    assert index.mask(None) is None
+
+
+def test_required_and_forbidden_tags():
+    assert mask(required_tags=("winter",)) == [True, False, True]
+    assert mask(forbidden_tags=("Winter",)) == [False, True, False]
+    assert mask(required_tags=("Winter", "Vegan")) == [False, False, False]
+    assert mask(required_tags=("Halal",)) == [False, False, False]  # unknown required tag
+    assert mask(forbidden_tags=("Halal",)) == [True, True, True]  # unknown forbidden tag
+
+
+def test_excluded_ingredients_match_substrings():
+    assert mask(excluded_ingredients=("kale",)) == [False, False, True]
+    assert mask(excluded_ingredients=("EE",)) == [False, True, False]  # leek, beef
+
+
+def test_max_prep_time_drops_unknown():
+    assert mask(max_prep_time=30) == [True, False, False]
+    assert mask(max_prep_time=30, forbidden_tags=("Winter",)) == [False, False, False]
+
+
+def test_bitsets_agree_with_catalog_rows():
+    catalog = RecipeCatalog.from_tables(small_tables())
+    index = FilterIndex(catalog)
+    for t, name in enumerate(catalog.tag_names):
+        bits = np.unpackbits(index.tag_bits[t], count=len(catalog)).astype(bool)
+        assert bits.tolist() == [name in catalog.tags_of(i) for i in range(len(catalog))]
+
+
+def test_packed_bitsets_match_dense_reference():
+    from api.filters import _bitsets
+
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(0, 4, 21)  # rows span several bytes, last one partial
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    values = rng.integers(0, 5, offsets[-1])
+    dense = np.zeros((5, 21), dtype=bool)
+    dense[values, np.repeat(np.arange(21), lengths)] = True
+
+    np.testing.assert_array_equal(_bitsets(21, 5, offsets, values), np.packbits(dense, axis=1))
+
+
+def test_excluded_term_cache_is_bounded(monkeypatch):
+    import api.filters as filters
+
+    monkeypatch.setattr(filters, "TERM_CACHE_SIZE", 2)
+    index = FilterIndex(RecipeCatalog.from_tables(small_tables()))
+    for term in ("leek", "kale", "beef", "tofu"):
+        index.mask(RecipeFilter(excluded_ingredients=(term,)))
+
+    assert index._term_rows.cache_info().currsize == 2
+    assert mask(excluded_ingredients=("KALE",)) == [False, False, True]
+
+
+def test_filtered_ranking_only_returns_matches(offline_recommender):
+    catalog = offline_recommender.current_catalog()
+    recipe_filter = RecipeFilter(forbidden_tags=("Meat",), excluded_ingredients=("oil",), max_prep_time=30)
+    allowed = set(np.flatnonzero(catalog.filters.mask(recipe_filter)))
+
+    ranked, _ = offline_recommender.rank_recipes_by_goal("high protein", top_k=50, filters=recipe_filter)
+
+    assert 0 < len(ranked) == len(allowed)
+    assert set(ranked.positions) == allowed
+    for position in ranked.positions:
+        row = catalog.recipes.row(position)
+        assert "Meat" not in row["tags"] and row["min_prep_time"] <= 30
+        assert not any("oil" in name.lower() for name in row["ingredients"])
+
+
+def test_recommender_endpoint_applies_filters(client, offline_recommender):
+    response = client.post("/recommender", json={
+        "goal": "dinner", "numMeals": 3, "requiredTags": ["Meat"], "excludedIngredients": ["garlic"],
+    })
+
+    assert response.status_code == 200
+    for meal in response.json()["recipes"]:
+        assert "Meat" in meal["tags"]
+        assert not any("garlic" in name.lower() for name in meal["key_ingredients"])
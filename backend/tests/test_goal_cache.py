@@ -0,0 +1,78 @@
+# backend/tests/test_goal_cache.py
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.recommender import GoalCache, normalize_goal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_goal_ignores_case_whitespace_and_punctuation():
+    assert normalize_goal("  Lose 5 KG!! ") == normalize_goal("lose 5 kg")
+    assert normalize_goal("High-protein") == "high protein"
+    # Punctuation/emoji-only goals still get a distinct key.
+    assert normalize_goal("🔥💪") == "🔥💪"
+
+
+def test_key_includes_model_and_prompt_version():
+    assert GoalCache.make_key("bulk", model="a") != GoalCache.make_key("bulk", model="b")
+    assert GoalCache.make_key("bulk", prompt_version="v1") != GoalCache.make_key("bulk", prompt_version="v2")
+    assert GoalCache.make_key("Bulk.") == GoalCache.make_key("bulk")
+
+
+def test_hits_misses_and_ttl():
+    clock = FakeClock()
+    cache = GoalCache(max_entries=10, ttl=60, clock=clock)
+
+    assert cache.get("k") is None
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+
+    clock.now += 61
+    assert cache.get("k") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 0}
+
+
+def test_lru_eviction():
+    cache = GoalCache(max_entries=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = tmp_path / "goals.sqlite"
+    GoalCache(max_entries=10, ttl=60, path=str(path)).set("k", "v")
+
+    restarted = GoalCache(max_entries=10, ttl=60, path=str(path))
+    assert restarted.get("k") == "v"
+    assert restarted.stats()["hits"] == 1
+
+
+def test_repeated_goals_hit_the_cache(offline_recommender, monkeypatch):
+    from tests.conftest import fake_goal_expansion
+
+    calls = []
+
+    def counting_expansion(goal_text):
+        calls.append(goal_text)
+        return fake_goal_expansion(goal_text)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion", counting_expansion)
+    offline_recommender.create_meal_plan("Lose 5 kg", n_meals=3)
+    offline_recommender.create_meal_plan("lose 5 KG!", n_meals=3)
+
+    assert calls == ["Lose 5 kg"]
+    assert offline_recommender.load_goal_cache().stats()["hits"] == 1
@@ -0,0 +1,64 @@
+# backend/tests/test_pipeline.py
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def test_meal_plan_encodes_goal_only_once(offline_recommender, fake_embedder):
+    """The catalog comes from the store and the diversity stage reuses its rows."""
+    offline_recommender.load_recipe_embeddings()  # warm the store (startup/offline build)
+    fake_embedder.calls.clear()
+
+    meal_plan, _ = offline_recommender.create_meal_plan("high protein", n_meals=3)
+
+    assert len(meal_plan) == 3
+    assert len(fake_embedder.calls) == 1
+    assert len(fake_embedder.calls[0]) == 1  # one goal, through the batching encoder
+
+
+def test_select_diverse_recipes_uses_catalog_rows(offline_recommender, fake_embedder):
+    ranked, _ = offline_recommender.rank_recipes_by_goal("low carb", top_k=10)
+    fake_embedder.calls.clear()
+
+    diverse = offline_recommender.select_diverse_recipes(ranked, n_meals=3)
+
+    assert fake_embedder.calls == []
+    assert len(diverse) == 3
+    assert set(diverse.positions).issubset(set(ranked.positions))
+    assert list(diverse.scores) == sorted(diverse.scores, reverse=True)
+
+
+def test_meal_plan_makes_single_llm_call(offline_recommender, monkeypatch):
+    from tests.conftest import fake_goal_expansion
+
+    calls = []
+
+    def counting_expansion(goal_text):
+        calls.append(goal_text)
+        return fake_goal_expansion(goal_text)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion", counting_expansion)
+    meal_plan, expanded = offline_recommender.create_meal_plan("gain muscle", n_meals=5)
+
+    assert calls == ["gain muscle"]
+    assert len(meal_plan) == 5
+    assert "protein_g" in expanded
+
+
+def test_format_targets_skips_missing_nutrients(offline_recommender):
+    targets = offline_recommender.NutrientTargets(calories_kcal=1800.0, protein_g=95.5)
+    assert offline_recommender.format_targets(targets) == "calories_kcal: 1800, protein_g: 95.5"
+
+
+def test_rank_selects_top_k_without_touching_catalog(offline_recommender):
+    catalog = offline_recommender.load_recipe_catalog()
+
+    ranked, _ = offline_recommender.rank_recipes_by_goal("high protein", top_k=7)
+
+    assert len(ranked) == 7
+    assert list(ranked.scores) == sorted(ranked.scores, reverse=True)
+    assert offline_recommender.load_recipe_catalog() is catalog
+
+    # Same winners as scoring and fully sorting the catalog.
+    everything, _ = offline_recommender.rank_recipes_by_goal("high protein", top_k=len(catalog))
+    assert list(everything.positions[:7]) == list(ranked.positions)
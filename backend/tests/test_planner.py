@@ -0,0 +1,100 @@
+# backend/tests/test_planner.py
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+
+from api.planner import InfeasiblePlanError, plan_days
+
+SCALE = np.array([300, 20, 30, 8, 10, 50, 200, 100, 1, 10, 1, 2, 20], dtype=np.float64)
+
+
+def candidates(seed, n=200):
+    rng = np.random.default_rng(seed)
+    nutrients = rng.gamma(2.0, 1.0, size=(n, len(SCALE))) * SCALE / 2
+    targets = nutrients.mean(axis=0) * 3
+    targets[5:] = np.nan  # only calories + macros are targeted
+    return nutrients, rng.uniform(0.3, 0.9, n), targets
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_week_plan_meets_targets_without_repeats(seed):
+    nutrients, relevance, targets = candidates(seed)
+
+    plan = plan_days(nutrients, relevance, targets, n_days=7, meals_per_day=3, tolerance=0.1)
+
+    meals = [m for day in plan.days for m in day]
+    assert len(meals) == 21 and len(set(meals)) == 21
+    assert all(plan.within_tolerance)
+    np.testing.assert_allclose(plan.totals, nutrients[np.array(plan.days)].sum(axis=1))
+    assert plan.cost <= plan.stats["greedy_cost"]
+
+
+def test_time_budget_is_respected():
+    nutrients, relevance, targets = candidates(0, n=400)
+
+    plan = plan_days(nutrients, relevance, targets, n_days=14, meals_per_day=5, tolerance=0.01, time_budget=0.05)
+
+    assert plan.seconds < 0.5
+    assert len({m for day in plan.days for m in day}) == 70
+
+
+def test_without_targets_picks_most_relevant():
+    nutrients, relevance, _ = candidates(1, n=30)
+
+    plan = plan_days(nutrients, relevance, np.full(len(SCALE), np.nan), n_days=2, meals_per_day=3)
+
+    chosen = sorted(m for day in plan.days for m in day)
+    assert chosen == sorted(np.argsort(-relevance)[:6].tolist())
+
+
+def test_pool_too_small():
+    nutrients, relevance, targets = candidates(2, n=10)
+    with pytest.raises(InfeasiblePlanError):
+        plan_days(nutrients, relevance, targets, n_days=7, meals_per_day=3)
+
+
+def test_planner_endpoint(client, offline_recommender):
+    response = client.post("/planner", json={"goal": "high protein", "numDays": 3, "mealsPerDay": 3})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [d["day"] for d in data["days"]] == [1, 2, 3]
+    names = [m["name"] for d in data["days"] for m in d["meals"]]
+    assert len(names) == 9
+    assert set(data["targets"]) == {"calories_kcal", "protein_g", "carbs_g"}
+    assert all("calories_kcal" in d["totals"] for d in data["days"])
+
+
+def test_planner_endpoint_rejects_oversized_plans(client, offline_recommender):
+    # The bundled dataset has 50 recipes; 14 x 6 meals cannot avoid repeats.
+    assert client.post("/planner", json={"goal": "x", "numDays": 14, "mealsPerDay": 6}).status_code == 400
+    assert client.post("/planner", json={"goal": "x", "numDays": 30}).status_code == 400
+
+
+def test_planner_endpoint_does_not_turn_other_value_errors_into_400(client, offline_recommender, monkeypatch):
+    import api.index
+
+    async def broken(*args, **kwargs):
+        raise ValueError("malformed goal expansion")
+
+    monkeypatch.setattr(api.index, "create_multi_day_plan_async", broken)
+    with pytest.raises(ValueError):  # a server error, not a client one
+        client.post("/planner", json={"goal": "high protein", "numDays": 3})
+
+
+def test_candidates_are_ranked_per_requested_meal(offline_recommender, monkeypatch):
+    seen = []
+    blend = offline_recommender.blend_scores
+
+    def spy(semantic, targets, nutrients, weight):
+        seen.append(targets)
+        return blend(semantic, targets, nutrients, weight)
+
+    monkeypatch.setattr(offline_recommender, "blend_scores", spy)
+    offline_recommender.create_multi_day_plan("high protein", n_days=2, meals_per_day=5)
+
+    expansion = offline_recommender.cached_goal_expansion("high protein")
+    np.testing.assert_allclose(seen[-1], offline_recommender.nutrition_goal("high protein", expansion) / 5)
@@ -0,0 +1,69 @@
+# backend/tests/test_retrieval.py
+import sys, os
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.retrieval import ExactIndex, build_index, top_k_indices
+
+
+def random_unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_top_k_indices_matches_full_sort():
+    scores = np.random.default_rng(1).random(1000).astype(np.float32)
+    np.testing.assert_array_equal(top_k_indices(scores, 10), np.argsort(-scores)[:10])
+    assert len(top_k_indices(scores[:3], 10)) == 3
+    assert len(top_k_indices(scores, 0)) == 0
+
+
+def test_exact_index_search():
+    vectors = random_unit_vectors(500)
+    index = ExactIndex(vectors)
+
+    positions, sims = index.search(vectors[42], 5)
+
+    assert positions[0] == 42
+    np.testing.assert_allclose(sims[0], 1.0, rtol=1e-5)
+    assert list(sims) == sorted(sims, reverse=True)
+
+
+def test_hnsw_index_recall_and_persistence(tmp_path):
+    pytest.importorskip("hnswlib")
+    vectors = random_unit_vectors(2000)
+    queries = random_unit_vectors(20, seed=1)
+    exact = ExactIndex(vectors)
+    path = tmp_path / "catalog.hnsw"
+
+    ann = build_index(vectors, "hnsw", path=path)
+    assert path.exists()
+    assert [p.name for p in tmp_path.iterdir()] == ["catalog.hnsw"]  # no temp file left behind
+    reloaded = build_index(vectors, "hnsw", path=path)
+
+    hits = 0
+    for q in queries:
+        expected = set(exact.search(q, 10)[0])
+        hits += len(expected & set(ann.search(q, 10)[0]))
+        np.testing.assert_array_equal(ann.search(q, 10)[0], reloaded.search(q, 10)[0])
+    assert hits / (10 * len(queries)) > 0.9
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        build_index(random_unit_vectors(3), "nope")
+
+
+def test_rank_with_ann_index_matches_exact(offline_recommender, monkeypatch):
+    pytest.importorskip("hnswlib")
+    exact_ranked, _ = offline_recommender.rank_recipes_by_goal("high protein", top_k=5)
+
+    monkeypatch.setattr(offline_recommender, "RETRIEVAL_INDEX", "hnsw")
+    offline_recommender.reset_catalog()
+    assert offline_recommender.load_retrieval_index().name == "hnsw"
+    ann_ranked, _ = offline_recommender.rank_recipes_by_goal("high protein", top_k=5)
+
+    assert list(ann_ranked.positions) == list(exact_ranked.positions)
@@ -0,0 +1,208 @@
+# backend/tests/test_retry.py
+import sys, os
+import asyncio
+import dataclasses
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+import pytest
+from epicourier_retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing(*errors, result="ok"):
+    """Callable that raises ``errors`` in turn, then returns ``result``; counts calls."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def policy(**kwargs):
+    return RetryPolicy(attempts={"connect": 4, "server": 3, "timeout": 2}, sleep=lambda s: None, **kwargs)
+
+
+def test_backoff_is_jittered_and_capped():
+    retry = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    delays = [retry.backoff(10) for _ in range(200)]
+
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 100  # full jitter, not a fixed sleep
+    assert all(0 <= retry.backoff(0) <= 1.0 for _ in range(50))
+
+
+def test_each_error_kind_has_its_own_attempt_limit():
+    connect = failing(*[ConnectionError("refused")] * 10)
+    with pytest.raises(ConnectionError):
+        policy().call(connect)
+    assert len(connect.calls) == 4
+
+    timeout = failing(*[TimeoutError("read")] * 10)
+    with pytest.raises(TimeoutError):
+        policy().call(timeout)
+    assert len(timeout.calls) == 2
+
+    fatal = failing(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        policy().call(fatal)
+    assert len(fatal.calls) == 1  # unclassified errors are not retried
+
+
+def test_transient_errors_are_retried_until_success():
+    fn = failing(ConnectionError("refused"), TimeoutError("read"))
+
+    assert policy().call(fn) == "ok"
+    assert len(fn.calls) == 3
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("model", failure_threshold=3, reset_timeout=10, clock=clock)
+    down = failing(*[ConnectionError("refused")] * 3)
+
+    with pytest.raises(CircuitOpenError):  # opens on the third failure, before the fourth try
+        policy().call(down, breaker=breaker)
+    assert len(down.calls) == 3
+    assert breaker.state == "open"
+
+    fn = failing()
+    with pytest.raises(CircuitOpenError) as info:
+        policy().call(fn, breaker=breaker)
+    assert fn.calls == []  # no request while open
+    assert info.value.retry_in == pytest.approx(10)
+
+    clock.now = 11
+    assert breaker.state == "half-open"
+    assert breaker.acquire() == 0  # one probe goes through
+    assert breaker.acquire() > 0  # the others wait for it
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+
+    with pytest.raises(ConnectionError):
+        RetryPolicy(attempts={"connect": 1}).call(failing(ConnectionError("still down")), breaker=breaker)
+
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+
+
+def test_timeouts_and_bad_requests_do_not_open_breaker():
+    breaker = CircuitBreaker("model", failure_threshold=2)
+
+    for error in (TimeoutError("slow"), ValueError("bad")):
+        with pytest.raises(type(error)):
+            RetryPolicy(attempts={"timeout": 1}).call(failing(error), breaker=breaker)
+
+    assert breaker.state == "closed"
+
+
+def test_timeouts_do_not_reset_failure_count():
+    breaker = CircuitBreaker("model", failure_threshold=2)
+    retry = RetryPolicy(attempts={"connect": 1, "timeout": 1})
+
+    for error in (ConnectionError("refused"), TimeoutError("hung"), ConnectionError("refused")):
+        with pytest.raises(Exception):
+            retry.call(failing(error), breaker=breaker)
+
+    assert breaker.state == "open"
+    assert breaker.opened == 1
+
+
+def test_timed_out_probe_keeps_circuit_open():
+    clock = Clock()
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+
+    with pytest.raises(TimeoutError):
+        RetryPolicy(attempts={"timeout": 1}).call(failing(TimeoutError("hung")), breaker=breaker)
+
+    assert breaker.state == "half-open"
+    assert breaker.acquire() == 0  # the next caller may probe again
+    assert breaker.failures == 1
+
+
+def test_cancelled_probe_lets_the_next_caller_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    async def cancelled_probe():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(RetryPolicy().call_async(hang, breaker=breaker), timeout=0.01)
+
+    asyncio.run(cancelled_probe())
+
+    assert breaker.state == "half-open"
+    assert breaker.failures == 1
+    assert RetryPolicy().call(lambda: "ok", breaker=breaker) == "ok"  # would raise CircuitOpenError
+    assert breaker.state == "closed"
+
+
+def test_call_async_retries():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("refused")
+        return "ok"
+
+    retry = RetryPolicy(base_delay=0.001, max_delay=0.001)
+
+    assert asyncio.run(retry.call_async(flaky)) == "ok"
+    assert len(calls) == 3
+
+
+def test_goal_expansion_retries_gemini_connection_errors(monkeypatch):
+    import api.recommender as recommender
+    from tests.conftest import fake_goal_expansion
+
+    expansion = fake_goal_expansion("high protein")
+    generate = failing(httpx.ConnectError("refused"), httpx.ReadTimeout("slow"),
+                       result=SimpleNamespace(parsed=expansion))
+    client = SimpleNamespace(models=SimpleNamespace(generate_content=lambda **kwargs: generate()))
+    monkeypatch.setattr(recommender, "load_gemini_client", lambda: client)
+    monkeypatch.setattr(recommender, "GEMINI_RETRY", dataclasses.replace(recommender.GEMINI_RETRY, sleep=lambda s: None))
+    monkeypatch.setattr(recommender, "GEMINI_BREAKER", CircuitBreaker("gemini"))
+
+    assert recommender.goal_expansion("high protein") == expansion
+    assert len(generate.calls) == 3
+
+
+def test_open_gemini_circuit_maps_to_503(client, offline_recommender, monkeypatch):
+    async def gemini_down(goal_text):
+        raise CircuitOpenError("gemini", 12.5)
+
+    monkeypatch.setattr(offline_recommender, "goal_expansion_async", gemini_down)
+
+    response = client.post("/recommender", json={"goal": "gemini is down", "numMeals": 3})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
@@ -0,0 +1,88 @@
+# backend/tests/test_scoring.py
+import sys, os
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.scoring import (
+    NUTRIENT_COLUMNS, build_nutrient_matrix, nutrient_similarity, rollup_nutrient_matrix, score_recipes,
+)
+from tests.conftest import DATASET_DIR
+
+
+def test_build_nutrient_matrix_scales_by_relative_unit():
+    ingredients = pd.DataFrame({"id": [1, 2], "calories_kcal": [100, 50], "protein_g": [10, None]})
+    recipe_ing_map = pd.DataFrame(
+        {"recipe_id": [7, 7, 8, 99], "ingredient_id": [1, 2, 2, 1], "relative_unit_100": [200, 50, 100, 100]}
+    )
+
+    matrix = build_nutrient_matrix([7, 8], recipe_ing_map, ingredients)
+
+    cal = NUTRIENT_COLUMNS.index("calories_kcal")
+    protein = NUTRIENT_COLUMNS.index("protein_g")
+    assert matrix.shape == (2, len(NUTRIENT_COLUMNS))
+    assert matrix[0, cal] == 225  # 2 x 100 + 0.5 x 50
+    assert matrix[0, protein] == 20  # missing nutrient values count as 0
+    assert matrix[1, cal] == 50  # rows for unknown recipes (99) are ignored
+
+
+def test_nutrient_similarity_prefers_closest_recipe():
+    matrix = np.zeros((3, len(NUTRIENT_COLUMNS)), dtype=np.float32)
+    matrix[:, 0] = [200, 600, 2000]
+    targets = np.full(len(NUTRIENT_COLUMNS), np.nan)
+    targets[0] = 650
+
+    scores = nutrient_similarity(matrix, targets)
+
+    assert scores.argmax() == 1
+    assert np.all((scores > 0) & (scores <= 1))
+
+
+def test_score_recipes_without_targets_is_cosine():
+    embeddings = np.eye(3, dtype=np.float32)
+    goal = np.array([0.6, 0.8, 0.0], dtype=np.float32)
+
+    np.testing.assert_allclose(score_recipes(goal, embeddings), [0.6, 0.8, 0.0])
+    no_targets = np.full(len(NUTRIENT_COLUMNS), np.nan)
+    np.testing.assert_allclose(
+        score_recipes(goal, embeddings, no_targets, np.zeros((3, len(NUTRIENT_COLUMNS))), 0.5), [0.6, 0.8, 0.0]
+    )
+
+
+def test_score_recipes_blends_nutrient_distance():
+    embeddings = np.tile(np.array([[1.0, 0.0]], dtype=np.float32), (2, 1))
+    matrix = np.zeros((2, len(NUTRIENT_COLUMNS)), dtype=np.float32)
+    matrix[:, 1] = [10, 40]
+    targets = np.full(len(NUTRIENT_COLUMNS), np.nan)
+    targets[1] = 40
+
+    scores = score_recipes(np.array([1.0, 0.0]), embeddings, targets, matrix, nutrient_weight=0.5)
+
+    assert scores[1] > scores[0]
+    assert scores[1] == 1.0
+
+
+def test_rollup_nutrient_matrix_matches_ingredient_join():
+    read = lambda name: pd.read_csv(os.path.join(DATASET_DIR, name))
+    recipe_ids = read("recipes-supabase.csv")["id"].to_numpy()
+    recipe_ing_map, ingredients = read("recipe_ingredient_map-supabase.csv"), read("ingredients-supabase.csv")
+
+    rollup = rollup_nutrient_matrix(recipe_ids, read("recipe_nutrition-supabase.csv"), recipe_ing_map, ingredients)
+
+    expected = build_nutrient_matrix(recipe_ids, recipe_ing_map, ingredients)
+    np.testing.assert_allclose(rollup, expected, rtol=1e-3, atol=1e-2)  # CSV is rounded to 3 decimals
+
+
+def test_rollup_nutrient_matrix_falls_back_for_missing_recipes():
+    ingredients = pd.DataFrame({"id": [1], "calories_kcal": [100]})
+    recipe_ing_map = pd.DataFrame({"recipe_id": [7, 8], "ingredient_id": [1, 1], "relative_unit_100": [100, 300]})
+    recipe_nutrition = pd.DataFrame({"id": [1], "recipe_id": [7], "calories_kcal": [999.0]})
+    cal = NUTRIENT_COLUMNS.index("calories_kcal")
+
+    partial = rollup_nutrient_matrix([7, 8], recipe_nutrition, recipe_ing_map, ingredients)
+    absent = rollup_nutrient_matrix([7, 8], None, recipe_ing_map, ingredients)
+
+    assert partial[:, cal].tolist() == [999, 300]  # rollup wins where present
+    assert absent[:, cal].tolist() == [100, 300]
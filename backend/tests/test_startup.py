@@ -0,0 +1,83 @@
+# backend/tests/test_startup.py
+import sys, os
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY_MODULES = ["torch", "sentence_transformers", "sklearn", "google.genai", "supabase"]
+
+
+def test_importing_api_is_cheap():
+    """Heavy dependencies load on first use, not when a worker imports the app."""
+    code = "import sys, api.index; print(','.join(m for m in %r if m in sys.modules))" % HEAVY_MODULES
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_healthz_is_live(client):
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_readyz_waits_for_warmup(client, offline_recommender, monkeypatch):
+    import threading
+
+    release = threading.Event()
+    steps = offline_recommender.warmup_steps()
+    monkeypatch.setattr(offline_recommender, "_warmup", None)
+    monkeypatch.setattr(offline_recommender, "warmup_steps", lambda: [("gate", release.wait)] + steps)
+
+    warmup = offline_recommender.start_warmup()
+    pending = client.get("/readyz")
+    release.set()
+    assert warmup.wait(timeout=30)
+    ready = client.get("/readyz")
+
+    assert pending.status_code == 503
+    assert pending.json()["state"] in ("pending", "running")
+    assert ready.status_code == 200
+    timings = ready.json()["timings"]
+    assert {"embedder", "embedding_store", "catalog", "catalog.tables", "catalog.embeddings", "total"} <= set(timings)
+    assert offline_recommender._catalog is not None  # first request will not load anything
+
+
+def test_warmup_failure_is_reported(monkeypatch):
+    from api.warmup import Warmup
+
+    def broken():
+        raise RuntimeError("no network")
+
+    warmup = Warmup([("ok", lambda: None), ("supabase", broken), ("never", lambda: None)], attempts=3,
+                    sleep=lambda s: None).start()
+
+    assert warmup.wait(timeout=5) is False
+    status = warmup.status()
+    assert status["state"] == "failed"
+    assert status["error"] == "supabase: no network"
+    assert status["retries"] == 2
+    assert set(status["timings"]) == {"ok"}
+
+
+def test_warmup_retries_a_failed_step(monkeypatch):
+    from api.warmup import Warmup
+
+    calls = []
+    delays = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("supabase unreachable")
+
+    warmup = Warmup([("ok", lambda: None), ("supabase", flaky)], base_delay=0.5, sleep=delays.append).start()
+
+    assert warmup.wait(timeout=5) is True
+    status = warmup.status()
+    assert status["state"] == "ready"
+    assert status["error"] is None
+    assert status["retries"] == 1
+    assert delays == [0.5]
+    assert len(calls) == 2
+    assert {"ok", "supabase", "total"} <= set(status["timings"])
@@ -0,0 +1,65 @@
+# backend/tests/test_supabase_loader.py
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.supabase_loader import RECIPE_TABLES, fetch_table, load_tables
+from tests.conftest import FakeSupabase
+
+
+def test_fetch_table_pages_past_max_rows_cap():
+    # Server caps responses at 40 rows even though we ask for pages of 100.
+    client = FakeSupabase(max_rows=40)
+    expected = len(client.tables["Recipe-Ingredient_Map"])
+    assert expected > 40
+
+    frame, stats = fetch_table(client, "Recipe-Ingredient_Map", ["recipe_id", "ingredient_id"], page_size=100)
+
+    assert len(frame) == expected
+    assert stats["rows"] == expected
+    assert stats["pages"] == -(-expected // 40)
+    assert stats["bytes"] > 0
+    assert list(frame.columns) == ["recipe_id", "ingredient_id"]
+
+
+def test_fetch_table_small_pages():
+    client = FakeSupabase()
+    frame, stats = fetch_table(client, "RecipeTag", ["id", "name"], page_size=7)
+
+    assert len(frame) == len(client.tables["RecipeTag"])
+    assert frame["id"].is_unique
+    assert stats["pages"] == -(-len(frame) // 7)
+
+
+def test_load_tables_fetches_every_table_with_selected_columns():
+    client = FakeSupabase()
+    frames, stats = load_tables(client)
+
+    assert set(frames) == set(RECIPE_TABLES) == set(stats)
+    for key, (table, columns) in RECIPE_TABLES.items():
+        assert list(frames[key].columns) == columns
+        assert len(frames[key]) == len(client.tables[table])
+
+
+def test_load_tables_tolerates_missing_optional_table():
+    client = FakeSupabase()
+    del client.tables["recipe_nutrition"]
+
+    frames, stats = load_tables(client)
+
+    assert frames["recipe_nutrition"].empty
+    assert list(frames["recipe_nutrition"].columns) == RECIPE_TABLES["recipe_nutrition"][1]
+    assert stats["recipe_nutrition"]["rows"] == 0
+
+
+def test_missing_optional_table_is_reported_once(capsys, monkeypatch):
+    import api.supabase_loader as supabase_loader
+
+    monkeypatch.setattr(supabase_loader, "_reported_missing", set())
+    client = FakeSupabase()
+    del client.tables["recipe_nutrition"]
+
+    load_tables(client)
+    load_tables(client)
+
+    assert capsys.readouterr().out.count("unavailable") == 1
@@ -0,0 +1,71 @@
+"""
+bench_cache_store.py — Directory-of-JSON cache vs the SQLite cache store
+
+Usage:
+    python bench_cache_store.py --entries 20000
+
+Writes ``entries`` synthetic responses (every ERROR_EVERY-th a failed
+generation) both ways into a temporary directory, then times the reads the
+pipeline and cache_to_csv.py actually make, plus the allocated disk space:
+the existence check before a run (input_hashes + failed_ids + recipe_ids,
+as in llama_recipe_pipeline.cache_report) and a full scan of the successful
+entries under one prompt hash (iter_results, as in cache_to_csv.py).
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from cache_store import CacheStore, is_error
+
+ERROR_EVERY = 20  # share of {"error": ...} entries, which the scan skips
+
+
+def response(i):
+    if i % ERROR_EVERY == 0:
+        return {"error": "Invalid JSON", "raw": "{\"recipe\": <float>"}
+    ingredient = {"id": 1, "name": f"ingredient {i}", "unit": "g", "calories_kcal": 1.5, "protein_g": 0.2}
+    return {"ingredients": [ingredient] * 8, "recipe": {"id": i, "name": f"Recipe {i}"}, "map": []}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+    ids = [str(50000 + i) for i in range(args.entries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp) / "cache"
+        cache_dir.mkdir()
+        write_dir, _ = timed(lambda: [
+            (cache_dir / f"{rid}.json").write_text(json.dumps(response(i), indent=2)) for i, rid in enumerate(ids)
+        ])
+        store = CacheStore(Path(tmp) / "cache.sqlite")
+        write_db, _ = timed(lambda: [store.put(rid, "h", response(i)) for i, rid in enumerate(ids)])
+
+        exists_dir, _ = timed(lambda: sum((cache_dir / f"{rid}.json").exists() for rid in ids))
+        exists_db, _ = timed(lambda: (store.input_hashes("h"), store.failed_ids("h"), store.recipe_ids()))
+        scan_dir, _ = timed(lambda: [d for p in sorted(cache_dir.glob("*.json"))
+                                     if not is_error(d := json.loads(p.read_text()))])
+        scan_db, _ = timed(lambda: list(store.iter_results("h")))
+
+        size_dir = sum(p.stat().st_blocks * 512 for p in cache_dir.iterdir())  # allocated, not logical size
+        store.close()
+        size_db = sum(p.stat().st_blocks * 512 for p in Path(tmp).glob("cache.sqlite*"))
+
+    print(f"{'':>10} {'write s':>8} {'exists s':>9} {'scan s':>8} {'files':>7} {'MB':>7}")
+    print(f"{'directory':>10} {write_dir:>8.2f} {exists_dir:>9.3f} {scan_dir:>8.2f} {args.entries:>7} "
+          f"{size_dir / 1e6:>7.1f}")
+    print(f"{'sqlite':>10} {write_db:>8.2f} {exists_db:>9.3f} {scan_db:>8.2f} {1:>7} {size_db / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
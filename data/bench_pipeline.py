@@ -0,0 +1,71 @@
+"""
+bench_pipeline.py — Throughput of llama_recipe_pipeline against a fake Ollama
+
+Usage:
+    python bench_pipeline.py --rows 64 --latency 0.2 --parallel 4 --workers 1 2 4 8
+    python bench_pipeline.py --rows 32 --token-latency 0.005 --bad-share 0.25 --workers 4
+
+Every run starts from an empty temporary cache store, so each row is one request.
+With a server that serves ``parallel`` requests at once, throughput should
+scale with workers up to ``parallel`` and flatten after that.
+
+``--bad-share`` makes that share of recipes come back as a long generation
+that turns invalid early on; each configuration is then run with and without
+streaming to show the generation time the early abort saves.
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+import llama_recipe_pipeline as pipeline
+from fake_ollama import FakeOllama, fake_rows, recipe_reply
+
+
+def make_reply(bad_share):
+    every = round(1 / bad_share) if bad_share > 0 else 0
+
+    def reply(prompt):
+        good = recipe_reply(prompt)
+        index = int(json.loads(good)["name"].rsplit(" ", 1)[-1])
+        padding = " " * 400  # a real recipe is a few hundred tokens
+        if every and index % every == 0:
+            return '{"name": <string>, ' + "x" * 2000 + "}"
+        return good[:-1] + ', "notes": "' + padding + '"}'
+
+    return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--bad-share", type=float, default=0.0)
+    args = parser.parse_args()
+
+    rows = fake_rows(args.rows)
+    modes = [("stream", True), ("whole", False)] if args.bad_share > 0 else [("stream", True)]
+    results = []
+    for workers in args.workers:
+        for mode, stream in modes:
+            with FakeOllama(latency=args.latency, parallel=args.parallel, token_latency=args.token_latency,
+                            reply=make_reply(args.bad_share)) as server, tempfile.TemporaryDirectory() as tmp:
+                pipeline.OLLAMA_URL = server.url
+                pipeline.CACHE_DB = Path(tmp) / "cache.sqlite"
+                pipeline.STREAM = stream
+                summary = pipeline.run_pipeline(rows, workers=workers, progress_every=args.rows)
+                results.append((workers, mode, summary, server.tokens_generated))
+
+    print(f"\n{'workers':>7} {'mode':>6} {'seconds':>8} {'rows/s':>8} {'speedup':>8} {'tokens':>8}")
+    base = results[0][2]["seconds"]
+    for workers, mode, summary, generated in results:
+        print(f"{workers:>7} {mode:>6} {summary['seconds']:>8.2f} {args.rows / summary['seconds']:>8.2f} "
+              f"{base / summary['seconds']:>7.1f}x {generated:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+cache_store.py — Single-file SQLite store for the LLaMA responses
+
+Replaces cache/{idMeal}.json (one file and inode per recipe) with one table
+keyed by (recipe_id, prompt_hash), where prompt_hash fingerprints the prompt
+templates and model that produced the entry. Each entry also records the
+input_hash of the rendered recipe prompt, so together the two hashes say
+exactly what the response was generated from (NULL for migrated entries,
+whose input is unknown), and a ``failed`` flag for {"error": ...} entries
+(aborted or unparsable generations), which are kept for inspection but never
+served as results. Every write is its own transaction in WAL mode, so
+a crash mid-run loses at most the row being written and never leaves a
+half-written entry.
+
+Migrate an existing cache directory once:
+
+    python cache_store.py migrate --from cache --db cache.sqlite
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    recipe_id   TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    input_hash  TEXT,
+    failed      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (recipe_id, prompt_hash)
+) WITHOUT ROWID
+"""
+INSERT = """
+INSERT OR REPLACE INTO responses (recipe_id, prompt_hash, data, created_at, input_hash, failed)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def is_error(data):
+    """True for the {"error": ..., "raw": ...} entries recorded for failed generations."""
+    return isinstance(data, dict) and "error" in data
+
+
+def prompt_hash(system_prompt, user_prompt_template, model):
+    """Short fingerprint of everything that shapes a response besides the recipe itself."""
+    return _hash(system_prompt, user_prompt_template, model)
+
+
+def input_hash(user_prompt):
+    """Fingerprint of one recipe's rendered prompt, i.e. of every row field the model sees."""
+    return _hash(user_prompt)
+
+
+class CacheStore:
+    """Thread-safe: each thread gets its own connection to the same file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(responses)")}
+            if "input_hash" not in columns:  # store created before input hashes were recorded
+                conn.execute("ALTER TABLE responses ADD COLUMN input_hash TEXT")
+            if "failed" not in columns:  # ... or before error entries were flagged
+                conn.execute("ALTER TABLE responses ADD COLUMN failed INTEGER NOT NULL DEFAULT 0")
+                rows = conn.execute("SELECT recipe_id, prompt_hash, data FROM responses WHERE data LIKE '%\"error\"%'")
+                conn.executemany(
+                    "UPDATE responses SET failed = 1 WHERE recipe_id = ? AND prompt_hash = ?",
+                    [(r, h) for r, h, data in rows.fetchall() if is_error(json.loads(data))],
+                )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable across process crashes in WAL mode
+            self._local.conn = conn
+        return conn
+
+    def get(self, recipe_id, prompt_hash, input_hash=None):
+        """Cached data, or None. With ``input_hash``, entries recorded for a different input count as missing."""
+        row = self._connect().execute(
+            "SELECT data, input_hash FROM responses WHERE recipe_id = ? AND prompt_hash = ?",
+            (str(recipe_id), prompt_hash),
+        ).fetchone()
+        if row is None or (input_hash is not None and row[1] not in (None, input_hash)):
+            return None
+        return json.loads(row[0])
+
+    def __contains__(self, key):
+        recipe_id, prompt_hash = key
+        return self._connect().execute(
+            "SELECT 1 FROM responses WHERE recipe_id = ? AND prompt_hash = ?", (str(recipe_id), prompt_hash)
+        ).fetchone() is not None
+
+    def put(self, recipe_id, prompt_hash, data, created_at=None, input_hash=None):
+        with self._connect() as conn:  # one transaction: the entry is either fully written or absent
+            conn.execute(INSERT, (str(recipe_id), prompt_hash, json.dumps(data, ensure_ascii=False),
+                                  created_at or time.time(), input_hash, is_error(data)))
+
+    def put_many(self, entries):
+        """``entries`` of (recipe_id, prompt_hash, data, created_at) in a single transaction."""
+        with self._connect() as conn:
+            conn.executemany(
+                INSERT,
+                ((str(r), h, json.dumps(d, ensure_ascii=False), t or time.time(), None, is_error(d))
+                 for r, h, d, t in entries),
+            )
+
+    def recipe_ids(self, prompt_hash=None):
+        """Set of cached recipe ids (for ``prompt_hash`` only, if given) — one query for a bulk existence check."""
+        if prompt_hash is None:
+            rows = self._connect().execute("SELECT DISTINCT recipe_id FROM responses")
+        else:
+            rows = self._connect().execute("SELECT recipe_id FROM responses WHERE prompt_hash = ?", (prompt_hash,))
+        return {recipe_id for recipe_id, in rows}
+
+    def input_hashes(self, prompt_hash):
+        """{recipe_id: input_hash} of the entries cached under ``prompt_hash``."""
+        rows = self._connect().execute(
+            "SELECT recipe_id, input_hash FROM responses WHERE prompt_hash = ?", (prompt_hash,)
+        )
+        return dict(rows.fetchall())
+
+    def failed_ids(self, prompt_hash):
+        """Set of recipe ids whose entry under ``prompt_hash`` records a failed generation."""
+        rows = self._connect().execute(
+            "SELECT recipe_id FROM responses WHERE prompt_hash = ? AND failed", (prompt_hash,)
+        )
+        return {recipe_id for recipe_id, in rows}
+
+    def iter_results(self, prompt_hash):
+        """(recipe_id, data) of the successful entries under ``prompt_hash``, ordered by recipe id."""
+        rows = self._connect().execute(
+            "SELECT recipe_id, data FROM responses WHERE prompt_hash = ? AND NOT failed ORDER BY recipe_id",
+            (prompt_hash,),
+        )
+        for recipe_id, data in rows:
+            yield recipe_id, json.loads(data)
+
+    def iter_latest(self):
+        """(recipe_id, data) of the newest entry per recipe, ordered by recipe id."""
+        rows = self._connect().execute(
+            """
+            SELECT recipe_id, data FROM responses AS r
+            WHERE created_at = (SELECT MAX(created_at) FROM responses WHERE recipe_id = r.recipe_id)
+            GROUP BY recipe_id ORDER BY recipe_id
+            """
+        )
+        for recipe_id, data in rows:
+            yield recipe_id, json.loads(data)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def migrate_directory(cache_dir, store, prompt_hash, batch_size=500):
+    """Copy cache_dir/{idMeal}.json into ``store`` under ``prompt_hash``. Returns (migrated, skipped)."""
+    migrated = skipped = 0
+    batch = []
+    for path in sorted(Path(cache_dir).glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Skipping {path.name}: {e}")
+            skipped += 1
+            continue
+        batch.append((path.stem, prompt_hash, data, path.stat().st_mtime))
+        if len(batch) >= batch_size:
+            store.put_many(batch)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        store.put_many(batch)
+        migrated += len(batch)
+    return migrated, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the LLaMA response cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import a cache/{idMeal}.json directory")
+    migrate.add_argument("--from", dest="source", default="cache")
+    migrate.add_argument("--db", default="cache.sqlite")
+    migrate.add_argument("--prompt-hash", help="hash to file the entries under (default: current prompts + model)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        if args.prompt_hash is None:
+            import llama_recipe_pipeline as pipeline
+
+            args.prompt_hash = pipeline.PROMPT_HASH
+        store = CacheStore(args.db)
+        migrated, skipped = migrate_directory(args.source, store, args.prompt_hash)
+        print(f"✅ Migrated {migrated} entries into {args.db} (prompt hash {args.prompt_hash}), skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 import csv
-import json
 import os
+from itertools import islice
 from pathlib import Path
 
+import pandas as pd
+
+from cache_store import CacheStore
+
+NUTRIENT_COLUMNS = ['calories_kcal', 'protein_g', 'carbs_g', 'sugars_g', 'agg_fats_g',
+                    'cholesterol_mg', 'agg_minerals_mg', 'vit_a_microg', 'agg_vit_b_mg',
+                    'vit_c_mg', 'vit_d_microg', 'vit_e_mg', 'vit_k_microg']
+
 
 def load_recipes_data(recipes_csv_path='recipes.csv'):
     recipes_data = {}
@@ -18,7 +26,31 @@ def load_recipes_data(recipes_csv_path='recipes.csv'):
         print(f"Warning: {recipes_csv_path} not found. Descriptions and tags will be empty.")
     return recipes_data
 
-def process_json_files(cache_dir='cache', recipes_csv_path='recipes.csv'):
+def compute_recipe_nutrition(recipes_list, ingredients_list, maps_list):
+    """
+    Per-recipe nutrient totals as one vectorized join + groupby.
+
+    Ingredient rows hold nutrients per base unit and relative_unit_100 is the
+    amount in hundredths of that unit, so a recipe's total is
+    sum(nutrients * relative_unit_100 / 100). Recipes without mapped
+    ingredients get zeros.
+    """
+    ingredients = pd.DataFrame(ingredients_list, columns=['id', *NUTRIENT_COLUMNS]).set_index('id')
+    ingredients = ingredients.apply(pd.to_numeric, errors='coerce').fillna(0)
+    maps = pd.DataFrame(maps_list, columns=['recipe_id', 'ingredient_id', 'relative_unit_100'])
+
+    joined = maps.join(ingredients, on='ingredient_id', how='inner')
+    amounts = pd.to_numeric(joined['relative_unit_100'], errors='coerce').fillna(0) / 100
+    totals = joined[NUTRIENT_COLUMNS].mul(amounts, axis=0).groupby(joined['recipe_id']).sum()
+
+    recipe_ids = [recipe['id'] for recipe in recipes_list]
+    totals = totals.reindex(recipe_ids, fill_value=0).round(3).reset_index(names='recipe_id')
+    totals.insert(0, 'id', range(1, len(totals) + 1))
+    return totals
+
+
+def process_cache(cache_db='cache.sqlite', recipes_csv_path='recipes.csv', prompt_hash=None, limit=50):
+    """Export up to ``limit`` successful entries generated with ``prompt_hash`` (default: the current prompts + model)."""
     recipes_data = load_recipes_data(recipes_csv_path)
     
     ingredients_dict = {}  # key: (name, unit), value: ingredient data
@@ -33,19 +65,22 @@ def process_json_files(cache_dir='cache', recipes_csv_path='recipes.csv'):
     next_tag_id = 1
     next_recipe_tag_map_id = 1
     
-    cache_path = Path(cache_dir)
+    cache_path = Path(cache_db)
     if not cache_path.exists():
-        print(f"Error: {cache_dir} directory not found.")
+        print(f"Error: {cache_db} not found (migrate an old cache/ directory with cache_store.py).")
         return
     
-    json_files = list(cache_path.glob('*.json'))
-    print(f"Found {len(json_files)} JSON files in {cache_dir}")
+    if prompt_hash is None:
+        from llama_recipe_pipeline import PROMPT_HASH as prompt_hash
+
+    store = CacheStore(cache_path)
+    failed = store.failed_ids(prompt_hash)
+    print(f"Found {len(store)} cached responses in {cache_db}; exporting prompt hash {prompt_hash}, "
+          f"skipping {len(failed)} failed generations")
     
-    for json_file in sorted(json_files)[:50]:
-        print(f"Processing {json_file.name}...")
-        
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    # successful responses for the current prompts, in recipe id order
+    for recipe_id, data in islice(store.iter_results(prompt_hash), limit):
+        print(f"Processing {recipe_id}...")
         
         for ingredient in data['ingredients']:
             key = (ingredient['name'], ingredient['unit'])
@@ -166,6 +201,11 @@ def process_json_files(cache_dir='cache', recipes_csv_path='recipes.csv'):
         writer.writeheader()
         writer.writerows(recipe_tag_maps_list)
     print(f"✓ recipe_tag_map-supabase.csv created ({len(recipe_tag_maps_list)} rows)")
+
+    # 6. Recipe Nutrition CSV (per-recipe totals, so the backend skips the join)
+    recipe_nutrition = compute_recipe_nutrition(recipes_list, ingredients_list, maps_list)
+    recipe_nutrition.to_csv('recipe_nutrition-supabase.csv', index=False)
+    print(f"✓ recipe_nutrition-supabase.csv created ({len(recipe_nutrition)} rows)")
     
     print("\nSummary:")
     print(f"- Unique ingredients: {len(ingredients_list)}")
@@ -175,4 +215,4 @@ def process_json_files(cache_dir='cache', recipes_csv_path='recipes.csv'):
     print(f"- Recipe-Tag mappings: {len(recipe_tag_maps_list)}")
 
 if __name__ == '__main__':
-    process_json_files(cache_dir='cache', recipes_csv_path='recipes.csv') 
\ No newline at end of file
+    process_cache(cache_db='cache.sqlite', recipes_csv_path='recipes.csv') 
\ No newline at end of file
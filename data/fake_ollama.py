@@ -0,0 +1,192 @@
+"""
+fake_ollama.py — Minimal stand-in for the Ollama /api/chat endpoint
+
+Used by test_recipe.py and bench_pipeline.py, and handy for trying the
+pipeline without a GPU:
+
+    python fake_ollama.py --port 11434 --latency 0.5 --parallel 4
+
+Each request holds one of ``parallel`` slots (like OLLAMA_NUM_PARALLEL:
+extra requests queue), waits ``latency`` seconds (prompt processing), then
+"generates" a small JSON recipe built from the prompt's "Recipe Name:" line
+at ``token_latency`` seconds per 4-character token. With ``"stream": true``
+the tokens are sent as NDJSON chunks and generation stops when the client
+disconnects, as with the real server.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def recipe_reply(prompt):
+    """Deterministic structured answer for a user prompt."""
+    name = "Unknown"
+    for line in prompt.splitlines():
+        if line.startswith("Recipe Name:"):
+            name = line.split(":", 1)[1].strip()
+    return json.dumps({"name": name, "ingredients": [], "tags": []})
+
+
+def fake_rows(n):
+    """``n`` recipes.csv-style rows with distinct ids and names."""
+    row = {"strMeal": "", "strCategory": "Dessert", "strArea": "British", "strTags": "", "strInstructions": "Bake.",
+           "strMealThumb": "", "strSource": "", "strYoutube": ""}
+    return [{**row, "idMeal": str(50000 + i), "strMeal": f"Recipe {i}"} for i in range(n)]
+
+
+def tokens(text, size=4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeOllama:
+    """Threaded HTTP server bound on construction (port 0 = any free port); counts requests and peak concurrency."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, parallel=4, reply=recipe_reply, token_latency=0.0,
+                 fail_first=0, stream_error=None):
+        self.latency = latency
+        self.fail_first = fail_first  # answer the first N chat requests with 503, like an overloaded server
+        self.stream_error = stream_error  # end streams with {"error": ...} after one token, like a crashed runner
+        self.token_latency = token_latency
+        self.reply = reply
+        self.requests = 0
+        self.cancelled = 0  # streams the client hung up on
+        self.tokens_generated = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._slots = threading.Semaphore(parallel)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._send(200, b"Ollama is running", "text/plain")
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/chat":
+                    return self._send(404, b'{"error": "not found"}')
+                prompt = next((m["content"] for m in body.get("messages", []) if m["role"] == "user"), "")
+                with fake._lock:
+                    fake.requests += 1
+                    overloaded = fake.requests <= fake.fail_first
+                if overloaded:
+                    return self._send(503, b'{"error": "server busy, please try again"}')
+                with fake._slots:
+                    with fake._lock:
+                        fake.in_flight += 1
+                        fake.peak_in_flight = max(fake.peak_in_flight, fake.in_flight)
+                    try:
+                        time.sleep(fake.latency)
+                        pieces = tokens(fake.reply(prompt))
+                        if body.get("stream", True):  # Ollama streams unless told not to
+                            self._stream(body.get("model"), pieces)
+                        else:
+                            time.sleep(fake.token_latency * len(pieces))
+                            fake._count(tokens=len(pieces))
+                            message = {"model": body.get("model"), "done": True, "eval_count": len(pieces),
+                                       "message": {"role": "assistant", "content": "".join(pieces)}}
+                            self._send(200, json.dumps(message).encode())
+                    finally:
+                        with fake._lock:
+                            fake.in_flight -= 1
+
+            def _stream(self, model, pieces):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                started = time.perf_counter()
+                try:
+                    for piece in pieces:
+                        time.sleep(fake.token_latency)
+                        self._chunk({"model": model, "message": {"role": "assistant", "content": piece}, "done": False})
+                        fake._count(tokens=1)
+                        if fake.stream_error is not None:
+                            self._chunk({"error": fake.stream_error})
+                            self.wfile.write(b"0\r\n\r\n")
+                            return
+                    duration = int((time.perf_counter() - started) * 1e9)
+                    self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                 "eval_count": len(pieces), "eval_duration": duration})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    fake._count(cancelled=1)
+                    self.close_connection = True
+
+            def _chunk(self, message):
+                line = json.dumps(message).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+
+            def _send(self, status, payload, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _count(self, tokens=0, cancelled=0):
+        with self._lock:
+            self.tokens_generated += tokens
+            self.cancelled += cancelled
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), name="fake-ollama",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._thread is not None:  # shutdown() blocks forever unless serve_forever is running
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllama(port=args.port, latency=args.latency, parallel=args.parallel,
+                        token_latency=args.token_latency)
+    print(f"🦙 Fake Ollama on {server.url} (latency {args.latency}s, parallel {args.parallel})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
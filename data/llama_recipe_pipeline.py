@@ -1,23 +1,256 @@
+import argparse
 import csv
+import dataclasses
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import requests  # for Ollama REST API
+from epicourier_retry import CircuitBreaker, RetryPolicy  # shared with the backend's Gemini calls
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+from cache_store import CacheStore, input_hash, prompt_hash
 
 # === Settings ===
 MODEL_NAME = "llama3:instruct"   
-CACHE_DIR = Path("cache")
-CACHE_DIR.mkdir(exist_ok=True)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+# Responses live in one SQLite file keyed by (idMeal, PROMPT_HASH); each entry also records
+# the hash of its rendered recipe prompt, so edited prompts, model or rows are detected
+CACHE_DB = Path(os.getenv("LLAMA_CACHE_DB", "cache.sqlite"))
+LEGACY_CACHE_DIR = Path("cache")  # old one-JSON-per-recipe layout, migrate with cache_store.py
 SYSTEM_PROMPT = Path("prompts/system_prompt.txt").read_text()
 USER_PROMPT_TEMPLATE = Path("prompts/user_prompt.txt").read_text()
+PROMPT_HASH = prompt_hash(SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, MODEL_NAME)
 CSV_FILE = "recipes.csv"
+# Requests in flight at once; match Ollama's OLLAMA_NUM_PARALLEL (1 = old sequential behaviour)
+MAX_WORKERS = int(os.getenv("LLAMA_WORKERS", "4"))
+# Streamed generations are checked as they arrive and cut off once they exceed a budget
+STREAM = os.getenv("LLAMA_STREAM", "1") != "0"
+MAX_TOKENS = int(os.getenv("LLAMA_MAX_TOKENS", "8192"))
+MAX_CHARS = int(os.getenv("LLAMA_MAX_CHARS", "32000"))
+PREAMBLE_LIMIT = 500  # chars of chatter allowed before the opening "{"
+# Seconds to open a connection / to wait for the next bytes (whole answer when not streaming)
+CONNECT_TIMEOUT = float(os.getenv("LLAMA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLAMA_READ_TIMEOUT", "300"))
+# After this many consecutive connection / 5xx failures every worker pauses for
+# LLAMA_BREAKER_RESET seconds, then a single request probes the server
+BREAKER_THRESHOLD = int(os.getenv("LLAMA_BREAKER_THRESHOLD", "3"))
+BREAKER_RESET = float(os.getenv("LLAMA_BREAKER_RESET", "15"))
+
+# === Helper: response cache ===
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """The CacheStore for CACHE_DB (opened once per path)."""
+    with _stores_lock:
+        if CACHE_DB not in _stores:
+            _stores[CACHE_DB] = CacheStore(CACHE_DB)
+        return _stores[CACHE_DB]
+
+
+# === Helper: shared HTTP session ===
+_session = None
+_session_size = 0
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=None):
+    """One keep-alive connection pool shared by all worker threads (grown if ``pool_size`` is larger)."""
+    global _session, _session_size
+    with _session_lock:
+        if _session is None or (pool_size or 0) > _session_size:
+            _session_size = max(pool_size or MAX_WORKERS, 1)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_session_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+# === Helper: retry policy ===
+def classify_request_error(exc):
+    """Retry kind (see epicourier_retry) of a requests error; None = do not retry."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return "connect"
+    if isinstance(exc, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        # a read timeout while streaming surfaces as a ConnectionError
+        return "timeout" if exc.args and isinstance(exc.args[0], ReadTimeoutError) else "connect"
+    if isinstance(exc, requests.exceptions.ChunkedEncodingError):
+        return "server"  # connection dropped mid-answer
+    if isinstance(exc, OllamaResponseError):
+        return "server"  # e.g. the model runner crashed mid-generation
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return "server" if status >= 500 or status == 429 else None
+    return None
+
+
+OLLAMA_RETRY = RetryPolicy(
+    name="ollama", attempts={"connect": 5, "server": 4, "timeout": 2}, base_delay=1.0, max_delay=30.0,
+    classify=classify_request_error,
+)
+OLLAMA_BREAKER = CircuitBreaker("ollama", BREAKER_THRESHOLD, BREAKER_RESET)
+
+
+class OllamaResponseError(RuntimeError):
+    """Ollama reported an error, or sent something other than its JSON envelope."""
+
+
+# === Helper: incremental JSON check ===
+class GenerationAborted(Exception):
+    """A streamed generation was cut off; ``partial`` holds the text received so far."""
+
+    def __init__(self, reason, partial="", stats=None):
+        super().__init__(reason)
+        self.partial = partial
+        self.stats = stats or {}
+
+
+class JsonStreamChecker:
+    """
+    Structural check of a JSON object arriving in chunks.
+
+    Skips up to ``preamble_limit`` chars before the first "{" (safe_json_loads
+    does too), then tracks strings and bracket nesting. ``error`` is set as
+    soon as the text can no longer become valid JSON (mismatched bracket,
+    raw control character in a string, a character no JSON value contains);
+    ``done`` once the top-level object closes.
+    """
+
+    VALUE_CHARS = set(" \t\r\n,:0123456789+-.eE" + "truefalsn")
+
+    def __init__(self, preamble_limit=PREAMBLE_LIMIT):
+        self.preamble_limit = preamble_limit
+        self.preamble = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.done = False
+        self.error = None
+
+    def feed(self, text):
+        """Consume ``text``; returns False once the stream is known to be invalid."""
+        for ch in text:
+            if self.done or self.error:
+                break
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.stack.append("}")
+                else:
+                    self.preamble += 1
+                    if self.preamble > self.preamble_limit:
+                        self.error = f"no JSON object within {self.preamble_limit} chars"
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                elif ch < " ":
+                    self.error = f"control character {ch!r} in string"
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                expected = self.stack.pop()
+                if ch != expected:
+                    self.error = f"expected {expected!r}, got {ch!r}"
+                elif not self.stack:
+                    self.done = True
+            elif ch not in self.VALUE_CHARS:
+                self.error = f"unexpected {ch!r} outside a string"
+        return self.error is None
+
 
 # === Helper: call local LLaMA model ===
-def query_llama(prompt: str, system_prompt: str, model: str = MODEL_NAME, max_retries=3):
-    url = "http://localhost:11434/api/chat"  
+def stream_llama(prompt: str, system_prompt: str, model: str = MODEL_NAME, session=None,
+                 max_tokens=MAX_TOKENS, max_chars=MAX_CHARS, stats=None):
+    """
+    Stream one /api/chat completion, checking the JSON as it arrives.
+
+    Stops reading (which makes Ollama stop generating) as soon as the top-level
+    object is complete, and raises GenerationAborted when the output turns
+    invalid or exceeds ``max_tokens`` chunks / ``max_chars`` characters.
+    ``stats`` (if given) receives ttft, tokens, tokens_per_s and seconds.
+    """
+    url = f"{OLLAMA_URL}/api/chat"
+    session = session or get_session()
+    stats = {} if stats is None else stats
+    payload = {
+        "model": model,
+        "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+        "stream": True,
+        "options": {"num_predict": max_tokens},
+    }
+
+    checker = JsonStreamChecker()
+    parts, chars, tokens = [], 0, 0
+    started = time.perf_counter()
+    first_token = final = None
+
+    def finish():
+        end = time.perf_counter()
+        stats.update(seconds=end - started, tokens=tokens, ttft=None if first_token is None else first_token - started)
+        if final and final.get("eval_count") and final.get("eval_duration"):
+            stats.update(tokens=final["eval_count"], tokens_per_s=final["eval_count"] / (final["eval_duration"] / 1e9))
+        elif first_token is not None and end > first_token:
+            stats["tokens_per_s"] = tokens / (end - first_token)
+        return "".join(parts)
+
+    with session.post(url, headers={"Content-Type": "application/json"}, json=payload, stream=True,
+                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise OllamaResponseError(f"malformed stream chunk {line[:80]!r}") from e
+            if "error" in chunk:
+                raise OllamaResponseError(f"server error: {chunk['error']}")
+            text = chunk.get("message", {}).get("content", "")
+            if text:
+                first_token = first_token or time.perf_counter()
+                tokens += 1
+                chars += len(text)
+                parts.append(text)
+                if not checker.feed(text):
+                    raise GenerationAborted(f"invalid JSON: {checker.error}", finish(), stats)
+                if checker.done:
+                    break
+                if tokens >= max_tokens or chars > max_chars:
+                    raise GenerationAborted(f"budget exceeded ({tokens} tokens, {chars} chars)", finish(), stats)
+            if chunk.get("done"):
+                final = chunk
+                break
+    return finish()
+
+
+def query_llama(prompt: str, system_prompt: str, model: str = MODEL_NAME, max_retries=None, session=None,
+                stream=None, stats=None):
+    """
+    One completion, retried per OLLAMA_RETRY. While OLLAMA_BREAKER is open every
+    worker waits instead of hammering a server that is down. ``max_retries``
+    (if given) caps the tries for every error kind.
+    """
+    url = f"{OLLAMA_URL}/api/chat"
     headers = {"Content-Type": "application/json"}
+    session = session or get_session()
+    stream = STREAM if stream is None else stream
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -30,19 +263,23 @@ def query_llama(prompt: str, system_prompt: str, model: str = MODEL_NAME, max_re
         "stream": False
     }
 
-    for attempt in range(max_retries):
+    def attempt():
+        if stream:
+            return stream_llama(prompt, system_prompt, model, session=session, stats=stats)
+        response = session.post(url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        response.raise_for_status()
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            print(f"[DEBUG] Request URL: {url}, Status: {response.status_code}")
-            response.raise_for_status()
-            data = response.json()
-            content = data["message"]["content"]
-            return content
-        except requests.exceptions.RequestException as e:
-            print(f"[Retry {attempt+1}] LLaMA request failed: {e}")
-            time.sleep(3)
-    raise RuntimeError("LLaMA query failed after retries")
+            return response.json()["message"]["content"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise OllamaResponseError(f"unexpected response body {response.text[:80]!r}") from e
 
+    retry = OLLAMA_RETRY
+    if max_retries is not None:
+        retry = dataclasses.replace(retry, attempts={kind: max_retries for kind in retry.attempts})
+    try:
+        return retry.call(attempt, breaker=OLLAMA_BREAKER, wait_for_breaker=True)
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"LLaMA query failed after retries: {e}") from e
 
 
 # === Helper: JSON-safe loading ===
@@ -62,13 +299,7 @@ def safe_json_loads(text):
         raise
 
 # === Core pipeline ===
-def process_recipe_row(row):
-    recipe_id = row["idMeal"].strip()
-    cache_file = CACHE_DIR / f"{recipe_id}.json"
-    if cache_file.exists():
-        print(f"✅ Cached: {recipe_id}")
-        return json.loads(cache_file.read_text())
-
+def build_user_prompt(row):
     ingredients = []
     for i in range(1, 21):
         name = row.get(f"strIngredient{i}")
@@ -77,7 +308,7 @@ def process_recipe_row(row):
             ingredients.append(f"- {name.strip()} ({measure.strip()})")
     ingredient_list = "\n".join(ingredients)
 
-    user_prompt = USER_PROMPT_TEMPLATE.format(
+    return USER_PROMPT_TEMPLATE.format(
         strMeal=row["strMeal"],
         strCategory=row["strCategory"],
         strArea=row["strArea"],
@@ -89,21 +320,166 @@ def process_recipe_row(row):
         ingredient_list=ingredient_list
     )
 
-    response_text = query_llama(user_prompt, SYSTEM_PROMPT)
+
+def process_recipe_row(row):
+    recipe_id = row["idMeal"].strip()
+    user_prompt = build_user_prompt(row)
+    row_hash = input_hash(user_prompt)
+    store = get_store()
+    cached = store.get(recipe_id, PROMPT_HASH, input_hash=row_hash)
+    if cached is not None and "error" not in cached:  # aborted / unparsable entries are regenerated
+        print(f"✅ Cached: {recipe_id}")
+        return cached
+
+    stats = {}
+    # Connection, HTTP and server-side errors propagate: the row counts as failed and nothing is cached.
+    # Bad model output is cached as {"error", "raw"} for inspection and regenerated on the next run.
     try:
-        data = safe_json_loads(response_text)
-    except Exception as e:
-        print(f"⚠️ JSON parsing failed for recipe {recipe_id}, response_text {response_text}: {e}")
-        data = {"error": str(e), "raw": response_text}
+        response_text = query_llama(user_prompt, SYSTEM_PROMPT, stats=stats)
+    except GenerationAborted as e:
+        print(f"✂️ Generation aborted for recipe {recipe_id} after {len(e.partial)} chars: {e}")
+        data = {"error": str(e), "raw": e.partial}
+    else:
+        try:
+            data = safe_json_loads(response_text)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ JSON parsing failed for recipe {recipe_id}, response_text {response_text}: {e}")
+            data = {"error": str(e), "raw": response_text}
+    if stats.get("ttft") is not None:
+        print(f"⚡ {recipe_id}: TTFT {stats['ttft']:.2f}s, {stats.get('tokens_per_s', 0):.1f} tokens/s, "
+              f"{stats['tokens']} tokens")
 
-    cache_file.write_text(json.dumps(data, indent=2, ensure_ascii=False))
-    print(f"💾 Saved: {cache_file}")
+    store.put(recipe_id, PROMPT_HASH, data, input_hash=row_hash)
+    print(f"💾 Saved: {recipe_id}")
     return data
 
+# === Progress / ETA ===
+class Progress:
+    """Thread-safe done/failed counter that prints throughput and ETA."""
+
+    def __init__(self, total, every=1):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def update(self, ok=True):
+        with self._lock:
+            self.done += 1
+            self.failed += not ok
+            if self.done % self.every == 0 or self.done == self.total:
+                print(self.line())
+
+    def line(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else float("inf")
+        return (f"⏳ [{self.done}/{self.total}] {rate:.2f} recipes/s, "
+                f"elapsed {elapsed:.0f}s, ETA {eta:.0f}s, failed {self.failed}")
+
+
+# === Concurrent pipeline ===
+CACHE_STATUSES = {
+    "fresh": "cached for the current prompts, model and row",
+    "stale-prompt": "cached, but for other prompts or another model",
+    "stale-input": "cached, but the recipe row has changed",
+    "error": "cached, but the generation was aborted or unparsable",
+    "new": "never generated",
+}
+
+
+def cache_status(rows):
+    """{status: rows} for every status in CACHE_STATUSES, from two queries rather than one per row."""
+    store = get_store()
+    current = store.input_hashes(PROMPT_HASH)
+    failed = store.failed_ids(PROMPT_HASH)
+    known = store.recipe_ids()
+    status = {name: [] for name in CACHE_STATUSES}
+    for row in rows:
+        recipe_id = row["idMeal"].strip()
+        if recipe_id in failed:
+            status["error"].append(row)
+        elif recipe_id in current:
+            cached_hash = current[recipe_id]  # None: migrated entry, input unknown, kept
+            fresh = cached_hash is None or cached_hash == input_hash(build_user_prompt(row))
+            status["fresh" if fresh else "stale-input"].append(row)
+        else:
+            status["stale-prompt" if recipe_id in known else "new"].append(row)
+    return status
+
+
+def cache_report(status):
+    """Printable dry-run summary of cache_status()."""
+    stale = len(status["stale-prompt"]) + len(status["stale-input"]) + len(status["error"])
+    lines = [f"📊 Cache report for prompt hash {PROMPT_HASH} ({MODEL_NAME})"]
+    lines += [f"  {name:<13} {len(status[name]):>6}  {meaning}" for name, meaning in CACHE_STATUSES.items()]
+    lines.append(f"  → {stale + len(status['new'])} rows would be generated ({stale} with --stale-only)")
+    return "\n".join(lines)
+
+
+def pending_rows(rows, stale_only=False):
+    """Split rows into (rows to generate, number reused from the cache) before scheduling any work."""
+    status = cache_status(rows)
+    pending = status["stale-prompt"] + status["stale-input"] + status["error"] + ([] if stale_only else status["new"])
+    return pending, len(status["fresh"])
+
+
+def run_pipeline(rows, workers=MAX_WORKERS, progress_every=1, stale_only=False):
+    """
+    Enrich every row without a fresh cache entry with up to ``workers`` Ollama
+    requests in flight (only rows with a stale or failed entry if ``stale_only``).
+
+    Returns {"processed", "cached", "failed", "seconds"}. A row that still
+    fails after query_llama's retries is counted and skipped, not fatal.
+    """
+    pending, cached = pending_rows(rows, stale_only=stale_only)
+    print(f"📋 {len(pending)} to process, {cached} cached, {workers} workers")
+    progress = Progress(len(pending), every=progress_every)
+    get_session(workers)
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="llama") as pool:
+        futures = {pool.submit(process_recipe_row, row): row for row in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                progress.update()
+            except Exception as e:
+                print(f"❌ Failed: {futures[future]['idMeal'].strip()}: {e}")
+                progress.update(ok=False)
+    seconds = time.perf_counter() - progress.started
+    return {"processed": progress.done - progress.failed, "cached": cached,
+            "failed": progress.failed, "seconds": seconds}
+
+
 # === Main ===
 def main():
-    with open(CSV_FILE, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            process_recipe_row(row)
+    parser = argparse.ArgumentParser(description="Enrich recipes.csv with a local LLaMA model")
+    parser.add_argument("--csv", default=CSV_FILE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--no-stream", action="store_true", help="wait for whole completions (no early abort)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be generated, send nothing")
+    parser.add_argument("--stale-only", action="store_true",
+                        help="only regenerate rows whose cached entry is stale or failed, skip never-generated rows")
+    args = parser.parse_args()
+    if args.no_stream:
+        global STREAM
+        STREAM = False
+
+    if LEGACY_CACHE_DIR.is_dir() and any(LEGACY_CACHE_DIR.glob("*.json")) and not len(get_store()):
+        print(f"💡 {LEGACY_CACHE_DIR}/ holds cached responses; import them first with "
+              f"`python cache_store.py migrate --from {LEGACY_CACHE_DIR} --db {CACHE_DB}`")
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if args.dry_run:
+        print(cache_report(cache_status(rows)))
+        return
+    summary = run_pipeline(rows, workers=args.workers, progress_every=10, stale_only=args.stale_only)
+    print(f"✅ Done: {summary['processed']} processed, {summary['cached']} cached, "
+          f"{summary['failed']} failed in {summary['seconds']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
+
 
@@ -1,14 +1,36 @@
+import dataclasses
 import json
 import shutil
+import sqlite3
 import sys
 import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 # Import the functions from your main script
 # Assuming your script is named llama_recipe_pipeline.py
-from llama_recipe_pipeline import process_recipe_row, safe_json_loads
+from cache_store import CacheStore, migrate_directory
+from cache_to_csv import compute_recipe_nutrition
+import requests
+
+import llama_recipe_pipeline
+from fake_ollama import FakeOllama, fake_rows, tokens
+from llama_recipe_pipeline import (
+    GenerationAborted,
+    OllamaResponseError,
+    cache_report,
+    cache_status,
+    classify_request_error,
+    process_recipe_row,
+    query_llama,
+    run_pipeline,
+    safe_json_loads,
+    stream_llama,
+)
+from epicourier_retry import CircuitBreaker
 
 
 class TestSafeJsonLoads(unittest.TestCase):
@@ -350,6 +372,410 @@ class TestEdgeCases(unittest.TestCase):
         self.assertIn('He said "hello"', result["quote"])
 
 
+class TestComputeRecipeNutrition(unittest.TestCase):
+    """Test the per-recipe nutrient rollup written to recipe_nutrition-supabase.csv"""
+
+    def test_totals_scale_by_relative_unit(self):
+        """Totals are sum(nutrient * relative_unit_100 / 100) per recipe"""
+        recipes = [{'id': 7}, {'id': 8}, {'id': 9}]
+        ingredients = [
+            {'id': 1, 'calories_kcal': 100, 'protein_g': 10},
+            {'id': 2, 'calories_kcal': 50, 'protein_g': None},
+        ]
+        maps = [
+            {'id': 1, 'recipe_id': 7, 'ingredient_id': 1, 'relative_unit_100': 200},
+            {'id': 2, 'recipe_id': 7, 'ingredient_id': 2, 'relative_unit_100': 50},
+            {'id': 3, 'recipe_id': 8, 'ingredient_id': 2, 'relative_unit_100': 100},
+        ]
+
+        result = compute_recipe_nutrition(recipes, ingredients, maps).set_index('recipe_id')
+
+        self.assertEqual(list(result.index), [7, 8, 9])
+        self.assertEqual(result.loc[7, 'calories_kcal'], 225)
+        self.assertEqual(result.loc[7, 'protein_g'], 20)  # missing values count as 0
+        self.assertEqual(result.loc[8, 'calories_kcal'], 50)
+        self.assertEqual(result.loc[9, 'calories_kcal'], 0)  # no mapped ingredients
+        self.assertEqual(list(result['id']), [1, 2, 3])
+
+
+class TestConcurrentPipeline(unittest.TestCase):
+    """Test run_pipeline against the fake Ollama server"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = FakeOllama(latency=0.05, parallel=4).start()
+        self.patches = [
+            patch.object(llama_recipe_pipeline, 'CACHE_DB', Path(self.temp_dir) / "cache.sqlite"),
+            patch.object(llama_recipe_pipeline, 'OLLAMA_URL', self.server.url),
+        ]
+        for p in self.patches:
+            p.start()
+        self.rows = fake_rows(12)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.server.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_cached_rows_are_skipped_before_scheduling(self):
+        """Only uncached rows reach the server"""
+        store = llama_recipe_pipeline.get_store()
+        for row in self.rows[:5]:
+            store.put(row['idMeal'], llama_recipe_pipeline.PROMPT_HASH, {"cached": True})
+
+        summary = run_pipeline(self.rows, workers=4, progress_every=100)
+
+        self.assertEqual(summary['cached'], 5)
+        self.assertEqual(summary['processed'], 7)
+        self.assertEqual(self.server.requests, 7)
+        self.assertEqual(len(store), 12)
+        self.assertEqual(store.get(self.rows[0]['idMeal'], llama_recipe_pipeline.PROMPT_HASH), {"cached": True})
+
+    def test_requests_run_concurrently(self):
+        """Several requests are in flight at once and results land in the cache"""
+        summary = run_pipeline(self.rows, workers=4, progress_every=100)
+
+        self.assertEqual(summary['failed'], 0)
+        self.assertGreater(self.server.peak_in_flight, 1)
+        self.assertLessEqual(self.server.peak_in_flight, 4)
+        result = llama_recipe_pipeline.get_store().get(self.rows[3]['idMeal'], llama_recipe_pipeline.PROMPT_HASH)
+        self.assertEqual(result['name'], self.rows[3]['strMeal'])
+
+
+class TestStreamingQuery(unittest.TestCase):
+    """Test stream_llama's incremental JSON check against the fake Ollama server"""
+
+    def serve(self, reply, token_latency=0.0):
+        server = FakeOllama(reply=lambda prompt: reply, token_latency=token_latency).start()
+        self.addCleanup(server.stop)
+        url_patch = patch.object(llama_recipe_pipeline, 'OLLAMA_URL', server.url)
+        url_patch.start()
+        self.addCleanup(url_patch.stop)
+        return server
+
+    def test_valid_stream_reports_ttft_and_throughput(self):
+        """A complete object is returned with timing stats"""
+        self.serve('Here you go: {"name": "Pie", "tags": ["a", "b"], "n": 1.5}')
+        stats = {}
+
+        text = stream_llama("prompt", "system", stats=stats)
+
+        self.assertEqual(safe_json_loads(text), {"name": "Pie", "tags": ["a", "b"], "n": 1.5})
+        self.assertIsNotNone(stats['ttft'])
+        self.assertGreater(stats['tokens'], 0)
+        self.assertGreater(stats['tokens_per_s'], 0)
+
+    def test_invalid_json_aborts_generation(self):
+        """Output that can no longer be JSON stops the stream early"""
+        server = self.serve('{"calories": <float>, ' + 'x' * 4000 + '}', token_latency=0.002)
+
+        with self.assertRaises(GenerationAborted) as ctx:
+            stream_llama("prompt", "system")
+
+        self.assertIn("invalid JSON", str(ctx.exception))
+        self.assertTrue(ctx.exception.partial.startswith('{"calories": <'))
+        server_tokens = len(tokens('{"calories": <float>, ' + 'x' * 4000 + '}'))
+        time.sleep(0.1)  # let the server notice the hang-up
+        self.assertLess(server.tokens_generated, server_tokens)
+        self.assertEqual(server.cancelled, 1)
+
+    def test_budget_aborts_runaway_generation(self):
+        """Generations longer than the budget are cut off"""
+        self.serve('{"text": "' + 'a' * 1000 + '"}')
+
+        with self.assertRaises(GenerationAborted) as ctx:
+            stream_llama("prompt", "system", max_chars=100)
+
+        self.assertIn("budget", str(ctx.exception))
+
+    def test_aborted_recipe_is_cached_as_error(self):
+        """process_recipe_row records an aborted generation like a parse failure"""
+        self.serve('{"name": ]')
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(llama_recipe_pipeline, 'CACHE_DB', Path(tmp) / "cache.sqlite"):
+            data = process_recipe_row(fake_rows(1)[0])
+
+        self.assertIn("invalid JSON", data['error'])
+        self.assertEqual(data['raw'], '{"name": ]')
+
+    def test_cached_error_is_regenerated(self):
+        """An entry recorded for an aborted generation is not served from the cache"""
+        server = self.serve('{"name": "Pie"}')
+        row = fake_rows(1)[0]
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(llama_recipe_pipeline, 'CACHE_DB', Path(tmp) / "cache.sqlite"):
+            store = llama_recipe_pipeline.get_store()
+            row_hash = llama_recipe_pipeline.input_hash(llama_recipe_pipeline.build_user_prompt(row))
+            store.put(row['idMeal'], llama_recipe_pipeline.PROMPT_HASH, {"error": "invalid JSON", "raw": "{"},
+                      input_hash=row_hash)
+
+            data = process_recipe_row(row)
+
+        self.assertEqual(data, {"name": "Pie"})
+        self.assertEqual(server.requests, 1)
+
+    def test_server_errors_are_raised_not_cached(self):
+        """An error chunk (e.g. a crashed model runner) fails the row and leaves the cache alone"""
+        server = FakeOllama(reply=lambda prompt: '{"name": "Pie"}', stream_error="model runner has crashed").start()
+        self.addCleanup(server.stop)
+        fast = dataclasses.replace(llama_recipe_pipeline.OLLAMA_RETRY, base_delay=0.01, max_delay=0.01)
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(llama_recipe_pipeline, 'CACHE_DB', Path(tmp) / "cache.sqlite"), \
+                patch.object(llama_recipe_pipeline, 'OLLAMA_URL', server.url), \
+                patch.object(llama_recipe_pipeline, 'OLLAMA_RETRY', fast), \
+                patch.object(llama_recipe_pipeline, 'OLLAMA_BREAKER', CircuitBreaker("ollama", 100)):
+            with self.assertRaises(OllamaResponseError) as ctx:
+                process_recipe_row(fake_rows(1)[0])
+            self.assertEqual(len(llama_recipe_pipeline.get_store()), 0)
+
+        self.assertIn("model runner has crashed", str(ctx.exception))
+        self.assertEqual(server.requests, fast.attempts["server"])
+
+    def test_malformed_responses_raise_response_errors(self):
+        """Undecodable stream lines and non-JSON bodies surface as OllamaResponseError"""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [b"<html>bad gateway</html>"]
+        response.json.side_effect = requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0)
+        response.text = "<html>bad gateway</html>"
+        session = MagicMock()
+        session.post.return_value = response
+        no_retry = dataclasses.replace(llama_recipe_pipeline.OLLAMA_RETRY, attempts={})
+
+        with patch.object(llama_recipe_pipeline, 'OLLAMA_RETRY', no_retry), \
+                patch.object(llama_recipe_pipeline, 'OLLAMA_BREAKER', CircuitBreaker("ollama", 100)):
+            for stream in (True, False):
+                with self.assertRaises(OllamaResponseError):
+                    query_llama("prompt", "system", session=session, stream=stream)
+
+    def test_non_streaming_mode_still_supported(self):
+        """stream=False waits for the whole completion"""
+        self.serve('{"name": "Pie"}')
+
+        text = query_llama("prompt", "system", stream=False)
+
+        self.assertEqual(json.loads(text), {"name": "Pie"})
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test query_llama's per-error retries and circuit breaker"""
+
+    def setUp(self):
+        fast = dataclasses.replace(llama_recipe_pipeline.OLLAMA_RETRY, base_delay=0.01, max_delay=0.01)
+        self.breaker = CircuitBreaker("ollama", failure_threshold=2, reset_timeout=0.2)
+        for name, value in (('OLLAMA_RETRY', fast), ('OLLAMA_BREAKER', self.breaker)):
+            p = patch.object(llama_recipe_pipeline, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def serve(self, **kwargs):
+        server = FakeOllama(**kwargs).start()
+        self.addCleanup(server.stop)
+        p = patch.object(llama_recipe_pipeline, 'OLLAMA_URL', server.url)
+        p.start()
+        self.addCleanup(p.stop)
+        return server
+
+    def test_server_errors_are_retried(self):
+        """503s from an overloaded server are retried until it answers"""
+        server = self.serve(fail_first=2, reply=lambda prompt: '{"name": "Pie"}')
+
+        text = query_llama("prompt", "system", stream=False)
+
+        self.assertEqual(json.loads(text), {"name": "Pie"})
+        self.assertEqual(server.requests, 3)
+
+    def test_client_errors_are_not_retried(self):
+        """A 404 (e.g. unknown model) fails at once"""
+        server = self.serve()
+        with patch.object(llama_recipe_pipeline, 'OLLAMA_URL', server.url + "/missing"):
+            with self.assertRaises(RuntimeError):
+                query_llama("prompt", "system", stream=False)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_dead_server_opens_breaker_and_pauses(self):
+        """Connection failures open the breaker; the next try waits for the reset timeout"""
+        server = FakeOllama()
+        url = server.url
+        server.stop()  # nothing listens on this port any more
+
+        started = time.perf_counter()
+        with patch.object(llama_recipe_pipeline, 'OLLAMA_URL', url):
+            with self.assertRaises(RuntimeError):
+                query_llama("prompt", "system", stream=False)
+
+        self.assertGreaterEqual(self.breaker.opened, 1)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.2)
+
+    def test_classify_request_error(self):
+        """Connection, timeout and HTTP status errors map to distinct kinds"""
+        def http_error(status):
+            response = requests.Response()
+            response.status_code = status
+            return requests.exceptions.HTTPError(response=response)
+
+        self.assertEqual(classify_request_error(requests.exceptions.ConnectTimeout()), "connect")
+        self.assertEqual(classify_request_error(requests.exceptions.ReadTimeout()), "timeout")
+        self.assertEqual(classify_request_error(requests.exceptions.ConnectionError()), "connect")
+        self.assertEqual(classify_request_error(http_error(503)), "server")
+        self.assertEqual(classify_request_error(http_error(429)), "server")
+        self.assertIsNone(classify_request_error(http_error(400)))
+
+
+class TestCacheStore(unittest.TestCase):
+    """Test the SQLite response store and the directory migration"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = CacheStore(Path(self.temp_dir) / "cache.sqlite")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_entries_are_keyed_by_recipe_and_prompt_hash(self):
+        """The same recipe under another prompt hash is a different entry"""
+        self.store.put("52764", "v1", {"name": "Pie"})
+        self.store.put("52764", "v2", {"name": "Pie v2"})
+
+        self.assertEqual(self.store.get("52764", "v1"), {"name": "Pie"})
+        self.assertIn(("52764", "v2"), self.store)
+        self.assertNotIn(("52764", "v3"), self.store)
+        self.assertEqual(self.store.recipe_ids("v1"), {"52764"})
+        self.assertEqual(len(self.store), 2)
+
+    def test_iter_latest_returns_newest_entry_per_recipe(self):
+        """Bulk iteration yields the newest entry of each recipe, ordered by recipe id"""
+        self.store.put("2", "v1", {"v": 1}, created_at=1)
+        self.store.put("2", "v2", {"v": 2}, created_at=2)
+        self.store.put("1", "v1", {"v": "a"}, created_at=1)
+
+        self.assertEqual(list(self.store.iter_latest()), [("1", {"v": "a"}), ("2", {"v": 2})])
+
+    def test_iter_results_skips_other_prompts_and_failures(self):
+        """Export iteration keeps the given prompt hash's successful entries, even if a newer one failed"""
+        self.store.put("1", "v1", {"v": 1}, created_at=1)
+        self.store.put("1", "v2", {"error": "invalid JSON", "raw": ""}, created_at=2)
+        self.store.put("2", "v2", {"v": 2}, created_at=1)
+        self.store.put("3", "v1", {"error": "invalid JSON", "raw": ""}, created_at=1)
+
+        self.assertEqual(list(self.store.iter_results("v1")), [("1", {"v": 1})])
+        self.assertEqual(list(self.store.iter_results("v2")), [("2", {"v": 2})])
+        self.assertEqual(self.store.failed_ids("v1"), {"3"})
+
+    def test_writes_from_worker_threads(self):
+        """Concurrent puts from several threads all land"""
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: self.store.put(str(i), "v1", {"i": i}), range(40)))
+
+        self.assertEqual(len(self.store.recipe_ids("v1")), 40)
+
+    def test_migrate_directory(self):
+        """Legacy cache/{idMeal}.json files are imported; unreadable ones are skipped"""
+        cache_dir = Path(self.temp_dir) / "cache"
+        cache_dir.mkdir()
+        (cache_dir / "52764.json").write_text(json.dumps({"name": "Pie"}, indent=2))
+        (cache_dir / "52765.json").write_text(json.dumps({"name": "Stew"}))
+        (cache_dir / "52766.json").write_text("{not json")
+
+        migrated, skipped = migrate_directory(cache_dir, self.store, "v1")
+
+        self.assertEqual((migrated, skipped), (2, 1))
+        self.assertEqual(self.store.get("52765", "v1"), {"name": "Stew"})
+
+
+class TestCacheInvalidation(unittest.TestCase):
+    """Test prompt/model/row-aware cache invalidation"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = FakeOllama().start()
+        for name, value in (('CACHE_DB', Path(self.temp_dir) / "cache.sqlite"), ('OLLAMA_URL', self.server.url)):
+            p = patch.object(llama_recipe_pipeline, name, value)
+            p.start()
+            self.addCleanup(p.stop)
+        self.rows = fake_rows(6)
+        run_pipeline(self.rows[:4], workers=2, progress_every=100)  # rows 0-3 cached, 4-5 new
+        self.server.requests = 0
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def counts(self, rows):
+        return {name: len(found) for name, found in cache_status(rows).items()}
+
+    def test_unchanged_rows_are_fresh(self):
+        """Only rows never generated are pending"""
+        self.assertEqual(self.counts(self.rows), {"fresh": 4, "stale-prompt": 0, "stale-input": 0, "error": 0,
+                                              "new": 2})
+
+    def test_edited_row_is_regenerated(self):
+        """Changing a field the prompt uses makes just that entry stale"""
+        self.rows[1] = {**self.rows[1], "strInstructions": "Bake for longer."}
+
+        self.assertEqual(self.counts(self.rows)["stale-input"], 1)
+        summary = run_pipeline(self.rows, workers=2, progress_every=100, stale_only=True)
+
+        self.assertEqual(summary["processed"], 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.counts(self.rows)["fresh"], 4)
+
+    def test_prompt_or_model_change_marks_entries_stale(self):
+        """Entries generated under another prompt hash are stale, not reused"""
+        with patch.object(llama_recipe_pipeline, 'PROMPT_HASH', "new-prompts"):
+            self.assertEqual(self.counts(self.rows), {"fresh": 0, "stale-prompt": 4, "stale-input": 0,
+                                                  "error": 0, "new": 2})
+            summary = run_pipeline(self.rows, workers=2, progress_every=100)
+            self.assertEqual(self.counts(self.rows)["fresh"], 6)
+
+        self.assertEqual(summary["processed"], 6)
+        self.assertEqual(self.counts(self.rows)["fresh"], 4)  # the old prompt's entries are kept
+
+    def test_failed_generations_are_retried(self):
+        """Error entries count as "error", not fresh, and are regenerated (also with --stale-only)"""
+        store = llama_recipe_pipeline.get_store()
+        row = self.rows[2]
+        row_hash = llama_recipe_pipeline.input_hash(llama_recipe_pipeline.build_user_prompt(row))
+        store.put(row['idMeal'], llama_recipe_pipeline.PROMPT_HASH, {"error": "budget exceeded", "raw": "{"},
+                  input_hash=row_hash)
+
+        self.assertEqual(self.counts(self.rows)["error"], 1)
+        self.assertIn("3 rows would be generated (1 with --stale-only)", cache_report(cache_status(self.rows)))
+        summary = run_pipeline(self.rows, workers=2, progress_every=100, stale_only=True)
+
+        self.assertEqual(summary["processed"], 1)
+        self.assertEqual(self.counts(self.rows)["fresh"], 4)
+        self.assertEqual(store.get(row['idMeal'], llama_recipe_pipeline.PROMPT_HASH)['name'], row['strMeal'])
+
+    def test_dry_run_report_sends_nothing(self):
+        """The report counts what would be generated without calling the model"""
+        self.rows[0] = {**self.rows[0], "strMeal": "Renamed"}
+
+        report = cache_report(cache_status(self.rows))
+
+        self.assertIn("3 rows would be generated (1 with --stale-only)", report)
+        self.assertEqual(self.server.requests, 0)
+
+    def test_store_from_before_input_hashes_is_upgraded(self):
+        """Opening an older store adds the input_hash column; its entries count as fresh"""
+        path = Path(self.temp_dir) / "old.sqlite"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE responses (recipe_id TEXT NOT NULL, prompt_hash TEXT NOT NULL, "
+                         "data TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (recipe_id, prompt_hash))")
+            conn.execute("INSERT INTO responses VALUES ('1', 'h', '{}', 0)")
+            conn.execute("""INSERT INTO responses VALUES ('2', 'h', '{"error": "bad", "raw": ""}', 0)""")
+        conn.close()
+
+        store = CacheStore(path)
+
+        self.assertEqual(store.input_hashes("h"), {"1": None, "2": None})
+        self.assertEqual(store.failed_ids("h"), {"2"})
+        self.assertEqual(store.get("1", "h", input_hash="anything"), {})
+        store.close()
+
+
 if __name__ == '__main__':
     # Run tests with verbose output
     unittest.main(verbosity=2)
\ No newline at end of file
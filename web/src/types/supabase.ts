@@ -257,6 +257,71 @@ export type Database = {
           },
         ]
       }
+      recipe_nutrition: {
+        Row: {
+          agg_fats_g: number | null
+          agg_minerals_mg: number | null
+          agg_vit_b_mg: number | null
+          calories_kcal: number | null
+          carbs_g: number | null
+          cholesterol_mg: number | null
+          created_at: string
+          id: number
+          protein_g: number | null
+          recipe_id: number
+          sugars_g: number | null
+          vit_a_microg: number | null
+          vit_c_mg: number | null
+          vit_d_microg: number | null
+          vit_e_mg: number | null
+          vit_k_microg: number | null
+        }
+        Insert: {
+          agg_fats_g?: number | null
+          agg_minerals_mg?: number | null
+          agg_vit_b_mg?: number | null
+          calories_kcal?: number | null
+          carbs_g?: number | null
+          cholesterol_mg?: number | null
+          created_at?: string
+          id?: number
+          protein_g?: number | null
+          recipe_id: number
+          sugars_g?: number | null
+          vit_a_microg?: number | null
+          vit_c_mg?: number | null
+          vit_d_microg?: number | null
+          vit_e_mg?: number | null
+          vit_k_microg?: number | null
+        }
+        Update: {
+          agg_fats_g?: number | null
+          agg_minerals_mg?: number | null
+          agg_vit_b_mg?: number | null
+          calories_kcal?: number | null
+          carbs_g?: number | null
+          cholesterol_mg?: number | null
+          created_at?: string
+          id?: number
+          protein_g?: number | null
+          recipe_id?: number
+          sugars_g?: number | null
+          vit_a_microg?: number | null
+          vit_c_mg?: number | null
+          vit_d_microg?: number | null
+          vit_e_mg?: number | null
+          vit_k_microg?: number | null
+        }
+        Relationships: [
+          {
+            foreignKeyName: "recipe_nutrition_recipe_id_fkey"
+            columns: ["recipe_id"]
+            isOneToOne: true
+            referencedRelation: "Recipe"
+            referencedColumns: ["id"]
+          },
+        ]
+      }
       RecipeTag: {
         Row: {
           created_at: string